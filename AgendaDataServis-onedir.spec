@@ -0,0 +1,53 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Build em pasta (one-directory): o executável abre direto, sem extrair o
+# pacote para uma pasta temporária a cada execução como no one-file.
+#   pyinstaller AgendaDataServis-onedir.spec  ->  dist/AgendaDataServis/
+# A pasta Data/ (agenda.db) continua ao lado do executável.
+# O atualizador automático troca só o .exe: use este build em instalações
+# atualizadas manualmente (pasta inteira) ou mantenha o one-file para o updater.
+
+
+a = Analysis(
+    ['agenda.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    # Módulos do Qt que a agenda não usa (diminuem a pasta e o tempo de carga)
+    excludes=['tkinter', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtMultimedia'],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='AgendaDataServis',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    # UPX obriga a descompactar as DLLs na carga; sem ele a abertura é mais rápida
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='AgendaDataServis',
+)
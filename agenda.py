@@ -1,27 +1,80 @@
-import requests 
+# Primeiro import: mede o tempo dos demais (--profile-startup)
+from startup_profile import profiler
+
 import os
 import sys
-import subprocess
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QHBoxLayout, QVBoxLayout, 
-    QCalendarWidget, QListWidget, QLabel, QPushButton,
+    QCalendarWidget, QListView, QLabel, QPushButton,
     QDialog, QFormLayout, QLineEdit, QTimeEdit, QMessageBox,
-    QGraphicsDropShadowEffect, QListWidgetItem, QDesktopWidget,
-    QComboBox, QTextEdit, QRadioButton # QRadioButton ADICIONADO
+    QGraphicsDropShadowEffect, QDesktopWidget,
+    QComboBox, QTextEdit, QRadioButton, # QRadioButton ADICIONADO
+    QFileDialog, QProgressDialog, QCompleter, QCheckBox, QSpinBox, QDateEdit
 )
 from PyQt5.QtCore import (
-    QDate, Qt, QTime, QSize, QThread, pyqtSignal, 
-    QCoreApplication, QUrl, QTimer # QTimer ADICIONADO
+    QDate, Qt, QTime, pyqtSignal, 
+    QCoreApplication, QTimer, # QTimer ADICIONADO
+    QEvent
 ) 
 from PyQt5.QtGui import QColor,QTextCharFormat 
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+profiler.mark("import PyQt5")
 
-from database import DataManager
+# O QtNetwork (update_download) e o subprocess são importados só ao atualizar
+from database import (
+    Appointment, DataManager, DataManagerError, RecurrenceRule, DEFAULT_ARCHIVE_AGE_DAYS, PAGE_SIZE, TIPOS_VISITA,
+    LOCAIS_VISITA
+)
+import csv_io
+from db_worker import AsyncDataManager
+from appointment_view import (
+    AppointmentListModel, AgendaRangeModel, AppointmentDelegate, DateRole, RowRole,
+    get_color_by_type
+)
+from updater import CURRENT_VERSION, DOWNLOAD_FILENAME, Updater
+profiler.mark("import módulos da agenda")
+
+# Tempo (ms) de espera por uma consulta antes de exibir "Carregando..."
+LOADING_DELAY_MS = 150
+# Pausa na digitação (ms) antes de disparar a busca textual
+SEARCH_DEBOUNCE_MS = 250
+
+# Verificação de escritas de outras instâncias (PRAGMA data_version): o
+# intervalo volta ao mínimo a cada mudança ou quando a janela é ativada e
+# cresce CHANGE_POLL_BACKOFF vezes a cada verificação sem mudanças
+CHANGE_POLL_MIN_MS = 1000
+CHANGE_POLL_MAX_MS = 5000
+CHANGE_POLL_BACKOFF = 1.5
+
+# Porta da API HTTP só de leitura (agenda_api.py) iniciada junto com a janela; vazio = desligada
+API_PORT = os.environ.get("AGENDA_API_PORT", "")
+
+# Conflitos listados no aviso ao salvar
+MAX_CONFLICTS_LISTED = 5
+# Duração sugerida ao informar o término de uma visita
+DEFAULT_DURATION_SECS = 3600
+# Último término possível: um compromisso não passa da meia-noite
+LAST_END_TIME = QTime(23, 59)
+
+# Repetição no AddEventDialog: (rótulo, frequência de RecurrenceRule, unidade do intervalo)
+REPEAT_OPTIONS = (
+    ("Não repete", None, ""),
+    ("Diariamente", "diaria", "dia(s)"),
+    ("Semanalmente", "semanal", "semana(s)"),
+    ("Mensalmente", "mensal", "mês(es)"),
+)
+# Término da repetição: (rótulo, modo)
+REPEAT_END_OPTIONS = (("Sem data de término", None), ("Até a data", "fim"), ("Depois de", "ocorrencias"))
+# Sugestões iniciais de término da repetição
+DEFAULT_REPEAT_MONTHS = 3
+DEFAULT_REPEAT_COUNT = 10
 
+# Escopo da edição/exclusão de uma ocorrência de série
+SCOPE_OCCURRENCE, SCOPE_SERIES = "occurrence", "series"
 
-GITHUB_REPO = "Azzaleh/Agenda"
-CURRENT_VERSION = "1.1"
-DOWNLOAD_FILENAME = "AgendaDataServis.exe"
+# Modos da lista ao lado do calendário
+VIEW_DAY, VIEW_WEEK, VIEW_MONTH = "day", "week", "month"
+# Limite (dias) da rolagem contínua nas visões de semana/mês
+MAX_RANGE_DAYS = 366
 
 # --- QSS STYLES ---
 QSS_STYLES = """
@@ -89,23 +142,15 @@ QSS_STYLES = """
         color: #1f1f1f;
     }
 
-    /* Lista de Compromissos (QListWidget) */
-    QListWidget {
+    /* Lista de Compromissos (QListView + AppointmentDelegate) */
+    QListView {
         border: none;
         background-color: white;
         padding: 5px;
         border-radius: 8px;
     }
     
-    QListWidget {
-        border-bottom: 1px solid #f0f0f0;
-    }
-
-    QListWidget::item {
-        border-bottom: 1px solid #f0f0f0;
-    }
-
-    QListWidget::item:selected {
+    QListView {
         border-bottom: 1px solid #f0f0f0;
     }
     
@@ -160,14 +205,22 @@ QSS_STYLES = """
 
 # --- FUNÇÕES AUXILIARES GLOBAIS ---
 
-def get_color_by_type(tipo_visita):
-    """ Mapeia o tipo de visita para uma cor de fundo. """
-    colors = {
-        "Treinamento": "#c6ffc6",   
-        "Visita Técnica": "#ffecc2", 
-        "Outro": "#96fffa",          
-    }
-    return colors.get(tipo_visita, "#ffffff")
+def _fetch_agenda_days(data_manager, ranges):
+    """ Executado na thread do banco: [(início, fim, dias)] de cada trecho ainda não consultado. """
+    return [(start, end, data_manager.get_agenda_days(start, end)) for start, end in ranges]
+
+def _archive_and_vacuum(data_manager, days):
+    """ Executado na thread do banco: arquiva os compromissos antigos e compacta o agenda.db se algo saiu dele. """
+    moved = data_manager.archive_older_than(days)
+    if moved:
+        data_manager.vacuum()
+    return moved
+
+def _format_hours(appointment):
+    """ "HH:mm" ou "HH:mm às HH:mm" quando o término foi informado. """
+    if appointment.hora_fim:
+        return f"{appointment.hora} às {appointment.hora_fim}"
+    return appointment.hora
 
 def _center_window(widget):
     """ Centraliza o widget (QDialog ou QWidget) na tela. """
@@ -185,141 +238,20 @@ def _apply_shadow(widget, blur_radius=15, color_alpha=80):
     shadow.setColor(QColor(0, 0, 0, color_alpha))
     widget.setGraphicsEffect(shadow)
 
-# --- CLASSE UPDATER (QThread) ---
-
-class Updater(QThread):
-    update_available = pyqtSignal(str, str) # Emite (versão, download_url)
-    update_error = pyqtSignal(str)
-    verification_finished = pyqtSignal(bool)
-    
-    def run(self):
-        try:
-            # Requisição à API do GitHub para pegar a última release
-            api_url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
-            response = requests.get(api_url, timeout=5)
-            
-            if response.status_code != 200:
-                self.update_error.emit("Erro ao acessar API do GitHub. Código: " + str(response.status_code))
-                self.verification_finished.emit(False)
-                return
-
-            latest_release = response.json()
-            # Remove "v" do início e pega a versão da tag
-            latest_version_raw = latest_release.get("tag_name", "v0.0").lstrip('v')
-            
-            # Comparação de Versões
-            if self._is_new_version(latest_version_raw, CURRENT_VERSION):
-                
-                download_url = None
-                # Encontra o arquivo .exe anexo (asset)
-                for asset in latest_release.get("assets", []):
-                    if asset.get("name") == DOWNLOAD_FILENAME:
-                        download_url = asset.get("browser_download_url")
-                        break
-                
-                if download_url:
-                    self.update_available.emit(latest_version_raw, download_url)
-                else:
-                    self.update_error.emit(f"Arquivo '{DOWNLOAD_FILENAME}' não encontrado na release.")
-                    self.verification_finished.emit(False)
-            else:
-                self.verification_finished.emit(True)
-            
-        except requests.exceptions.ConnectionError:
-            self.update_error.emit("Erro de conexão de rede.")
-            self.verification_finished.emit(False)
-        except Exception as e:
-            self.update_error.emit(f"Erro inesperado na verificação: {e}")
-            self.verification_finished.emit(False)
-
-    def _is_new_version(self, new_raw, current_raw):
-        # Lógica para comparar apenas MAIOR e MENOR.
-        
-        new_parts = list(map(int, new_raw.split('.')))[:2]
-        current_parts = list(map(int, current_raw.split('.')))[:2]
-        
-        # Preenche com zeros se for necessário
-        max_len = max(len(new_parts), len(current_parts))
-        new_parts.extend([0] * (max_len - len(new_parts)))
-        current_parts.extend([0] * (max_len - len(current_parts)))
-        
-        return new_parts > current_parts
-
-# --- WIDGET PERSONALIZADO PARA O ITEM DA LISTA (3 LINHAS DE LAYOUT) ---
-
-class AppointmentItemWidget(QWidget):
-    def __init__(self, hora, nome_cliente, tipo_visita, local_visita, observacoes, endereco, quem_vai, parent=None):
-        """ Inicializa o widget com os detalhes do agendamento em três linhas. """
-        super().__init__(parent)
-        
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(5, 5, 5, 5) 
-        main_layout.setSpacing(4) 
-
-        title_style = 'font-weight: bold; color: #333333; margin-right: 5px;'
-        content_style = 'font-size: 10pt;'
-
-        # 1. LINHA PRINCIPAL (HORA E CLIENTE)
-        main_line = QHBoxLayout()
-        main_line.setSpacing(15) 
-        
-        hour_label = QLabel(f'<b><span style="font-size: 14pt;">{hora}</span></b>')
-        main_line.addWidget(hour_label)
-        
-        client_label = QLabel(f'<b><span style="color: #00CED1; font-size: 14pt;">{nome_cliente}</span></b>')
-        client_label.setWordWrap(True)
-        main_line.addWidget(client_label, 1) 
-        
-        main_layout.addLayout(main_line)
-        
-        # 2. SEGUNDA LINHA (TIPO E LOCAL/ENDEREÇO)
-        location_line = QHBoxLayout()
-        location_line.setSpacing(15) 
-        
-        # LÓGICA DE EXIBIÇÃO DO LOCAL/ENDEREÇO
-        local_display = local_visita
-        if local_visita == "No Cliente" and endereco:
-            local_display = f"No Cliente ({endereco})"
-
-        # Tipo
-        type_label = QLabel(f'<span style="{title_style}">Tipo:</span><span style="{content_style}"> {tipo_visita}</span>')
-        location_line.addWidget(type_label)
-        
-        # Local
-        local_label = QLabel(f'<span style="{title_style}">Local:</span><span style="{content_style}"> {local_display}</span>')
-        local_label.setWordWrap(True)
-        location_line.addWidget(local_label, 1) 
-        
-        main_layout.addLayout(location_line)
-
-        # 3. TERCEIRA LINHA (QUEM VAI? E OBSERVAÇÕES)
-        detail_line = QHBoxLayout()
-        detail_line.setSpacing(15)
-        
-        # CAMPO: QUEM VAI?
-        quem_vai_display = quem_vai if quem_vai else 'Não Definido'
-        quem_vai_label = QLabel(f'<span style="{title_style}">Quem vai?:</span><span style="{content_style}"> {quem_vai_display}</span>')
-        detail_line.addWidget(quem_vai_label)
-        
-        # Observações (Ocupa o restante da linha)
-        obs_display = observacoes
-        if not observacoes:
-             obs_display = 'Nenhuma'
-
-        obs_label = QLabel(f'<span style="{title_style}">Obs:</span><span style="{content_style}"> {obs_display}</span>')
-        obs_label.setWordWrap(True)
-        detail_line.addWidget(obs_label, 1) 
-        
-        main_layout.addLayout(detail_line)
-        
-        self.setMinimumHeight(80)
-        self.setStyleSheet("background-color: transparent;")
-
 # --- DIÁLOGO DE ADIÇÃO/EDIÇÃO DE EVENTO ---
 
 class AddEventDialog(QDialog):
-    def __init__(self, selected_date, appointment_details=None, parent=None):
-        """ Diálogo para adicionar ou editar um compromisso. """
+    def __init__(self, selected_date, appointment_details=None, parent=None, lookup_values=None, db_manager=None,
+                 recurrence=None):
+        """ Diálogo para adicionar ou editar um compromisso (`appointment_details`: o Appointment em edição).
+
+        `lookup_values` é o resultado de DataManager.get_lookup_values (opções
+        das listas); sem ele, valem as listas padrão de database.py. Com
+        `db_manager` (AsyncDataManager), o salvamento avisa se o responsável
+        já tem outro compromisso no mesmo horário. A repetição aparece para
+        compromissos novos e ao editar uma série inteira (`recurrence`: a
+        RecurrenceRule da série; `appointment_details`, o modelo).
+        """
         super().__init__(parent)
         self.setWindowTitle(f"Agendar Compromisso para {selected_date.toString('dd/MM/yyyy')}")
         self.resize(500, 420) 
@@ -327,7 +259,12 @@ class AddEventDialog(QDialog):
         
         self.data_selecionada = selected_date.toString("yyyy-MM-dd")
         self.novo_compromisso = None
+        self.nova_recorrencia = None  # RecurrenceRule escolhida (None = não repete)
         self.compromisso_id = None 
+        self.recorrencia_id = None
+        self.db_manager = db_manager
+
+        lookup_values = lookup_values or {"tipo_visita": TIPOS_VISITA, "local_visita": LOCAIS_VISITA, "quem_vai": []}
 
         layout = QFormLayout()
 
@@ -337,18 +274,45 @@ class AddEventDialog(QDialog):
         self.time_input.setDisplayFormat("HH:mm")
         layout.addRow("Hora da Visita:", self.time_input)
 
+        # 1b. Término (opcional; usado na verificação de conflitos de horário)
+        end_layout = QHBoxLayout()
+        self.end_check = QCheckBox("Informar", self)
+        self.end_time_input = QTimeEdit(self)
+        self.end_time_input.setDisplayFormat("HH:mm")
+        self.end_time_input.setEnabled(False)
+        # Duração mantida quando a hora de início muda (padrão: 1 hora)
+        self._duration_secs = DEFAULT_DURATION_SECS
+        self.end_check.toggled.connect(self._toggle_end_time)
+        self.time_input.timeChanged.connect(self._keep_duration)
+        self.end_time_input.timeChanged.connect(self._remember_duration)
+        end_layout.addWidget(self.end_check)
+        end_layout.addWidget(self.end_time_input, 1)
+        layout.addRow("Término:", end_layout)
+        # Aviso exibido quando a duração passaria da meia-noite
+        self.end_hint = QLabel(f"Término limitado a {LAST_END_TIME.toString('HH:mm')}: "
+                               "o compromisso não pode passar da meia-noite.", self)
+        self.end_hint.setWordWrap(True)
+        self.end_hint.setStyleSheet("color: #b71c1c;")
+        self.end_hint.setVisible(False)
+        layout.addRow("", self.end_hint)
+
+        # 1c. Repetição (compromisso novo ou série inteira; uma ocorrência avulsa não muda de regra)
+        self.repeat_input = None
+        if appointment_details is None or recurrence is not None:
+            self._add_repeat_rows(layout, selected_date, series=recurrence is not None)
+
         # 2. Nome do Cliente
         self.cliente_input = QLineEdit(self)
         layout.addRow("Nome do Cliente:", self.cliente_input)
         
         # 3. Tipo de Visita (ComboBox)
         self.tipo_visita_input = QComboBox(self)
-        self.tipo_visita_input.addItems(["Treinamento", "Visita Técnica", "Outro"])
+        self.tipo_visita_input.addItems(lookup_values["tipo_visita"])
         layout.addRow("Tipo de Compromisso:", self.tipo_visita_input)
 
         # 4. Local da Visita (ComboBox)
         self.local_visita_input = QComboBox(self)
-        self.local_visita_input.addItems(["Escritório", "No Cliente"])
+        self.local_visita_input.addItems(lookup_values["local_visita"])
         self.local_visita_input.currentTextChanged.connect(self._toggle_endereco_field)
         layout.addRow("Local:", self.local_visita_input)
         
@@ -359,6 +323,10 @@ class AddEventDialog(QDialog):
         
         # 6. Campo: QUEM VAI?
         self.quem_vai_input = QLineEdit(self)
+        # Sugere os responsáveis já cadastrados para manter a mesma grafia
+        completer = QCompleter(lookup_values["quem_vai"], self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.quem_vai_input.setCompleter(completer)
         layout.addRow("Quem vai? (Responsável):", self.quem_vai_input)
 
         # 7. Observações (Multi-linha)
@@ -387,6 +355,78 @@ class AddEventDialog(QDialog):
         # Preenche os dados se for Edição
         if appointment_details:
             self._load_details_for_editing(appointment_details)
+        if recurrence is not None:
+            self._load_recurrence(recurrence)
+
+    def _add_repeat_rows(self, layout, selected_date, series=False):
+        """ Linhas "Repetir" e "Termina"; numa série já existente não há a opção "Não repete". """
+        self.repeat_input = QComboBox(self)
+        for label, frequencia, unit in REPEAT_OPTIONS:
+            if frequencia is not None or not series:
+                self.repeat_input.addItem(label, (frequencia, unit))
+        self.interval_input = QSpinBox(self)
+        self.interval_input.setRange(1, 99)
+        self.interval_input.setPrefix("a cada ")
+        repeat_layout = QHBoxLayout()
+        repeat_layout.addWidget(self.repeat_input, 1)
+        repeat_layout.addWidget(self.interval_input)
+        layout.addRow("Repetir:", repeat_layout)
+
+        self.repeat_end_input = QComboBox(self)
+        for label, mode in REPEAT_END_OPTIONS:
+            self.repeat_end_input.addItem(label, mode)
+        self.repeat_until_input = QDateEdit(selected_date.addMonths(DEFAULT_REPEAT_MONTHS), self)
+        self.repeat_until_input.setCalendarPopup(True)
+        self.repeat_until_input.setDisplayFormat("dd/MM/yyyy")
+        self.repeat_count_input = QSpinBox(self)
+        self.repeat_count_input.setRange(1, 999)
+        self.repeat_count_input.setValue(DEFAULT_REPEAT_COUNT)
+        self.repeat_count_input.setSuffix(" vez(es)")
+        repeat_end_layout = QHBoxLayout()
+        repeat_end_layout.addWidget(self.repeat_end_input, 1)
+        repeat_end_layout.addWidget(self.repeat_until_input)
+        repeat_end_layout.addWidget(self.repeat_count_input)
+        layout.addRow("Termina:", repeat_end_layout)
+
+        self.repeat_input.currentIndexChanged.connect(self._toggle_repeat_fields)
+        self.repeat_end_input.currentIndexChanged.connect(self._toggle_repeat_fields)
+        self._toggle_repeat_fields()
+
+    def _toggle_repeat_fields(self):
+        """ Habilita só os campos que valem para a repetição e o término escolhidos. """
+        frequencia, unit = self.repeat_input.currentData()
+        repeats = frequencia is not None
+        end_mode = self.repeat_end_input.currentData()
+        self.interval_input.setSuffix(f" {unit}" if unit else "")
+        self.interval_input.setEnabled(repeats)
+        self.repeat_end_input.setEnabled(repeats)
+        self.repeat_until_input.setEnabled(repeats and end_mode == "fim")
+        self.repeat_count_input.setEnabled(repeats and end_mode == "ocorrencias")
+
+    def _load_recurrence(self, rule):
+        """ Preenche a repetição com a regra da série em edição. """
+        self.setWindowTitle(f"Editar Série de {self.cliente_input.text()}")
+        for index in range(self.repeat_input.count()):
+            if self.repeat_input.itemData(index)[0] == rule.frequencia:
+                self.repeat_input.setCurrentIndex(index)
+        self.interval_input.setValue(rule.intervalo)
+        end_mode = "ocorrencias" if rule.ocorrencias is not None else ("fim" if rule.fim else None)
+        self.repeat_end_input.setCurrentIndex(self.repeat_end_input.findData(end_mode))
+        if rule.fim:
+            self.repeat_until_input.setDate(QDate.fromString(rule.fim, "yyyy-MM-dd"))
+        if rule.ocorrencias is not None:
+            self.repeat_count_input.setValue(rule.ocorrencias)
+
+    def _read_recurrence(self):
+        """ RecurrenceRule dos campos de repetição, ou None se o compromisso não se repete. """
+        if self.repeat_input is None or self.repeat_input.currentData()[0] is None:
+            return None
+        end_mode = self.repeat_end_input.currentData()
+        return RecurrenceRule(
+            self.repeat_input.currentData()[0], self.interval_input.value(),
+            fim=self.repeat_until_input.date().toString("yyyy-MM-dd") if end_mode == "fim" else None,
+            ocorrencias=self.repeat_count_input.value() if end_mode == "ocorrencias" else None,
+        )
 
     def _toggle_endereco_field(self, local_text):
         """ Controla a visibilidade do campo Endereço. """
@@ -397,29 +437,62 @@ class AddEventDialog(QDialog):
             if label:
                 label.setVisible(is_client_visit)
     
-    def _load_details_for_editing(self, details_tuple):
-        """ Carrega os dados para o modo de edição. """
-        # data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes
-        data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes = details_tuple
-        
-        self.setWindowTitle(f"Editar Visita de {nome_cliente} ({QDate.fromString(data_str, 'yyyy-MM-dd').toString('dd/MM/yyyy')})")
-        self.data_selecionada = data_str 
+    def _toggle_end_time(self, checked):
+        self.end_time_input.setEnabled(checked)
+        if checked:
+            self._keep_duration()
+        else:
+            self.end_hint.setVisible(False)
+
+    def _keep_duration(self):
+        """ Desloca o término junto com o início, mantendo a duração.
+
+        QTime.addSecs dá a volta na meia-noite (23:30 + 1 h = 00:30); nesse
+        caso o término fica em LAST_END_TIME e o aviso é exibido, sem perder a
+        duração escolhida para a próxima mudança de início.
+        """
+        start = self.time_input.time()
+        if start.secsTo(LAST_END_TIME) < self._duration_secs:
+            self.end_time_input.blockSignals(True)
+            self.end_time_input.setTime(LAST_END_TIME)
+            self.end_time_input.blockSignals(False)
+            self.end_hint.setVisible(self.end_check.isChecked())
+            return
+        self.end_time_input.setTime(start.addSecs(self._duration_secs))
+        self.end_hint.setVisible(False)
+
+    def _remember_duration(self, end_time):
+        self.end_hint.setVisible(False)
+        duration = self.time_input.time().secsTo(end_time)
+        if duration > 0:
+            self._duration_secs = duration
+
+    def _load_details_for_editing(self, appointment):
+        """ Carrega os dados do Appointment para o modo de edição. """
+        data_display = QDate.fromString(appointment.data, 'yyyy-MM-dd').toString('dd/MM/yyyy')
+        self.setWindowTitle(f"Editar Visita de {appointment.nome_cliente} ({data_display})")
+        self.data_selecionada = appointment.data
+        self.compromisso_id = appointment.id
+        self.recorrencia_id = appointment.recorrencia_id
         
-        self.time_input.setTime(QTime.fromString(hora, "HH:mm"))
-        self.cliente_input.setText(nome_cliente)
-        self.obs_input.setText(observacoes)
-        self.endereco_input.setText(endereco)
+        self.time_input.setTime(QTime.fromString(appointment.hora, "HH:mm"))
+        if appointment.hora_fim:
+            self.end_time_input.setTime(QTime.fromString(appointment.hora_fim, "HH:mm"))
+        self.end_check.setChecked(bool(appointment.hora_fim))
+        self.cliente_input.setText(appointment.nome_cliente)
+        self.obs_input.setText(appointment.observacoes)
+        self.endereco_input.setText(appointment.endereco)
         
-        self.tipo_visita_input.setCurrentText(tipo_visita)
-        self.local_visita_input.setCurrentText(local_visita)
+        self.tipo_visita_input.setCurrentText(appointment.tipo_visita)
+        self.local_visita_input.setCurrentText(appointment.local_visita)
         
-        self.quem_vai_input.setText(quem_vai)
+        self.quem_vai_input.setText(appointment.quem_vai)
         
-        self._toggle_endereco_field(local_visita)
+        self._toggle_endereco_field(appointment.local_visita)
 
 
     def save_compromisso(self):
-        """ Salva os dados do formulário no dicionário novo_compromisso. """
+        """ Salva os dados do formulário em novo_compromisso (Appointment; id None para um novo). """
         hora = self.time_input.time().toString("HH:mm")
         cliente = self.cliente_input.text().strip()
         tipo_visita = self.tipo_visita_input.currentText()
@@ -429,26 +502,69 @@ class AddEventDialog(QDialog):
         endereco = self.endereco_input.text().strip() if local_visita == "No Cliente" else ""
         quem_vai = self.quem_vai_input.text().strip()
         
+        hora_fim = self.end_time_input.time().toString("HH:mm") if self.end_check.isChecked() else ""
+        
         if not cliente:
             QMessageBox.warning(self, "Erro de Entrada", "O nome do cliente não pode ser vazio.")
             return
+        if hora_fim and hora_fim <= hora:
+            QMessageBox.warning(self, "Erro de Entrada",
+                                "O término deve ser depois da hora da visita, no mesmo dia (até 23:59).")
+            return
+        self.nova_recorrencia = self._read_recurrence()
+        if self.nova_recorrencia is not None and (self.nova_recorrencia.fim or self.data_selecionada) < self.data_selecionada:
+            QMessageBox.warning(self, "Erro de Entrada", "A repetição deve terminar depois do primeiro dia.")
+            return
 
-        self.novo_compromisso = {
-            "data": self.data_selecionada,
-            "hora": hora,
-            "nome_cliente": cliente,
-            "tipo_visita": tipo_visita,
-            "local_visita": local_visita,
-            "endereco": endereco,           
-            "quem_vai": quem_vai,           
-            "observacoes": observacoes
-        }
-        
+        self.novo_compromisso = Appointment(
+            self.compromisso_id, self.data_selecionada, hora, cliente,
+            tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim,
+        )
+
+        if self.db_manager is None or not quem_vai:
+            self.accept()
+            return
+
+        # Confere na thread do banco se o responsável já está ocupado nesse horário
+        self.save_button.setEnabled(False)
+        self.db_manager.submit(
+            'find_conflicts', self.data_selecionada, hora, hora_fim, quem_vai, self.compromisso_id, self.recorrencia_id,
+            channel='conflict_check', callback=self._on_conflicts_checked, error_callback=self._on_conflict_check_failed,
+        )
+
+    def _on_conflicts_checked(self, conflicts):
+        self.save_button.setEnabled(True)
+        if conflicts:
+            appointment = self.novo_compromisso
+            lines = "\n".join(
+                f"• {_format_hours(row)} - {row.nome_cliente}" for row in conflicts[:MAX_CONFLICTS_LISTED]
+            )
+            if len(conflicts) > MAX_CONFLICTS_LISTED:
+                lines += f"\n... e mais {len(conflicts) - MAX_CONFLICTS_LISTED}."
+            answer = QMessageBox.warning(
+                self, "Conflito de Horário",
+                f"{appointment.quem_vai} já tem compromisso(s) em "
+                f"{QDate.fromString(appointment.data, 'yyyy-MM-dd').toString('dd/MM/yyyy')} "
+                f"que coincidem com {_format_hours(appointment)}:\n\n{lines}\n\nSalvar mesmo assim?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+            )
+            if answer != QMessageBox.Yes:
+                return
+        self.accept()
+
+    def _on_conflict_check_failed(self, message):
+        # A verificação é só um aviso: uma falha não impede salvar
+        print(f"Erro ao verificar conflitos de horário: {message}")
+        self.save_button.setEnabled(True)
         self.accept()
         
-    def set_compromisso_details(self, data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes):
+    def set_compromisso_details(self, data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes,
+                                hora_fim=""):
         """ Método auxiliar para carregar dados para edição. """
-        self._load_details_for_editing((data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes))
+        self._load_details_for_editing(Appointment(
+            self.compromisso_id, data_str, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes,
+            hora_fim,
+        ))
 
 
 # --- NOVO: DIÁLOGO DE CONSULTA DE AGENDAMENTOS ---
@@ -458,17 +574,32 @@ class QueryDialog(QDialog):
     appointment_selected = pyqtSignal(QDate)
 
     def __init__(self, db_manager, parent=None):
-        """ Diálogo para consultar agendamentos passados ou futuros. """
+        """ Diálogo para consultar agendamentos passados ou futuros, ou buscar por texto. """
         super().__init__(parent)
         self.setWindowTitle("Consultar Agendamentos")
         self.resize(700, 600)
         _center_window(self)
         
         self.db_manager = db_manager
-        self.appointments_data = []
+        self._page_key = None       # Chave (data, hora, id) do último item carregado
+        self._search_text = ""      # Busca ativa (vazia = listagem pelos rádios)
+        self._search_offset = 0     # Quantos resultados da busca já foram carregados
 
         main_layout = QVBoxLayout(self)
 
+        # 0. BUSCA TEXTUAL (cliente, endereço, responsável, observações)
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Buscar por cliente, endereço, responsável ou observação...")
+        self.search_input.setClearButtonEnabled(True)
+        main_layout.addWidget(self.search_input)
+
+        # Só busca quando o usuário para de digitar por SEARCH_DEBOUNCE_MS
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self._fetch_appointments)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
         # 1. LAYOUT DE OPÇÕES (RÁDIOS E BOTÃO)
         options_layout = QHBoxLayout()
         
@@ -491,9 +622,20 @@ class QueryDialog(QDialog):
         main_layout.addLayout(options_layout)
 
         # 2. LISTA DE RESULTADOS
-        self.result_list = QListWidget()
-        self.result_list.itemClicked.connect(self._toggle_select_button)
-        self.result_list.itemDoubleClicked.connect(self._select_and_return_date)
+        # Cor de fundo: a cor da visita, mas mais suave para a consulta
+        self.result_model = AppointmentListModel(
+            empty_text="Nenhum compromisso encontrado para este período.",
+            show_date=True, lighten=110, parent=self
+        )
+        # A view chama fetchMore ao rolar perto do fim: busca a próxima página
+        self.result_model.more_requested.connect(self._load_next_page)
+
+        self.result_list = QListView()
+        self.result_list.setModel(self.result_model)
+        self.result_list.setItemDelegate(AppointmentDelegate(self.result_list))
+        self.result_list.setUniformItemSizes(True)
+        self.result_list.clicked.connect(self._toggle_select_button)
+        self.result_list.doubleClicked.connect(self._select_and_return_date)
         main_layout.addWidget(self.result_list)
         
         self._fetch_appointments()
@@ -503,61 +645,82 @@ class QueryDialog(QDialog):
 
     def _toggle_select_button(self):
         """ Ativa/Desativa o botão 'Visualizar' se um item válido estiver selecionado. """
-        selected_items = self.result_list.selectedItems()
-        self.select_button.setEnabled(bool(selected_items) and selected_items[0].data(Qt.UserRole) is not None)
+        selected_indexes = self.result_list.selectedIndexes()
+        self.select_button.setEnabled(bool(selected_indexes) and selected_indexes[0].data(DateRole) is not None)
 
     def _fetch_appointments(self):
-        """ Busca os agendamentos no DB conforme o rádio selecionado. """
-        self.result_list.clear()
+        """ Reinicia a consulta (busca textual ou rádio selecionado) e exibe a primeira página. """
         self.select_button.setEnabled(False) 
-        
-        if self.radio_future.isChecked():
-            self.appointments_data = self.db_manager.get_future_appointments()
-        else:
-            self.appointments_data = self.db_manager.get_past_appointments()
+        self._page_key = None
+        self._search_offset = 0
+        self._search_text = self.search_input.text().strip()
 
-        if not self.appointments_data:
-            item = QListWidgetItem("Nenhum compromisso encontrado para este período.")
-            item.setSizeHint(QSize(self.result_list.width(), 40)) 
-            self.result_list.addItem(item)
+        if self._search_text:
+            self.result_model.empty_text = "Nenhum compromisso encontrado para esta busca."
+        else:
+            self.result_model.empty_text = "Nenhum compromisso encontrado para este período."
+        self.result_model.set_rows([], message="Carregando...")
+        self._load_next_page()
+
+    def _load_next_page(self):
+        """ Pede a próxima página ao DB; as linhas entram no modelo quando chegarem. """
+        # Nova busca ou troca de rádio antes da resposta descarta a página antiga (mesmo canal)
+        if self._search_text:
+            self.db_manager.submit(
+                'search', self._search_text, PAGE_SIZE, self._search_offset, channel='query',
+                callback=self._on_page_loaded, error_callback=self._on_page_error,
+            )
             return
 
-        for data_tuple in self.appointments_data:
-            # data_tuple: (id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes)
-            
-            # Formato de data legível para o Widget (ex: 28/11)
-            display_date_str = QDate.fromString(data_tuple[1], "yyyy-MM-dd").toString("dd/MM")
-            
-            # Criamos o widget personalizado para exibição
-            item_widget = AppointmentItemWidget(
-                hora=f"[{display_date_str}] {data_tuple[2]}", # Adiciona a data à hora
-                nome_cliente=data_tuple[3], 
-                tipo_visita=data_tuple[4], 
-                local_visita=data_tuple[5], 
-                observacoes=data_tuple[8], 
-                endereco=data_tuple[6],
-                quem_vai=data_tuple[7] 
+        method = 'get_future_appointments_page' if self.radio_future.isChecked() else 'get_past_appointments_page'
+        self.db_manager.submit(
+            method, self._page_key, PAGE_SIZE, channel='query',
+            callback=self._on_page_loaded, error_callback=self._on_page_error,
+        )
+
+    def _on_page_loaded(self, page):
+        if page:
+            self._page_key = DataManager.page_key(page[-1])
+            self._search_offset += len(page)
+        self.result_model.append_rows(page, has_more=len(page) == PAGE_SIZE)
+        if not self.result_model.rows:
+            self.result_model.set_rows([])
+
+    def _on_page_error(self, message):
+        print(f"Erro ao consultar agendamentos: {message}")
+        self.result_model.append_rows([], has_more=False)
+        if not self.result_model.rows:
+            self.result_model.set_rows([], message="Erro ao consultar os agendamentos.")
+
+    def refresh(self):
+        """ Consulta de novo as linhas já carregadas (outra instância gravou), mantendo a seleção e a rolagem. """
+        limit = max(len(self.result_model.rows), PAGE_SIZE)
+        callback = lambda rows: self._on_refreshed(rows, limit)
+        if self._search_text:
+            self.db_manager.submit(
+                'search', self._search_text, limit, 0, channel='query',
+                callback=callback, error_callback=self._on_page_error,
             )
+            return
 
-            item = QListWidgetItem(self.result_list)
-            
-            # Cor de fundo: a cor da visita, mas mais suave para a consulta
-            color_hex = get_color_by_type(data_tuple[4])
-            item.setBackground(QColor(color_hex).lighter(110))
-            
-            # Armazena a data no formato QDate no UserRole para fácil acesso
-            qdate = QDate.fromString(data_tuple[1], "yyyy-MM-dd")
-            item.setData(Qt.UserRole, qdate) 
-            
-            item.setSizeHint(item_widget.sizeHint())
-            self.result_list.setItemWidget(item, item_widget)
-            self.result_list.addItem(item)
+        method = 'get_future_appointments_page' if self.radio_future.isChecked() else 'get_past_appointments_page'
+        self.db_manager.submit(
+            method, None, limit, channel='query',
+            callback=callback, error_callback=self._on_page_error,
+        )
+
+    def _on_refreshed(self, rows, limit):
+        self._page_key = DataManager.page_key(rows[-1]) if rows else None
+        self._search_offset = len(rows)
+        # Só as linhas que mudaram são tocadas: a seleção e a rolagem ficam
+        self.result_model.merge_rows(rows, has_more=len(rows) == limit)
+        self._toggle_select_button()
 
     def _select_and_return_date(self):
         """ Emite o sinal com a data do compromisso selecionado e fecha o diálogo. """
-        selected_items = self.result_list.selectedItems()
-        if selected_items:
-            selected_qdate = selected_items[0].data(Qt.UserRole) 
+        selected_indexes = self.result_list.selectedIndexes()
+        if selected_indexes:
+            selected_qdate = selected_indexes[0].data(DateRole) 
             if selected_qdate:
                 self.appointment_selected.emit(selected_qdate)
                 self.accept()
@@ -565,11 +728,39 @@ class QueryDialog(QDialog):
 # --- AGENDA APP (PRINCIPAL) ---
 
 class AgendaApp(QWidget):
-    def __init__(self):
+    def __init__(self, db_name='agenda.db', check_updates=True, quit_after_startup=False):
+        """ Janela principal. `db_name` e `check_updates` permitem rodar com outro banco e sem o updater (benchmarks).
+
+        Com `quit_after_startup`, a janela fecha assim que a inicialização
+        termina (usado pelo benchmark de abertura).
+        """
         super().__init__()
+        self.check_updates = check_updates
+        self.quit_after_startup = quit_after_startup
+
+        # Etapas que faltam para a inicialização estar completa
+        self._startup_pending = {"first_paint", "day_list"}
         
-        # Inicialização do DB Manager
-        self.db_manager = DataManager()
+        # Inicialização do DB Manager (as consultas rodam em uma thread própria)
+        self.db_name = db_name
+        self.db_manager = AsyncDataManager(db_name, parent=self)
+        self.api_server = None
+
+        # Dias destacados no mês exibido (limpos a cada troca de página)
+        self._highlighted_dates = []
+
+        # Lista ao lado do calendário: dia selecionado, semana ou mês
+        self.view_mode = VIEW_DAY
+        # Dia cujas linhas a lista do dia exibe (None enquanto carrega ou após um erro)
+        self._shown_day = None
+
+        # Opções das listas do AddEventDialog (tabelas de tipo, local e responsável)
+        self.lookup_values = None
+
+        # Versão dos dados da última verificação (None até a primeira) e o
+        # diálogo de consulta aberto, atualizados quando outra instância grava
+        self._data_version = None
+        self._query_dialog = None
         
         self.set_window_title() 
         self.init_ui()
@@ -586,9 +777,10 @@ class AgendaApp(QWidget):
             self.setWindowTitle(base_title)
             
     def init_ui(self):
-        app.setStyleSheet(QSS_STYLES)
+        QApplication.instance().setStyleSheet(QSS_STYLES)
         
-        self.set_window_title("Verificando Atualizações...") 
+        if self.check_updates:
+            self.set_window_title("Verificando Atualizações...") 
         
         main_layout = QHBoxLayout()
 
@@ -605,6 +797,8 @@ class AgendaApp(QWidget):
         self.calendar.setGridVisible(False) 
         self.calendar.setSelectedDate(QDate.currentDate())
         self.calendar.selectionChanged.connect(self.update_daily_appointments)
+        # Destaca os dias com compromissos sempre que o mês exibido muda
+        self.calendar.currentPageChanged.connect(self.update_month_highlights)
         main_layout.addWidget(self.calendar, 65) 
 
         right_panel = QVBoxLayout()
@@ -612,9 +806,27 @@ class AgendaApp(QWidget):
         self.day_title = QLabel("Compromissos do Dia:")
         self.day_title.setObjectName("DayTitle")
 
-        self.appointment_list = QListWidget()
+        # Dia / Semana / Mês
+        view_layout = QHBoxLayout()
+        self.view_buttons = {}
+        for mode, label in ((VIEW_DAY, "Dia"), (VIEW_WEEK, "Semana"), (VIEW_MONTH, "Mês")):
+            button = QRadioButton(label)
+            button.setChecked(mode == VIEW_DAY)
+            button.toggled.connect(lambda checked, mode=mode: checked and self.set_view_mode(mode))
+            self.view_buttons[mode] = button
+            view_layout.addWidget(button)
+        view_layout.addStretch(1)
+
+        self.appointment_model = AppointmentListModel(empty_text="Nenhum compromisso agendado.", parent=self)
+        # Semana/mês: compromissos agrupados por dia; rolar até o fim carrega o período seguinte
+        self.range_model = AgendaRangeModel(empty_text="Nenhum compromisso neste período.", parent=self)
+        self.range_model.more_requested.connect(self._load_next_period)
+        self.appointment_list = QListView()
+        self.appointment_list.setModel(self.appointment_model)
+        self.appointment_list.setItemDelegate(AppointmentDelegate(self.appointment_list))
+        self.appointment_list.setUniformItemSizes(True)
         # CONEXÃO: DUPLO CLIQUE PARA EDIÇÃO
-        self.appointment_list.itemDoubleClicked.connect(self.open_edit_dialog)
+        self.appointment_list.doubleClicked.connect(self.open_edit_dialog)
 
         self.addButton = QPushButton(" + Adicionar Novo Compromisso ")
         self.addButton.clicked.connect(self.open_add_dialog)
@@ -631,164 +843,457 @@ class AgendaApp(QWidget):
         self.queryButton.setObjectName("QueryButton") 
         self.queryButton.clicked.connect(self.open_query_dialog)
         self.queryButton.setStyleSheet("background-color: #6a0dad; color: white;") # Roxo
+
+        # RELATÓRIOS DE CARGA POR RESPONSÁVEL
+        self.reportsButton = QPushButton(" 📊 Relatórios ")
+        self.reportsButton.setObjectName("ReportsButton")
+        self.reportsButton.clicked.connect(self.open_reports_dialog)
+        self.reportsButton.setStyleSheet("background-color: #00838f; color: white;") # Azul-petróleo
+
+        # VERIFICAÇÃO DE CONFLITOS DE HORÁRIO EM UM INTERVALO
+        self.conflictsButton = QPushButton(" ⚠ Conflitos de Horário ")
+        self.conflictsButton.setObjectName("ConflictsButton")
+        self.conflictsButton.clicked.connect(self.open_conflicts_dialog)
+        self.conflictsButton.setStyleSheet("background-color: #e65100; color: white;") # Laranja
+
+        # ARQUIVAMENTO DOS COMPROMISSOS ANTIGOS (CONTINUAM NA CONSULTA E NA BUSCA)
+        self.archiveButton = QPushButton(" 🗄 Arquivar Antigos ")
+        self.archiveButton.setObjectName("ArchiveButton")
+        self.archiveButton.clicked.connect(self.archive_old_appointments)
+        self.archiveButton.setStyleSheet("background-color: #546e7a; color: white;") # Cinza-azulado
+
+        tools_layout = QHBoxLayout()
+        tools_layout.addWidget(self.reportsButton)
+        tools_layout.addWidget(self.conflictsButton)
+        tools_layout.addWidget(self.archiveButton)
+
+        # IMPORTAÇÃO/EXPORTAÇÃO DE PLANILHAS (CSV)
+        self.importButton = QPushButton(" Importar CSV ")
+        self.importButton.setObjectName("ImportButton")
+        self.importButton.clicked.connect(self.import_csv)
+        self.importButton.setStyleSheet("background-color: #2e7d32; color: white;") # Verde
+
+        self.exportButton = QPushButton(" Exportar CSV ")
+        self.exportButton.setObjectName("ExportButton")
+        self.exportButton.clicked.connect(self.export_csv)
+        self.exportButton.setStyleSheet("background-color: #2e7d32; color: white;") # Verde
+
+        csv_layout = QHBoxLayout()
+        csv_layout.addWidget(self.importButton)
+        csv_layout.addWidget(self.exportButton)
         
         right_panel.addWidget(self.day_title)
+        right_panel.addLayout(view_layout)
         right_panel.addWidget(self.appointment_list)
         right_panel.addWidget(self.addButton)
         right_panel.addWidget(self.queryButton) 
+        right_panel.addLayout(tools_layout)
+        right_panel.addLayout(csv_layout)
         right_panel.addWidget(self.deleteButton) 
 
-        right_container = QWidget()
-        right_container.setStyleSheet("background-color: white; border-radius: 8px;")
-        right_container.setLayout(right_panel)
-        
-        _apply_shadow(right_container)
+        self.right_container = QWidget()
+        self.right_container.setStyleSheet("background-color: white; border-radius: 8px;")
+        self.right_container.setLayout(right_panel)
 
-        main_layout.addWidget(right_container, 35)
+        main_layout.addWidget(self.right_container, 35)
 
         self.setLayout(main_layout)
-        
+
+        # Só a lista do dia é pedida antes do primeiro frame; o resto fica em _finish_startup
+        self.update_daily_appointments()
+        profiler.mark("interface montada")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "first_paint" in self._startup_pending:
+            self._startup_step_done("first_paint", "primeiro frame")
+            # Volta ao loop de eventos para o frame chegar à tela antes do resto
+            QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        """ Parte não essencial da inicialização, executada depois do primeiro frame. """
+        _apply_shadow(self.right_container)
         _apply_shadow(self.addButton)
         _apply_shadow(self.deleteButton) 
         _apply_shadow(self.queryButton) 
+        _apply_shadow(self.reportsButton)
+        _apply_shadow(self.conflictsButton)
+        _apply_shadow(self.archiveButton)
+        _apply_shadow(self.importButton)
+        _apply_shadow(self.exportButton)
 
-        self.update_daily_appointments()
+        self.update_month_highlights()
+        self._load_lookup_values()
         
         # Timer para atualizar automaticamente o dia atual (a cada 60 segundos)
         self.date_check_timer = QTimer(self)
         self.date_check_timer.timeout.connect(self.check_and_update_day)
         self.date_check_timer.start(60000)
+
+        # Verificação de escritas de outras instâncias, com intervalo adaptativo
+        self.change_poll_timer = QTimer(self)
+        self.change_poll_timer.setSingleShot(True)
+        self.change_poll_timer.timeout.connect(self.poll_external_changes)
+        self._change_poll_interval = CHANGE_POLL_MIN_MS
+        self.poll_external_changes()
+
+        if API_PORT:
+            # As conexões da API são só de leitura: espera a thread do banco abrir (e migrar) o arquivo
+            self.db_manager.submit('get_schema_version', channel='api', callback=lambda _: self._start_api_server())
         
         # Inicia o verificador de atualização
-        self.updater = Updater()
-        self.updater.update_available.connect(self.prompt_update)
-        self.updater.update_error.connect(self.handle_updater_error)
-        self.updater.verification_finished.connect(self.handle_verification_finished)
-        self.updater.start()
+        if self.check_updates:
+            self.updater_error_message = None
+            self.updater = Updater()
+            self.updater.update_available.connect(self.prompt_update)
+            self.updater.update_error.connect(self.handle_updater_error)
+            self.updater.verification_finished.connect(self.handle_verification_finished)
+            self.updater.start()
+        profiler.mark("subsistemas adiados")
+        self._maybe_report_startup()
+
+    def _startup_step_done(self, step, phase):
+        if step in self._startup_pending:
+            self._startup_pending.discard(step)
+            profiler.mark(phase)
+            self._maybe_report_startup()
+
+    def _maybe_report_startup(self):
+        """ Imprime o perfil (--profile-startup) e, se pedido, fecha a janela ao fim da inicialização. """
+        if self._startup_pending or not hasattr(self, "date_check_timer"):
+            return
+        profiler.report()
+        if self.quit_after_startup:
+            QTimer.singleShot(0, self.close)
         
+    def set_view_mode(self, mode):
+        """ Alterna a lista entre o dia selecionado e a semana ou o mês que o contém. """
+        if mode == self.view_mode:
+            return
+        self.view_mode = mode
+        model = self.appointment_model if mode == VIEW_DAY else self.range_model
+        if self.appointment_list.model() is not model:
+            self.appointment_list.setModel(model)
+        # Os cabeçalhos de dia são mais baixos que os compromissos
+        self.appointment_list.setUniformItemSizes(mode == VIEW_DAY)
+        self.update_daily_appointments()
+
     def update_daily_appointments(self):
         """ Atualiza a lista de compromissos para a data selecionada. """
+        if self.view_mode != VIEW_DAY:
+            self.update_range_view()
+            return
         selected_date_qdate = self.calendar.selectedDate()
         selected_date_str = selected_date_qdate.toString("yyyy-MM-dd")
         display_date_str = selected_date_qdate.toString("dd 'de' MMMM 'de' yyyy")
         
         self.day_title.setText(f"Compromissos para:\n{display_date_str}")
         
-        daily_events = self.db_manager.get_compromissos_by_date(selected_date_str) 
-        
-        self.appointment_list.clear()
-        
-        if daily_events:
-            # event_id, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes
-            for event_id, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes in daily_events: 
-                
-                # WIDGET PERSONALIZADO
-                item_widget = AppointmentItemWidget(
-                    hora=hora, 
-                    nome_cliente=nome_cliente, 
-                    tipo_visita=tipo_visita, 
-                    local_visita=local_visita, 
-                    observacoes=observacoes, 
-                    endereco=endereco,
-                    quem_vai=quem_vai 
-                )
-                
-                item = QListWidgetItem(self.appointment_list)
-                
-                color_hex = get_color_by_type(tipo_visita)
-                item.setBackground(QColor(color_hex))
-
-                item.setSizeHint(item_widget.sizeHint())
-                self.appointment_list.setItemWidget(item, item_widget)
+        # Pedidos do canal "day" se substituem: cliques rápidos só exibem o último dia
+        self.db_manager.submit(
+            'get_compromissos_by_date', selected_date_str, channel='day',
+            callback=lambda daily_events: self._show_daily_appointments(selected_date_str, daily_events),
+            error_callback=self._show_daily_error,
+        )
+        # Deixa os dias vizinhos no cache do DataManager para a navegação por setas
+        self.db_manager.submit('prefetch_neighbors', selected_date_str, channel='prefetch')
+        # Só mostra "Carregando..." se a resposta demorar a chegar
+        QTimer.singleShot(LOADING_DELAY_MS, self._show_daily_loading)
+
+    def _show_daily_loading(self):
+        if self.db_manager.is_pending('day'):
+            self._shown_day = None
+            self.appointment_model.set_rows([], message="Carregando compromissos...")
+
+    def _show_daily_error(self, message):
+        print(f"Erro ao carregar compromissos: {message}")
+        self._shown_day = None
+        self.appointment_model.set_rows([], message="Erro ao carregar os compromissos do dia.")
+        self._startup_step_done("day_list", "lista do dia exibida")
+
+    def _show_daily_appointments(self, selected_date_str, daily_events):
+        """ Exibe os compromissos (Appointment) recebidos do banco para o dia selecionado. """
+        self._shown_day = selected_date_str
+        self.appointment_model.set_rows(daily_events)
+        self._startup_step_done("day_list", "lista do dia exibida")
+            
+    # --- VISÕES DE SEMANA E MÊS ---
+
+    def _period_bounds(self, qdate):
+        """ (início, fim) em QDate da semana (segunda a domingo) ou do mês que contém `qdate`. """
+        if self.view_mode == VIEW_WEEK:
+            start = qdate.addDays(1 - qdate.dayOfWeek())
+            return start, start.addDays(6)
+        start = QDate(qdate.year(), qdate.month(), 1)
+        return start, start.addDays(start.daysInMonth() - 1)
+
+    def update_range_view(self):
+        """ Exibe a semana ou o mês da data selecionada. """
+        start, end = self._period_bounds(self.calendar.selectedDate())
+        if self.view_mode == VIEW_WEEK:
+            title = f"Compromissos da semana:\n{start.toString('dd/MM')} a {end.toString('dd/MM/yyyy')}"
+        else:
+            month_name = start.toString("MMMM 'de' yyyy")
+            title = f"Compromissos do mês:\n{month_name}"
+        self.day_title.setText(title)
+        self._show_range(start.toString("yyyy-MM-dd"), end.toString("yyyy-MM-dd"))
+        QTimer.singleShot(LOADING_DELAY_MS, self._show_range_loading)
+
+    def _load_next_period(self):
+        """ Rolagem até o fim: estende o intervalo exibido em mais uma semana/mês. """
+        if self.range_model.visible is None:
+            return
+        start, end = self.range_model.visible
+        next_day = QDate.fromString(end, "yyyy-MM-dd").addDays(1)
+        _, next_end = self._period_bounds(next_day)
+        self._show_range(start, next_end.toString("yyyy-MM-dd"))
+
+    def _show_range(self, start, end):
+        """ Consulta só os trechos de [start, end] que o modelo ainda não tem e exibe o intervalo. """
+        missing = self.range_model.missing_ranges(start, end)
+        if not missing:
+            self._on_range_loaded(start, end, [])
+            return
+        self.db_manager.submit(
+            _fetch_agenda_days, missing, channel='range',
+            callback=lambda parts: self._on_range_loaded(start, end, parts),
+            error_callback=self._show_range_error,
+        )
 
-                item.setData(Qt.UserRole, event_id) 
-                self.appointment_list.addItem(item)
+    def _on_range_loaded(self, start, end, parts):
+        for part_start, part_end, days in parts:
+            self.range_model.add_days(part_start, part_end, days)
+        self.range_model.show_range(start, end, self._range_has_more(start, end))
+        self._startup_step_done("day_list", "lista do dia exibida")
+
+    def _range_has_more(self, start, end):
+        """ Continua rolando enquanto o último período tiver compromissos (até MAX_RANGE_DAYS). """
+        start_date, end_date = QDate.fromString(start, "yyyy-MM-dd"), QDate.fromString(end, "yyyy-MM-dd")
+        if start_date.daysTo(end_date) >= MAX_RANGE_DAYS:
+            return False
+        last_period_start, _ = self._period_bounds(end_date)
+        return self.range_model.has_days(last_period_start.toString("yyyy-MM-dd"), end)
+
+    def _show_range_loading(self):
+        if self.view_mode != VIEW_DAY and self.db_manager.is_pending('range'):
+            self.range_model.set_rows([], message="Carregando compromissos...")
+
+    def _show_range_error(self, message):
+        print(f"Erro ao carregar compromissos: {message}")
+        self.range_model.set_rows([], message="Erro ao carregar os compromissos do período.")
+
+    def _refresh_after_write(self, old=None, new=None):
+        """ Atualiza a lista e os destaques do mês após uma escrita.
+
+        `old` e `new` são a linha exibida antes da escrita e a retornada por
+        ela (None = nenhuma): só esse item muda na lista. Sem elas (séries,
+        importação) ou com a lista em estado desconhecido (carregando, com
+        erro), a lista é consultada de novo.
+        """
+        if not self._patch_list(old, new):
+            self._reload_list()
+        self.update_month_highlights()
+        # Uma escrita pode ter cadastrado um responsável novo
+        self._load_lookup_values()
+
+    def _patch_list(self, old, new):
+        """ Aplica a mudança de uma linha à lista exibida. Retorna False se for preciso recarregá-la. """
+        if old is None and new is None:
+            return False
+        if self.view_mode == VIEW_DAY:
+            if self._shown_day is None or self.db_manager.is_pending('day'):
+                return False
+            # A semana/mês guardados são consultados de novo ao trocar de visão
+            self.range_model.invalidate()
+            self.appointment_model.replace_row(old, new if new is not None and new.data == self._shown_day else None)
+            return True
+        if self.range_model.covered is None or self.db_manager.is_pending('range'):
+            return False
+        self.range_model.replace_row(old, new)
+        return True
+
+    def _reload_list(self):
+        """ Consulta de novo o dia ou o intervalo exibido. """
+        # Os dias guardados para a semana/mês podem ter mudado: consulta de novo o intervalo exibido
+        self.range_model.invalidate()
+        if self.view_mode != VIEW_DAY and self.range_model.visible is not None:
+            self._show_range(*self.range_model.visible)
         else:
-            item = QListWidgetItem("Nenhum compromisso agendado.")
-            item.setSizeHint(QSize(self.appointment_list.width(), 40)) 
-            self.appointment_list.addItem(item)
-            
+            self.update_daily_appointments()
+
+    def _load_lookup_values(self):
+        self.db_manager.submit('get_lookup_values', channel='lookups', callback=self._set_lookup_values)
+
+    def _set_lookup_values(self, values):
+        self.lookup_values = values
+
     def open_add_dialog(self):
         """ Abre o diálogo para adicionar um novo compromisso. """
         selected_date = self.calendar.selectedDate()
-        dialog = AddEventDialog(selected_date, parent=self)
+        dialog = AddEventDialog(selected_date, parent=self, lookup_values=self.lookup_values, db_manager=self.db_manager)
         
         if dialog.exec_() == QDialog.Accepted:
-            data_to_save = dialog.novo_compromisso
+            appointment = dialog.novo_compromisso
             
-            self.db_manager.add_compromisso(
-                data_to_save['data'],
-                data_to_save['hora'],
-                data_to_save['nome_cliente'],
-                data_to_save['tipo_visita'],
-                data_to_save['local_visita'],
-                data_to_save['endereco'],
-                data_to_save['quem_vai'],
-                data_to_save['observacoes']
+            self.set_window_title("Salvando...")
+            if dialog.nova_recorrencia is not None:
+                # Uma única linha com a regra; as ocorrências são calculadas ao exibir
+                self.db_manager.submit(
+                    'add_recorrencia', dialog.nova_recorrencia, *appointment.fields(),
+                    callback=lambda serie_id: self._on_compromisso_added(None),
+                    error_callback=lambda message: self._on_write_failed("salvar a série", message),
+                )
+                return
+            self.db_manager.submit(
+                'add_compromisso', *appointment.fields(),
+                callback=self._on_compromisso_added,
+                error_callback=lambda message: self._on_write_failed("salvar a visita", message),
             )
-            
-            self.update_daily_appointments()
-            QMessageBox.information(self, "Sucesso", "Visita agendada com sucesso!")
+
+    def _on_write_failed(self, action, message):
+        """ Informa a falha de uma escrita (ex.: banco travado por outra instância). """
+        self.set_window_title()
+        QMessageBox.critical(self, "Erro", f"Falha ao {action} no banco de dados.\n{message}")
+
+    def _on_compromisso_added(self, added):
+        """ `added` é o Appointment gravado, ou None para uma série (a lista é consultada de novo). """
+        self.set_window_title()
+        self._refresh_after_write(new=added)
+        QMessageBox.information(self, "Sucesso", "Visita agendada com sucesso!")
 
     def open_edit_dialog(self, item=None):
         """ Abre o diálogo para editar o compromisso selecionado. """
         if item is not None:
             selected_item = item
         else:
-            selected_items = self.appointment_list.selectedItems()
+            selected_items = self.appointment_list.selectedIndexes()
             if not selected_items:
                 QMessageBox.warning(self, "Seleção Inválida", "Por favor, selecione um compromisso para editar.")
                 return
             selected_item = selected_items[0]
 
-        compromisso_id = selected_item.data(Qt.UserRole)
+        row = selected_item.data(RowRole)
         
-        if compromisso_id is None:
+        if row is None:
             QMessageBox.warning(self, "Erro", "Não é um compromisso válido para edição.")
             return
+
+        if row.recorrencia_id is not None:
+            scope = self._ask_series_scope("Editar", row)
+            if scope == SCOPE_OCCURRENCE:
+                self._show_occurrence_dialog(row)
+            elif scope == SCOPE_SERIES:
+                self.db_manager.submit(
+                    'get_recorrencia', row.recorrencia_id, channel='edit', callback=self._show_series_dialog,
+                )
+            return
+        compromisso_id = row.id
             
-        # Busca os dados atuais do banco (retorna 8 campos)
-        details_tuple = self.db_manager.get_compromisso_by_id(compromisso_id)
-        
-        if not details_tuple:
+        # Busca os dados atuais do banco (Appointment); o diálogo abre na resposta
+        self.db_manager.submit(
+            'get_compromisso_by_id', compromisso_id, channel='edit',
+            callback=lambda appointment: self._show_edit_dialog(compromisso_id, appointment),
+        )
+
+    def _show_edit_dialog(self, compromisso_id, appointment):
+        """ Abre o AddEventDialog em modo de edição com os dados carregados. """
+        if appointment is None:
             QMessageBox.critical(self, "Erro", "Não foi possível carregar os dados do compromisso.")
             return
 
-        data_str = details_tuple[0] 
-        selected_date_qdate = QDate.fromString(data_str, "yyyy-MM-dd")
+        selected_date_qdate = QDate.fromString(appointment.data, "yyyy-MM-dd")
         
         # Configura o AddEventDialog para edição
         dialog = AddEventDialog(
             selected_date_qdate, 
-            appointment_details=details_tuple, 
-            parent=self
+            appointment_details=appointment, 
+            parent=self,
+            lookup_values=self.lookup_values,
+            db_manager=self.db_manager,
         )
-        dialog.compromisso_id = compromisso_id 
 
         # Executa o diálogo e salva se aceito
         if dialog.exec_() == QDialog.Accepted:
-            data_to_save = dialog.novo_compromisso
+            edited = dialog.novo_compromisso
             
             # ATUALIZAÇÃO NO BANCO
-            if self.db_manager.update_compromisso(
-                dialog.compromisso_id,
-                data_to_save['data'],
-                data_to_save['hora'],
-                data_to_save['nome_cliente'],
-                data_to_save['tipo_visita'],
-                data_to_save['local_visita'],
-                data_to_save['endereco'],
-                data_to_save['quem_vai'],
-                data_to_save['observacoes']
-            ):
-                QMessageBox.information(self, "Sucesso", "Compromisso atualizado com sucesso!")
-                self.update_daily_appointments()
+            self.set_window_title("Salvando...")
+            self.db_manager.submit(
+                'update_compromisso', edited.id, *edited.fields(),
+                callback=lambda updated: self._on_compromisso_updated(updated, old=appointment),
+                error_callback=lambda message: self._on_write_failed("atualizar o compromisso", message),
+            )
+
+    def _ask_series_scope(self, action, appointment):
+        """ Pergunta se `action` ("Editar"/"Excluir") vale só para a ocorrência ou para a série toda. """
+        box = QMessageBox(QMessageBox.Question, f"{action} Compromisso Repetido",
+                          f"'{appointment.nome_cliente}' faz parte de uma série. {action}:", parent=self)
+        occurrence_button = box.addButton("Só esta ocorrência", QMessageBox.AcceptRole)
+        series_button = box.addButton("Toda a série", QMessageBox.DestructiveRole)
+        box.addButton("Cancelar", QMessageBox.RejectRole)
+        box.exec_()
+        if box.clickedButton() is occurrence_button:
+            return SCOPE_OCCURRENCE
+        if box.clickedButton() is series_button:
+            return SCOPE_SERIES
+        return None
+
+    def _show_occurrence_dialog(self, occurrence):
+        """ Edita uma ocorrência à parte: ao salvar, ela sai da série e vira um compromisso comum. """
+        dialog = AddEventDialog(
+            QDate.fromString(occurrence.data, "yyyy-MM-dd"),
+            appointment_details=occurrence,
+            parent=self,
+            lookup_values=self.lookup_values,
+            db_manager=self.db_manager,
+        )
+        if dialog.exec_() == QDialog.Accepted:
+            self.set_window_title("Salvando...")
+            self.db_manager.submit(
+                'detach_ocorrencia', occurrence.recorrencia_id, occurrence.data, *dialog.novo_compromisso.fields(),
+                callback=lambda detached: self._on_compromisso_updated(detached, old=occurrence),
+                error_callback=lambda message: self._on_write_failed("atualizar o compromisso", message),
+            )
+
+    def _show_series_dialog(self, series):
+        """ Edita a série inteira: regra de repetição e campos de todas as ocorrências. """
+        if series is None:
+            QMessageBox.critical(self, "Erro", "A série não foi encontrada; ela pode ter sido excluída em outro computador.")
+            self._refresh_after_write()
+            return
+        rule, template = series
+        dialog = AddEventDialog(
+            QDate.fromString(template.data, "yyyy-MM-dd"),
+            appointment_details=template,
+            parent=self,
+            lookup_values=self.lookup_values,
+            db_manager=self.db_manager,
+            recurrence=rule,
+        )
+        if dialog.exec_() == QDialog.Accepted:
+            self.set_window_title("Salvando...")
+            self.db_manager.submit(
+                'update_recorrencia', template.recorrencia_id, dialog.nova_recorrencia, *dialog.novo_compromisso.fields(),
+                callback=self._on_compromisso_updated,
+                error_callback=lambda message: self._on_write_failed("atualizar a série", message),
+            )
+
+    def _on_compromisso_updated(self, updated, old=None):
+        """ `updated` é a linha gravada (ou True para uma série) e `old`, a exibida antes; vazio se ela não existia mais. """
+        self.set_window_title()
+        if updated:
+            QMessageBox.information(self, "Sucesso", "Compromisso atualizado com sucesso!")
+            if old is None:
+                self._refresh_after_write()
             else:
-                QMessageBox.critical(self, "Erro", "Falha ao atualizar o compromisso no banco de dados.")
+                self._refresh_after_write(old, updated)
+        else:
+            QMessageBox.critical(self, "Erro", "O compromisso não foi encontrado; ele pode ter sido excluído em outro computador.")
+            self._refresh_after_write()
 
     def delete_selected_appointment(self,):
         """ Exclui o compromisso selecionado na lista. """
-        selected_items = self.appointment_list.selectedItems()
+        selected_items = self.appointment_list.selectedIndexes()
         
         if not selected_items:
             QMessageBox.warning(self, "Seleção Inválida", "Por favor, selecione um compromisso para excluir.")
@@ -796,23 +1301,135 @@ class AgendaApp(QWidget):
 
         selected_item = selected_items[0]
         
-        compromisso_id = selected_item.data(Qt.UserRole)
+        row = selected_item.data(RowRole)
         
-        if compromisso_id is None:
+        if row is None:
             QMessageBox.warning(self, "Erro", "Não é um compromisso válido para exclusão.")
             return
+
+        if row.recorrencia_id is not None:
+            scope = self._ask_series_scope("Excluir", row)
+            if scope is None:
+                return
+            self.set_window_title("Excluindo...")
+            if scope == SCOPE_OCCURRENCE:
+                method, args = 'skip_ocorrencia', (row.recorrencia_id, row.data)
+            else:
+                method, args = 'delete_recorrencia', (row.recorrencia_id,)
+            # Só a ocorrência sai da lista; a série inteira pede nova consulta
+            old = row if scope == SCOPE_OCCURRENCE else None
+            self.db_manager.submit(
+                method, *args,
+                callback=lambda success: self._on_compromisso_deleted(success, old),
+                error_callback=lambda message: self._on_write_failed("excluir o compromisso", message),
+            )
+            return
+        compromisso_id = row.id
             
         confirm = QMessageBox.question(self, "Confirmar Exclusão", 
-            f"Tem certeza que deseja excluir o compromisso: '{selected_item.text()}'?",
+            f"Tem certeza que deseja excluir o compromisso: '{selected_item.data(Qt.DisplayRole)}'?",
             QMessageBox.Yes | QMessageBox.No
         )
 
         if confirm == QMessageBox.Yes:
-            if self.db_manager.delete_compromisso(compromisso_id):
-                QMessageBox.information(self, "Sucesso", "Compromisso excluído!")
-                self.update_daily_appointments()
-            else:
-                QMessageBox.critical(self, "Erro", "Falha ao excluir o compromisso no banco de dados.")
+            self.set_window_title("Excluindo...")
+            self.db_manager.submit(
+                'delete_compromisso', compromisso_id,
+                callback=lambda deleted: self._on_compromisso_deleted(deleted, row),
+                error_callback=lambda message: self._on_write_failed("excluir o compromisso", message),
+            )
+
+    def _on_compromisso_deleted(self, deleted, old=None):
+        """ `deleted` indica (ou é) o compromisso excluído; `old` é a linha exibida que sai da lista. """
+        self.set_window_title()
+        if deleted:
+            QMessageBox.information(self, "Sucesso", "Compromisso excluído!")
+            self._refresh_after_write(old=old)
+        else:
+            QMessageBox.critical(self, "Erro", "O compromisso não foi encontrado; ele pode ter sido excluído em outro computador.")
+            self._refresh_after_write()
+
+    def import_csv(self):
+        """ Importa compromissos de uma planilha CSV (em lotes, na thread do banco). """
+        path, _ = QFileDialog.getOpenFileName(self, "Importar Compromissos", "", "Planilhas CSV (*.csv)")
+        if not path:
+            return
+
+        self._set_csv_buttons_enabled(False)
+        self.set_window_title("Importando...")
+        self.db_manager.submit(
+            csv_io.import_csv, path,
+            callback=self._on_csv_imported,
+            error_callback=self._on_csv_failed,
+        )
+
+    def _on_csv_imported(self, report):
+        self._set_csv_buttons_enabled(True)
+        self.set_window_title()
+        self._refresh_after_write()
+        if report.rejected:
+            QMessageBox.warning(self, "Importação Concluída com Erros", report.summary())
+        else:
+            QMessageBox.information(self, "Importação Concluída", report.summary())
+
+    def export_csv(self):
+        """ Exporta todos os compromissos para uma planilha CSV. """
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar Compromissos", "agenda.csv", "Planilhas CSV (*.csv)")
+        if not path:
+            return
+
+        self._set_csv_buttons_enabled(False)
+        self.set_window_title("Exportando...")
+        self.db_manager.submit(
+            csv_io.export_csv, path,
+            callback=self._on_csv_exported,
+            error_callback=self._on_csv_failed,
+        )
+
+    def _on_csv_exported(self, written):
+        self._set_csv_buttons_enabled(True)
+        self.set_window_title()
+        QMessageBox.information(self, "Exportação Concluída", f"{written} compromisso(s) exportado(s).")
+
+    def _on_csv_failed(self, message):
+        self._set_csv_buttons_enabled(True)
+        self.set_window_title()
+        QMessageBox.critical(self, "Erro", f"Falha ao processar o arquivo CSV.\n{message}")
+
+    def _set_csv_buttons_enabled(self, enabled):
+        self.importButton.setEnabled(enabled)
+        self.exportButton.setEnabled(enabled)
+
+    def archive_old_appointments(self):
+        """ Move para o arquivo os compromissos com mais de DEFAULT_ARCHIVE_AGE_DAYS dias, após confirmação. """
+        cutoff = QDate.currentDate().addDays(-DEFAULT_ARCHIVE_AGE_DAYS)
+        reply = QMessageBox.question(
+            self, "Arquivar Compromissos Antigos",
+            f"Mover para o arquivo os compromissos anteriores a {cutoff.toString('dd/MM/yyyy')}?\n\n"
+            "Eles continuam aparecendo na consulta, na busca e no calendário.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        self.archiveButton.setEnabled(False)
+        self.set_window_title("Arquivando...")
+        self.db_manager.submit(
+            _archive_and_vacuum, DEFAULT_ARCHIVE_AGE_DAYS,
+            callback=self._on_archived,
+            error_callback=self._on_archive_failed,
+        )
+
+    def _on_archived(self, moved):
+        self.archiveButton.setEnabled(True)
+        self.set_window_title()
+        QMessageBox.information(self, "Arquivamento Concluído", f"{moved} compromisso(s) arquivado(s).")
+        self._refresh_after_write()
+
+    def _on_archive_failed(self, message):
+        self.archiveButton.setEnabled(True)
+        self.set_window_title()
+        QMessageBox.critical(self, "Erro", f"Não foi possível arquivar os compromissos:\n{message}")
 
     def open_query_dialog(self):
         """ Abre o diálogo de consulta de agendamentos. """
@@ -821,6 +1438,26 @@ class AgendaApp(QWidget):
         # Conecta o sinal do diálogo ao método de navegação
         dialog.appointment_selected.connect(self.navigate_to_date) 
         
+        # Enquanto aberto, é atualizado quando outra instância grava
+        self._query_dialog = dialog
+        try:
+            dialog.exec_()
+        finally:
+            self._query_dialog = None
+
+    def open_reports_dialog(self):
+        """ Abre os relatórios de carga por responsável. """
+        from reports import ReportsDialog  # Só quando usado (tabelas e filtros próprios)
+
+        dialog = ReportsDialog(self.db_manager, lookup_values=self.lookup_values, parent=self)
+        dialog.exec_()
+
+    def open_conflicts_dialog(self):
+        """ Abre a verificação de conflitos de horário em um intervalo de datas. """
+        from conflicts import ConflictsDialog  # Só quando usado
+
+        dialog = ConflictsDialog(self.db_manager, parent=self)
+        dialog.appointment_selected.connect(self.navigate_to_date)
         dialog.exec_()
         
     def navigate_to_date(self, target_date: QDate):
@@ -834,14 +1471,17 @@ class AgendaApp(QWidget):
         """ Atualiza o título da janela após a verificação estar completa. """
         if success:
             self.set_window_title(f"Versão {CURRENT_VERSION} Atualizada")
+        elif self.updater_error_message:
+            # Sem janela modal: a falha aparece só no título (o detalhe vai para o log)
+            self.set_window_title("Atualizações não verificadas")
         else:
             self.set_window_title() 
             
     def handle_updater_error(self, message):
         print(f"Erro do Updater: {message}")
-        QMessageBox.warning(self, "Erro de Atualização", f"Falha ao verificar atualizações. {message}")
+        self.updater_error_message = message
 
-    def prompt_update(self, version, download_url):
+    def prompt_update(self, version, download_url, sha256="", delta_url="", delta_sha256=""):
         """ Pergunta ao usuário se deseja atualizar. """
         reply = QMessageBox.question(self, "Atualização Disponível", 
             f"Uma nova versão ({version}) está disponível. Deseja atualizar agora?",
@@ -849,42 +1489,103 @@ class AgendaApp(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            # Inicia o download (usando QNetworkAccessManager para não travar a UI)
-            self.download_manager = QNetworkAccessManager(self)
-            self.download_manager.finished.connect(self.handle_download_finished)
-            
-            request = QNetworkRequest(QUrl(download_url))
-            self.reply = self.download_manager.get(request)
-            
-            self.download_msg = QMessageBox(self)
-            self.download_msg.setText("Baixando atualização... Por favor, aguarde.")
+            current_exe_path = os.path.abspath(sys.argv[0])
+            new_exe_name = "AgendaDataServis_new.exe"
+            self.update_target = {
+                "current": current_exe_path,
+                "new": os.path.join(os.path.dirname(current_exe_path), new_exe_name),
+                "url": download_url,
+                "sha256": sha256,
+            }
+            self.update_canceled = False
+
+            self.download_msg = QProgressDialog("Baixando atualização...", "Cancelar", 0, 0, self)
             self.download_msg.setWindowTitle("Baixando")
-            self.download_msg.setStandardButtons(QMessageBox.NoButton)
+            self.download_msg.setMinimumDuration(0)
+            self.download_msg.setAutoClose(False)
+            self.download_msg.setAutoReset(False)
+            self.download_msg.canceled.connect(self._cancel_update)
             self.download_msg.show()
 
-    def handle_download_finished(self, reply: QNetworkReply):
-        """ Gerencia o download da atualização. """
-        if hasattr(self, 'download_msg'):
-            self.download_msg.close()
-
-        if reply.error() != QNetworkReply.NoError:
-            QMessageBox.critical(self, "Erro de Download", f"Falha ao baixar arquivo: {reply.errorString()}")
+            # O delta (poucos KB) é tentado primeiro; qualquer falha volta ao executável completo
+            if delta_url:
+                self._start_delta_download(delta_url, delta_sha256)
+            else:
+                self._start_full_download()
+
+    def _start_download(self, url, dest_path, sha256, label, on_finished, on_failed):
+        from update_download import UpdateDownloader
+
+        # Download em fluxo para o disco (QtNetwork, sem travar a UI)
+        self.download_label = label
+        self.download_msg.setLabelText(label)
+        self.downloader = UpdateDownloader(url, dest_path, sha256, parent=self)
+        self.downloader.progress.connect(self._on_download_progress)
+        self.downloader.finished.connect(on_finished)
+        self.downloader.failed.connect(on_failed)
+        self.downloader.start()
+
+    def _start_full_download(self):
+        target = self.update_target
+        self._start_download(target["url"], target["new"], target["sha256"], "Baixando atualização...",
+                             self.handle_download_finished, self._on_download_failed)
+
+    def _start_delta_download(self, delta_url, delta_sha256):
+        self._start_download(delta_url, self.update_target["new"] + ".delta", delta_sha256,
+                             "Baixando atualização (diferencial)...", self._apply_delta, self._on_delta_failed)
+
+    def _apply_delta(self, delta_path):
+        """ Reconstrói o executável novo a partir do atual em uma thread própria. """
+        from update_download import DeltaPatcher
+
+        target = self.update_target
+        self.download_msg.setLabelText("Aplicando atualização...")
+        self.patcher = DeltaPatcher(target["current"], delta_path, target["new"], target["sha256"], parent=self)
+        self.patcher.finished_ok.connect(self.handle_download_finished)
+        self.patcher.failed.connect(self._on_delta_failed)
+        self.patcher.start()
+
+    def _on_delta_failed(self, message):
+        if self.update_canceled:
+            self._close_download_dialog()
             return
-            
-        new_exe_data = reply.readAll()
-        current_exe_path = os.path.abspath(sys.argv[0])
-        new_exe_name = "AgendaDataServis_new.exe"
-        temp_new_exe_path = os.path.join(os.path.dirname(current_exe_path), new_exe_name)
+        print(f"Atualização diferencial indisponível ({message}); baixando o executável completo.")
+        self._start_full_download()
+
+    def _cancel_update(self):
+        self.update_canceled = True
+        self.downloader.abort()
+
+    def _close_download_dialog(self):
+        # Fechar o QProgressDialog emite canceled; desconecta antes para não contar como cancelamento
+        self.download_msg.canceled.disconnect(self._cancel_update)
+        self.download_msg.close()
+
+    def _on_download_progress(self, received, total, bytes_per_second):
+        """ Atualiza a barra com o total baixado e a velocidade atual. """
+        mb = 1024 * 1024
+        if total > 0:
+            # A barra trabalha em KB para caber em um int mesmo com arquivos grandes
+            self.download_msg.setMaximum(total // 1024)
+            self.download_msg.setValue(received // 1024)
+            text = f"{received / mb:.1f} MB de {total / mb:.1f} MB"
+        else:
+            text = f"{received / mb:.1f} MB"
+        self.download_msg.setLabelText(f"{self.download_label} {text} ({bytes_per_second / mb:.2f} MB/s)")
 
-        try:
-            # Salva o novo .exe com um nome temporário
-            with open(temp_new_exe_path, 'wb') as f:
-                f.write(new_exe_data.data())
-        except Exception as e:
-            QMessageBox.critical(self, "Erro de Arquivo", f"Não foi possível salvar o novo executável: {e}")
+    def _on_download_failed(self, message):
+        self._close_download_dialog()
+        if self.update_canceled:
+            # Cancelado pelo usuário: sem aviso; o .part fica para retomar o download depois
             return
+        QMessageBox.warning(self, "Erro de Download", message)
 
-        self.execute_update_script(current_exe_path, temp_new_exe_path)
+    def handle_download_finished(self, new_exe_path):
+        """ Download concluído e com SHA-256 conferido: substitui o executável. """
+        self._close_download_dialog()
+        if self.update_canceled:
+            return
+        self.execute_update_script(self.update_target["current"], new_exe_path)
 
 
     def execute_update_script(self, old_path, new_path):
@@ -924,6 +1625,8 @@ EXIT
 goto :EOF
 """
         
+        import subprocess
+
         script_path = os.path.join(os.path.dirname(old_path), "update_script.bat")
         
         try:
@@ -950,6 +1653,33 @@ goto :EOF
 
         self.calendar.setDateTextFormat(today, today_format)
         
+    def update_month_highlights(self, year=None, month=None):
+        """ Pinta os dias do mês exibido que têm compromissos, pela cor do tipo predominante. """
+        if year is None or month is None:
+            year, month = self.calendar.yearShown(), self.calendar.monthShown()
+
+        # Uma única consulta agrupada (com cache) para o mês inteiro
+        self.db_manager.submit('get_month_density', year, month, channel='month',
+                               callback=self._apply_month_highlights)
+
+    def _apply_month_highlights(self, density):
+        """ Aplica os formatos de destaque recebidos de get_month_density. """
+        # Limpa os destaques do mês anterior antes de aplicar os novos
+        for qdate in self._highlighted_dates:
+            self.calendar.setDateTextFormat(qdate, QTextCharFormat())
+        self._highlighted_dates = []
+
+        today = QDate.currentDate()
+        for data_str, (count, tipo_visita) in density.items():
+            qdate = QDate.fromString(data_str, "yyyy-MM-dd")
+            if qdate == today:
+                continue  # O dia atual mantém o próprio destaque
+            day_format = QTextCharFormat()
+            day_format.setBackground(QColor(get_color_by_type(tipo_visita)))
+            day_format.setFontWeight(75)
+            self.calendar.setDateTextFormat(qdate, day_format)
+            self._highlighted_dates.append(qdate)
+
     def check_and_update_day(self):
         """ Verifica se a data do sistema mudou e atualiza o destaque do calendário. """
         today = QDate.currentDate()
@@ -960,19 +1690,98 @@ goto :EOF
             self.update_daily_appointments()  
             
         self.last_checked_date = today
-        
+
+    # --- ESCRITAS DE OUTRAS INSTÂNCIAS ---
+
+    def poll_external_changes(self):
+        """ Pede a versão dos dados; só quando ela muda algo é consultado de novo. """
+        self.change_poll_timer.stop()
+        self.db_manager.submit(
+            'get_data_version', channel='changes',
+            callback=self._on_data_version, error_callback=self._on_data_version_error,
+        )
+
+    def _on_data_version(self, version):
+        if self._data_version is not None and version != self._data_version:
+            self._apply_external_changes()
+            self._change_poll_interval = CHANGE_POLL_MIN_MS
+        else:
+            self._change_poll_interval = min(CHANGE_POLL_MAX_MS, int(self._change_poll_interval * CHANGE_POLL_BACKOFF))
+        self._data_version = version
+        self.change_poll_timer.start(self._change_poll_interval)
+
+    def _on_data_version_error(self, message):
+        print(f"Erro ao verificar alterações no banco: {message}")
+        self._change_poll_interval = CHANGE_POLL_MAX_MS
+        self.change_poll_timer.start(self._change_poll_interval)
+
+    def _apply_external_changes(self):
+        """ Outra instância gravou: atualiza a lista exibida, os destaques do mês e a consulta aberta.
+
+        Os caches do DataManager já foram descartados por get_data_version.
+        """
+        if self.view_mode == VIEW_DAY and self._shown_day is not None and not self.db_manager.is_pending('day'):
+            shown_day = self._shown_day
+            self.range_model.invalidate()
+            self.db_manager.submit(
+                'get_compromissos_by_date', shown_day, channel='day',
+                callback=lambda daily_events: self._merge_daily_appointments(shown_day, daily_events),
+                error_callback=self._show_daily_error,
+            )
+        else:
+            self._reload_list()
+        self.update_month_highlights()
+        self._load_lookup_values()
+        if self._query_dialog is not None:
+            self._query_dialog.refresh()
+
+    def _merge_daily_appointments(self, selected_date_str, daily_events):
+        """ Aplica à lista do dia só as linhas que mudaram (mantém a seleção e a rolagem). """
+        if selected_date_str != self._shown_day:
+            self._show_daily_appointments(selected_date_str, daily_events)
+            return
+        self.appointment_model.merge_rows(daily_events)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # De volta à janela: verifica logo, sem esperar o intervalo crescido
+        if (event.type() == QEvent.ActivationChange and self.isActiveWindow()
+                and hasattr(self, "change_poll_timer") and self._change_poll_interval > CHANGE_POLL_MIN_MS):
+            self._change_poll_interval = CHANGE_POLL_MIN_MS
+            self.poll_external_changes()
+
+    # --- API HTTP (OPCIONAL) ---
+
+    def _start_api_server(self):
+        """ Inicia a API só de leitura (AGENDA_API_PORT) em uma thread própria. """
+        from agenda_api import ApiServer  # Só quando ligada
+
+        try:
+            server = ApiServer(self.db_name, port=int(API_PORT))
+            server.start_in_thread()
+        except (ValueError, OSError, DataManagerError) as e:
+            print(f"Não foi possível iniciar a API HTTP na porta {API_PORT}: {e}")
+            return
+        self.api_server = server
+        print(f"API HTTP da agenda em http://{server.host}:{server.port}/")
+
     def closeEvent(self, event):
+        if self.api_server is not None:
+            self.api_server.stop()
         self.db_manager.close()
         event.accept()
 
-if __name__ == '__main__':
-    # Verifica se está sendo executado como um executável PyInstaller
-    if getattr(sys, 'frozen', False):
-        application_path = os.path.dirname(sys.executable)
-    else:
-        application_path = os.path.dirname(os.path.abspath(__file__))
-
+def main(db_name='agenda.db'):
+    """ Abre a agenda. Opções: --profile-startup (tempos por fase), --quit-after-startup e --no-update-check. """
     app = QApplication(sys.argv)
-    window = AgendaApp()
+    profiler.mark("QApplication criada")
+    window = AgendaApp(
+        db_name,
+        check_updates="--no-update-check" not in sys.argv,
+        quit_after_startup="--quit-after-startup" in sys.argv,
+    )
     window.showMaximized()
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
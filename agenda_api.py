@@ -0,0 +1,405 @@
+""" API HTTP/JSON local e só de leitura sobre o DataManager (painel de despacho, atalhos do celular).
+
+Servidor asyncio sem dependências externas. As consultas rodam em um pool
+de threads, cada uma com a própria conexão só de leitura (DataManager com
+read_only=True): várias respostas são montadas ao mesmo tempo e nenhuma
+disputa a conexão da interface.
+
+Endpoints (GET ou HEAD, respostas em JSON):
+    /day/AAAA-MM-DD                       compromissos do dia (sem data: hoje)
+    /range?start=AAAA-MM-DD&end=...       compromissos do intervalo (até MAX_RANGE_DAYS dias)
+    /search?q=texto&limit=50&offset=0     busca textual
+    /future?after=CHAVE&limit=50          próximos compromissos, página a página
+    /past?before=CHAVE&limit=50           compromissos passados, do mais recente ao mais antigo
+
+As listas vêm em {"rows": [...], "next": ...}; "next" é o valor de
+after/before/offset da página seguinte (null na última). A CHAVE de
+paginação é "data,hora,id".
+
+Toda resposta leva um ETag ligado à versão dos dados (PRAGMA data_version
+de uma conexão só do servidor, que muda a cada escrita de qualquer
+instância da agenda). Um If-None-Match com o ETag atual responde 304 sem
+corpo e sem consultar o banco, então os clientes podem perguntar a cada
+poucos segundos quase de graça.
+
+Uso:
+    python agenda_api.py --db agenda.db --port 8765 --readers 4
+Na agenda, a variável AGENDA_API_PORT liga o servidor junto com a janela.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from database import PAGE_SIZE, Appointment, DataManager, DataManagerError
+
+
+DEFAULT_HOST = "127.0.0.1"  # Só a própria máquina; outro endereço expõe a agenda na rede
+DEFAULT_PORT = 8765
+# Conexões só de leitura (uma por thread do pool)
+DEFAULT_READERS = min(4, os.cpu_count() or 1)
+
+# Limites dos parâmetros
+MAX_PAGE_SIZE = 500
+MAX_RANGE_DAYS = 366
+
+
+class ApiError(Exception):
+    """ Pedido inválido: vira uma resposta de erro com `status` e a mensagem em JSON. """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- PARÂMETROS ---
+
+def _date_param(value, name):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name}: data inválida {value!r} (use AAAA-MM-DD)")
+
+
+def _int_param(query, name, default, minimum, maximum):
+    value = query.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name}: número inválido {value!r}")
+    if not minimum <= value <= maximum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name}: use um valor de {minimum} a {maximum}")
+    return value
+
+
+def _key_param(query, name):
+    """ Chave de paginação "data,hora,id" (None se ausente). """
+    value = query.get(name)
+    if not value:
+        return None
+    parts = value.split(",")
+    try:
+        if len(parts) != 3:
+            raise ValueError
+        return (_date_param(parts[0], name), parts[1], int(parts[2]))
+    except (ApiError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name}: chave inválida {value!r} (use data,hora,id)")
+
+
+def _format_key(row):
+    return ",".join(str(part) for part in row.page_key)
+
+
+def appointment_json(row):
+    """ Appointment como dicionário: id, os campos de COMPROMISSO_FIELDS e recorrencia_id. """
+    return {field: getattr(row, field) for field in Appointment.__slots__}
+
+
+def _page(rows, limit, next_value):
+    return {"rows": [appointment_json(row) for row in rows], "next": next_value if len(rows) == limit else None}
+
+
+# --- ENDPOINTS (rodam nas threads do pool, cada uma com o próprio DataManager) ---
+
+def get_day(data_manager, argument, query):
+    data = _date_param(argument, "data") if argument else date.today().isoformat()
+    return {"date": data, "rows": [appointment_json(row) for row in data_manager.get_compromissos_by_date(data)]}
+
+
+def get_range(data_manager, argument, query):
+    start = _date_param(query.get("start"), "start")
+    end = _date_param(query.get("end"), "end")
+    days = (date.fromisoformat(end) - date.fromisoformat(start)).days
+    if not 0 <= days < MAX_RANGE_DAYS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"start/end: use um intervalo de 1 a {MAX_RANGE_DAYS} dias")
+    rows = data_manager.get_compromissos_between(start, end)
+    return {"start": start, "end": end, "rows": [appointment_json(row) for row in rows]}
+
+
+def get_search(data_manager, argument, query):
+    text = query.get("q", "").strip()
+    if not text:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "q: informe o texto da busca")
+    limit = _int_param(query, "limit", PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_param(query, "offset", 0, 0, sys.maxsize)
+    rows = data_manager.search(text, limit, offset)
+    return _page(rows, limit, offset + len(rows))
+
+
+def get_future(data_manager, argument, query):
+    limit = _int_param(query, "limit", PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    rows = data_manager.get_future_appointments_page(_key_param(query, "after"), limit)
+    return _page(rows, limit, _format_key(rows[-1]) if rows else None)
+
+
+def get_past(data_manager, argument, query):
+    limit = _int_param(query, "limit", PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    rows = data_manager.get_past_appointments_page(_key_param(query, "before"), limit)
+    return _page(rows, limit, _format_key(rows[-1]) if rows else None)
+
+
+ROUTES = {
+    "day": get_day,
+    "range": get_range,
+    "search": get_search,
+    "future": get_future,
+    "past": get_past,
+}
+
+
+# --- SERVIDOR ---
+
+class ApiServer:
+    """ Servidor HTTP/1.1 (keep-alive) da API, com o pool de conexões só de leitura.
+
+    `start()` roda no loop asyncio de quem chama; `start_in_thread()` cria
+    uma thread com loop próprio (usado pela janela da agenda).
+    """
+
+    def __init__(self, db_name='agenda.db', host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS):
+        self.db_name = db_name
+        self.host = host
+        self.port = port
+        self.readers = readers
+        self.requests_served = 0
+        self.not_modified = 0
+        self._local = threading.local()
+        self._managers = []  # Conexões do pool (uma por thread), fechadas em close()
+        self._managers_lock = threading.Lock()
+        self._executor = None
+        self._server = None
+        self._version_manager = None
+        self._generation = 0
+        self._data_version = None
+        self._etag_prefix = os.urandom(4).hex()  # Um servidor reiniciado não reaproveita ETags
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        """ Abre a conexão de versão (falha já aqui se o banco não existe ou está desatualizado) e escuta. """
+        self._version_manager = DataManager(self.db_name, read_only=True, day_cache_size=0)
+        self._data_version = self._version_manager.get_data_version()
+        self._executor = ThreadPoolExecutor(self.readers, thread_name_prefix="agenda-api")
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # Com port=0, a porta escolhida pelo sistema
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        # Com o pool encerrado, nenhuma thread usa mais as conexões
+        with self._managers_lock:
+            managers, self._managers = self._managers, []
+        for data_manager in managers:
+            data_manager.close()
+        if self._version_manager is not None:
+            self._version_manager.close()
+
+    def start_in_thread(self):
+        """ Roda o servidor em uma thread daemon com loop próprio; retorna quando ele já escuta. """
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                self._loop.close()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.close())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="agenda-api", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+
+    def stop(self):
+        """ Para o servidor iniciado por start_in_thread. """
+        if self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    # --- ETag ---
+
+    def current_etag(self):
+        """ ETag da versão atual dos dados (e do dia, que muda o que é futuro e passado). """
+        version = self._version_manager.get_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._generation += 1
+        return f'"{self._etag_prefix}.{self._generation}.{date.today().isoformat()}"'
+
+    @staticmethod
+    def _matches(if_none_match, etag):
+        if if_none_match is None:
+            return False
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+    # --- Pedidos ---
+
+    def _render(self, handler, argument, query):
+        """ Executa o endpoint na thread do pool e devolve o corpo JSON já codificado. """
+        data_manager = getattr(self._local, "data_manager", None)
+        if data_manager is None:
+            data_manager = self._local.data_manager = DataManager(self.db_name, read_only=True)
+            with self._managers_lock:
+                self._managers.append(data_manager)
+        return json.dumps(handler(data_manager, argument, query), ensure_ascii=False).encode("utf-8")
+
+    async def _respond(self, method, target, headers):
+        """ Retorna (status, cabeçalhos extras, corpo) do pedido. """
+        if method not in ("GET", "HEAD"):
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "a API é só de leitura (use GET)")
+        url = urlsplit(target)
+        segments = [unquote(segment) for segment in url.path.split("/") if segment]
+        handler = ROUTES.get(segments[0]) if segments else None
+        if handler is None or len(segments) > 2:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"endpoint desconhecido {url.path!r}")
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        try:
+            etag = self.current_etag()
+        except sqlite3.Error as e:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, f"banco de dados indisponível: {e}")
+        extra_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self._matches(headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return HTTPStatus.NOT_MODIFIED, extra_headers, b""
+
+        argument = segments[1] if len(segments) > 1 else None
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._render, handler, argument, query
+            )
+        except DataManagerError as e:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        except sqlite3.Error as e:
+            # Leituras não são repetidas: banco travado por um escritor ou arquivo danificado
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, f"banco de dados indisponível: {e}")
+        return HTTPStatus.OK, extra_headers, body
+
+    async def _handle_client(self, reader, writer):
+        """ Atende os pedidos de uma conexão em sequência enquanto o cliente a mantiver aberta.
+
+        Um erro inesperado responde 500 e fecha a conexão.
+        """
+        responding = False
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                keep_alive = False
+                if len(parts) != 3:
+                    status, extra_headers, body = HTTPStatus.BAD_REQUEST, {}, _error_body("pedido HTTP inválido")
+                else:
+                    method, target, version = parts
+                    connection = headers.get("connection", "").lower()
+                    # Pedidos com corpo não são lidos: a conexão é fechada depois da resposta
+                    keep_alive = ("content-length" not in headers and "transfer-encoding" not in headers
+                                  and (connection == "keep-alive" or version == "HTTP/1.1" and connection != "close"))
+                    try:
+                        status, extra_headers, body = await self._respond(method, target, headers)
+                    except ApiError as e:
+                        status, extra_headers, body = e.status, {}, _error_body(str(e))
+                        if e.status == HTTPStatus.METHOD_NOT_ALLOWED:
+                            extra_headers["Allow"] = "GET, HEAD"
+                    except Exception as e:
+                        status, extra_headers, body = (HTTPStatus.INTERNAL_SERVER_ERROR, {},
+                                                       _error_body(f"erro interno: {e}"))
+                        keep_alive = False
+                self.requests_served += 1
+
+                responding = True
+                head = _response_head(status, extra_headers, len(body), keep_alive)
+                writer.write(head if parts[0] == "HEAD" else head + body)
+                await writer.drain()
+                responding = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Cliente desconectou no meio do pedido, ou linha longa demais (ValueError do StreamReader)
+        except Exception as e:
+            if not responding:
+                body = _error_body(f"erro interno: {e}")
+                writer.write(_response_head(HTTPStatus.INTERNAL_SERVER_ERROR, {}, len(body), False) + body)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+        finally:
+            writer.close()
+
+
+def _error_body(message):
+    return json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+
+
+def _response_head(status, extra_headers, content_length, keep_alive):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    if status != HTTPStatus.NOT_MODIFIED:
+        lines.append("Content-Type: application/json; charset=utf-8")
+        lines.append(f"Content-Length: {content_length}")
+    lines.extend(f"{name}: {value}" for name, value in extra_headers.items())
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _serve(server):
+    await server.start()
+    print(f"API da agenda em http://{server.host}:{server.port}/ ({server.readers} conexões de leitura)",
+          file=sys.stderr, flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="agenda.db",
+                        help="banco de dados (nome dentro da pasta Data ou caminho absoluto; padrão: agenda.db)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="conexões só de leitura no pool")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_serve(ApiServer(args.db, args.host, args.port, args.readers)))
+    except (DataManagerError, OSError) as e:
+        print(f"Erro ao iniciar a API: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
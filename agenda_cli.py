@@ -0,0 +1,217 @@
+""" Linha de comando da agenda, sem interface gráfica (agendador de tarefas, máquinas sem tela).
+
+Usa o DataManager diretamente e nunca importa o PyQt5 nem o updater, então
+abre em poucos milissegundos. As listagens e a exportação saem em fluxo,
+lote a lote, em CSV ou JSON Lines: intervalos grandes podem ser
+redirecionados para outro programa sem carregar tudo na memória.
+
+Uso:
+    python agenda_cli.py list-day 2025-03-10
+    python agenda_cli.py list-range 2025-01-01 2025-12-31 --format jsonl | gzip > 2025.jsonl.gz
+    python agenda_cli.py export backup.csv
+    python agenda_cli.py import novos.csv
+    python agenda_cli.py archive --days 730
+    python agenda_cli.py vacuum
+    python agenda_cli.py stats
+
+`--db` escolhe o banco (nome dentro da pasta Data, como na interface, ou um
+caminho absoluto). Erros saem no stderr com código de saída 1.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date
+
+from database import DEFAULT_ARCHIVE_AGE_DAYS, Appointment, DataManager, DataManagerError
+import csv_io
+
+
+# Linhas lidas do banco por vez nas listagens e na exportação
+STREAM_BATCH_SIZE = 1000
+
+FORMATS = ("csv", "jsonl")
+# Colunas das listagens: as da exportação mais a série das ocorrências (vazia nos compromissos avulsos)
+LIST_FIELDS = csv_io.EXPORT_FIELDS + ("recorrencia_id",)
+
+
+def _iso_date(value):
+    """ Tipo do argparse para datas AAAA-MM-DD. """
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida '{value}' (use AAAA-MM-DD)")
+
+
+def _open_output(path):
+    """ Arquivo de saída em UTF-8, sem tradução de fim de linha (o módulo csv já grava \\r\\n).
+
+    "-" é a saída padrão, reaberta com a mesma configuração sem fechá-la.
+    """
+    if path == "-":
+        return open(sys.stdout.fileno(), "w", encoding="utf-8", newline="", closefd=False)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _list_values(row):
+    return row.as_tuple() + (row.recorrencia_id,)
+
+
+def write_rows(rows, out, output_format, fields=LIST_FIELDS, values=_list_values):
+    """ Grava as linhas uma a uma em `out`, em CSV (com cabeçalho) ou JSON Lines; retorna quantas.
+
+    `values(row)` dá os valores de cada linha na ordem de `fields`.
+    """
+    written = 0
+    if output_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(values(row))
+            written += 1
+        return written
+
+    for row in rows:
+        out.write(json.dumps(dict(zip(fields, values(row))), ensure_ascii=False))
+        out.write("\n")
+        written += 1
+    return written
+
+
+# --- SUBCOMANDOS (cada um recebe o DataManager e os argumentos; retorna o código de saída) ---
+
+def cmd_list_day(data_manager, args):
+    with _open_output(args.output) as out:
+        write_rows(data_manager.get_compromissos_by_date(args.data), out, args.format)
+    return 0
+
+
+def cmd_list_range(data_manager, args):
+    if args.fim < args.inicio:
+        print("Erro: o fim do intervalo é anterior ao início.", file=sys.stderr)
+        return 1
+    rows = data_manager.get_compromissos_between(args.inicio, args.fim, STREAM_BATCH_SIZE)
+    with _open_output(args.output) as out:
+        write_rows(rows, out, args.format)
+    return 0
+
+
+def cmd_export(data_manager, args):
+    """ Todos os compromissos (inclusive os arquivados); em CSV, no formato aceito por `import`. """
+    rows = data_manager.iter_all_compromissos(STREAM_BATCH_SIZE)
+    with _open_output(args.output) as out:
+        written = write_rows(rows, out, args.format, csv_io.EXPORT_FIELDS, Appointment.as_tuple)
+    print(f"{written} compromisso(s) exportado(s).", file=sys.stderr)
+    return 0
+
+
+def cmd_import(data_manager, args):
+    report = csv_io.import_csv(data_manager, args.arquivo, args.batch_size)
+    print(report.summary(), file=sys.stderr)
+    # Linhas rejeitadas fazem a tarefa agendada acusar falha
+    return 1 if report.rejected else 0
+
+
+def cmd_archive(data_manager, args):
+    moved = data_manager.archive_older_than(args.days)
+    print(f"{moved} compromisso(s) arquivado(s) em {data_manager.archive_path}.", file=sys.stderr)
+    return 0
+
+
+def cmd_vacuum(data_manager, args):
+    size_before = os.path.getsize(data_manager.db_path)
+    size_after = data_manager.vacuum()
+    print(f"{data_manager.db_path}: {size_before} -> {size_after} bytes.", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(data_manager, args):
+    stats = data_manager.get_stats()
+    start, end = args.inicio, args.fim
+    stats["by_responsavel"] = [
+        {"quem_vai": nome, "appointments": quantidade}
+        for nome, quantidade in data_manager.count_by_responsavel(start, end)
+    ]
+    if start is not None:
+        stats["by_responsavel_range"] = [start, end]
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="agenda_cli", description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="agenda.db",
+                        help="banco de dados (nome dentro da pasta Data ou caminho absoluto; padrão: agenda.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="comando")
+
+    def add_output_options(subparser):
+        subparser.add_argument("--format", choices=FORMATS, default="csv", help="formato da saída (padrão: csv)")
+        subparser.add_argument("-o", "--output", default="-", help="arquivo de saída ('-' = saída padrão)")
+
+    list_day = subparsers.add_parser("list-day", help="compromissos de um dia")
+    list_day.add_argument("data", type=_iso_date, nargs="?", default=date.today().isoformat(),
+                          help="dia (padrão: hoje)")
+    add_output_options(list_day)
+    list_day.set_defaults(func=cmd_list_day)
+
+    list_range = subparsers.add_parser("list-range", help="compromissos de um intervalo, em ordem de data e hora")
+    list_range.add_argument("inicio", type=_iso_date)
+    list_range.add_argument("fim", type=_iso_date)
+    add_output_options(list_range)
+    list_range.set_defaults(func=cmd_list_range)
+
+    export = subparsers.add_parser("export", help="todos os compromissos (o CSV é aceito por import; JSONL não)")
+    export.add_argument("output", nargs="?", default="-", help="arquivo de saída ('-' = saída padrão)")
+    export.add_argument("--format", choices=FORMATS, default="csv", help="formato da saída (padrão: csv)")
+    export.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser("import", help="importa um CSV (mesmas regras da interface)")
+    import_parser.add_argument("arquivo")
+    import_parser.add_argument("--batch-size", type=int, default=csv_io.IMPORT_BATCH_SIZE,
+                               help="linhas por transação")
+    import_parser.set_defaults(func=cmd_import)
+
+    archive = subparsers.add_parser("archive", help="move os compromissos antigos para o arquivo")
+    archive.add_argument("--days", type=int, default=DEFAULT_ARCHIVE_AGE_DAYS,
+                         help=f"idade mínima em dias (padrão: {DEFAULT_ARCHIVE_AGE_DAYS})")
+    archive.set_defaults(func=cmd_archive)
+
+    vacuum = subparsers.add_parser("vacuum", help="compacta o banco e o arquivo")
+    vacuum.set_defaults(func=cmd_vacuum)
+
+    stats = subparsers.add_parser("stats", help="números gerais do banco, em JSON")
+    stats.add_argument("--inicio", type=_iso_date, help="início do intervalo da contagem por responsável")
+    stats.add_argument("--fim", type=_iso_date, help="fim do intervalo da contagem por responsável")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "stats" and (args.inicio is None) != (args.fim is None):
+        parser.error("stats: informe --inicio e --fim juntos")
+
+    try:
+        data_manager = DataManager(args.db)
+    except (DataManagerError, OSError, ValueError) as e:
+        print(f"Erro ao abrir o banco de dados: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        return args.func(data_manager, args)
+    except BrokenPipeError:
+        # Leitor da saída fechou antes do fim (ex.: `| head`): encerra sem rastro
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except (DataManagerError, OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    finally:
+        data_manager.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
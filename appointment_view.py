@@ -0,0 +1,573 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QDate, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPen
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+
+# Papéis extras expostos pelo modelo (Qt.UserRole continua sendo o id)
+DateRole = Qt.UserRole + 1   # QDate do compromisso
+RowRole = Qt.UserRole + 2    # Appointment completo da linha
+DayHeaderRole = Qt.UserRole + 3  # Título do cabeçalho de dia (visões de semana/mês)
+
+# Marca das ocorrências de séries (compromissos que se repetem)
+RECURRENCE_MARK = "↻"
+
+# --- FUNÇÕES AUXILIARES GLOBAIS ---
+
+def get_color_by_type(tipo_visita):
+    """ Mapeia o tipo de visita para uma cor de fundo. """
+    colors = {
+        "Treinamento": "#c6ffc6",
+        "Visita Técnica": "#ffecc2",
+        "Outro": "#96fffa",
+    }
+    return colors.get(tipo_visita, "#ffffff")
+
+def appointment_identity(row):
+    """ Chave que identifica o mesmo compromisso antes e depois de uma edição.
+
+    Ocorrências de séries não têm id próprio: valem a série e a data.
+    """
+    if row.recorrencia_id is not None:
+        return ("serie", row.recorrencia_id, row.data)
+    return row.id
+
+def format_local_display(local_visita, endereco):
+    """ Texto exibido para o local, incluindo o endereço nas visitas ao cliente. """
+    if local_visita == "No Cliente" and endereco:
+        return f"No Cliente ({endereco})"
+    return local_visita
+
+# --- MODELO DE LISTA DE COMPROMISSOS ---
+
+class AppointmentListModel(QAbstractListModel):
+    """ Modelo sobre uma lista de Appointment (database.Appointment).
+
+    Quando não há linhas, expõe um único item não selecionável com `empty_text`.
+    Para listas paginadas, `set_rows`/`append_rows` recebem `has_more` e o
+    modelo emite `more_requested` quando a view pede mais itens (fetchMore).
+
+    Depois de uma escrita, `replace_row` insere, move ou remove só o item
+    afetado, mantendo a ordem por data/hora (e a seleção e a rolagem da
+    view). `reset_count` e `patch_count` contam as recargas completas e as
+    atualizações pontuais, para conferir que uma edição não recarrega a lista
+    (a troca entre lista vazia e primeira linha é uma recarga e conta ali).
+    """
+    more_requested = pyqtSignal()
+
+    def __init__(self, empty_text="", show_date=False, lighten=100, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.empty_text = empty_text
+        self.show_date = show_date
+        self.lighten = lighten
+        self._has_more = False
+        self._fetching = False
+        self._message = None
+        self._brushes = {}
+        self.reset_count = 0
+        self.patch_count = 0
+
+    # --- Carga de dados ---
+
+    def set_rows(self, rows, has_more=False, message=None):
+        """ Substitui todas as linhas do modelo.
+
+        `message` substitui `empty_text` no item de aviso enquanto a lista
+        estiver vazia (ex.: "Carregando...").
+        """
+        self.beginResetModel()
+        self.rows = list(rows)
+        self._has_more = has_more
+        self._fetching = False
+        self._message = message
+        self.endResetModel()
+        self.reset_count += 1
+
+    def append_rows(self, rows, has_more=False):
+        """ Acrescenta uma página de linhas ao fim do modelo. """
+        self._fetching = False
+        self._has_more = has_more
+        if not rows:
+            return
+        if not self.rows:
+            # Sai do estado "lista vazia" (item de aviso) de uma vez
+            self.set_rows(rows, has_more)
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def replace_row(self, old, new):
+        """ Aplica uma escrita: `old` é a linha exibida antes dela e `new`, a linha depois (None = nenhuma).
+
+        A linha de `old` é substituída no lugar, movida para a posição da nova
+        hora ou removida; sem `old` na lista, `new` é inserido na sua posição.
+        """
+        index = self._index_of(old) if old is not None else None
+        if new is None:
+            if index is not None:
+                self._remove_at(index)
+        elif index is None:
+            self._insert_at(self._position_for(new), new)
+        else:
+            self._move_to(index, self._position_for(new, skip=index), new)
+        self.patch_count += 1
+
+    def merge_rows(self, rows, has_more=None):
+        """ Leva a lista a `rows`, na ordem recebida, inserindo, movendo ou removendo só as linhas que mudaram.
+
+        Usado quando outra instância alterou o banco: as linhas iguais ficam
+        intactas, com a seleção e a rolagem. A ordem é a de `rows` (a consulta
+        pode listar do mais recente ao mais antigo, ou por relevância).
+        `has_more` (None = manter) atualiza se ainda há páginas a buscar.
+        Retorna quantas linhas mudaram.
+        """
+        if has_more is not None:
+            self._has_more = has_more
+            self._fetching = False
+        fresh = {self._identity(row) for row in rows}
+        changed = 0
+        for index in reversed(range(len(self.rows))):
+            if self._identity(self.rows[index]) not in fresh:
+                self._remove_at(index)
+                changed += 1
+        # As linhas antes de `position` já estão no lugar; a procura começa nela
+        for position, row in enumerate(rows):
+            identity = self._identity(row)
+            index = next((index for index in range(position, len(self.rows))
+                          if self._identity(self.rows[index]) == identity), None)
+            if index is None:
+                self._insert_at(position, row)
+            elif index != position or self.rows[index] != row:
+                self._move_to(index, position, row)
+            else:
+                continue
+            changed += 1
+        self.patch_count += changed
+        return changed
+
+    def _identity(self, item):
+        return appointment_identity(item)
+
+    def _sort_key(self, item):
+        return item.page_key
+
+    def _index_of(self, item):
+        identity = self._identity(item)
+        for index, row in enumerate(self.rows):
+            if self._identity(row) == identity:
+                return index
+        return None
+
+    def _position_for(self, item, skip=None):
+        """ Índice em que `item` entra para manter a ordem (sem contar a linha `skip`, que vai sair). """
+        keys = [self._sort_key(row) for index, row in enumerate(self.rows) if index != skip]
+        return bisect_right(keys, self._sort_key(item))
+
+    def _insert_at(self, position, item):
+        if not self.rows:
+            # O item de aviso dá lugar à linha. A altura dos dois difere e a view
+            # usa itens uniformes: só uma recarga refaz o layout
+            self.beginResetModel()
+            self.rows.append(item)
+            self._message = None
+            self.endResetModel()
+            self.reset_count += 1
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, item)
+        self.endInsertRows()
+
+    def _remove_at(self, index):
+        if len(self.rows) == 1:
+            # A última linha dá lugar ao item de aviso (recarga, como em _insert_at)
+            self.beginResetModel()
+            self.rows.clear()
+            self._message = None
+            self.endResetModel()
+            self.reset_count += 1
+            return
+        self.beginRemoveRows(QModelIndex(), index, index)
+        del self.rows[index]
+        self.endRemoveRows()
+
+    def _move_to(self, index, position, item):
+        """ Troca a linha `index` por `item` na posição `position` (contada sem ela); a view mantém a seleção. """
+        if position != index:
+            # beginMoveRows conta o destino com a linha ainda no lugar antigo
+            self.beginMoveRows(QModelIndex(), index, index, QModelIndex(), position + 1 if position > index else position)
+            del self.rows[index]
+            self.rows.insert(position, item)
+            self.endMoveRows()
+        else:
+            self.rows[index] = item
+        self.dataChanged.emit(self.index(position), self.index(position))
+
+    def row_at(self, index):
+        """ Retorna o Appointment no índice, ou None para o item de aviso. """
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        return self.rows[index.row()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetching = True
+            self.more_requested.emit()
+
+    # --- Interface do QAbstractListModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows) or 1
+
+    def flags(self, index):
+        if self.row_at(index) is None:
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = self.row_at(index)
+        if row is None:
+            if role == Qt.DisplayRole and index.isValid():
+                return self._message or self.empty_text
+            return None
+
+        if role == Qt.DisplayRole:
+            return f"{self.display_hora(row)} - {row.nome_cliente}"
+        if role == Qt.UserRole:
+            return row.id
+        if role == DateRole:
+            return QDate.fromString(row.data, "yyyy-MM-dd")
+        if role == RowRole:
+            return row
+        if role == Qt.BackgroundRole:
+            return self._background_for(row.tipo_visita)
+        return None
+
+    def display_hora(self, row):
+        """ Hora (e término, se informado) exibida na primeira linha, prefixada pela data (dd/MM) se configurado.
+
+        Ocorrências de séries levam a marca RECURRENCE_MARK.
+        """
+        hora = f"{row.hora}-{row.hora_fim}" if row.hora_fim else row.hora
+        if row.recorrencia_id is not None:
+            hora = f"{hora} {RECURRENCE_MARK}"
+        if self.show_date:
+            return f"[{row.data[8:10]}/{row.data[5:7]}] {hora}"
+        return hora
+
+    def _background_for(self, tipo_visita):
+        color = self._brushes.get(tipo_visita)
+        if color is None:
+            color = QColor(get_color_by_type(tipo_visita)).lighter(self.lighten)
+            self._brushes[tipo_visita] = color
+        return color
+
+# --- MODELO DAS VISÕES DE SEMANA E MÊS ---
+
+class DayHeader:
+    """ Item de cabeçalho que separa os dias na lista agrupada. """
+    __slots__ = ("data", "title")
+
+    def __init__(self, data, title):
+        self.data = data
+        self.title = title
+
+
+class AgendaRangeModel(AppointmentListModel):
+    """ Lista de um intervalo de datas agrupada por dia (cabeçalho + compromissos).
+
+    Guarda os dias já consultados de um trecho contíguo (`covered`); ao
+    mudar o intervalo exibido, `missing_ranges` informa apenas os trechos
+    que ainda precisam ir ao banco.
+    """
+    # Dias mantidos além do intervalo exibido (para voltar sem nova consulta)
+    KEEP_MARGIN_DAYS = 62
+
+    def __init__(self, empty_text="", parent=None):
+        super().__init__(empty_text, parent=parent)
+        self._days = {}       # data -> linhas do dia (só dias com compromissos)
+        self.covered = None   # (início, fim) já consultados, AAAA-MM-DD inclusive
+        self.visible = None   # (início, fim) exibidos
+
+    def missing_ranges(self, start, end):
+        """ Trechos de [start, end] ainda não consultados, como [(início, fim)]. """
+        if self.covered is None:
+            return [(start, end)]
+        covered_start, covered_end = self.covered
+        if end < covered_start or start > covered_end:
+            return [(start, end)]
+        missing = []
+        if start < covered_start:
+            missing.append((start, _shift(covered_start, -1)))
+        if end > covered_end:
+            missing.append((_shift(covered_end, 1), end))
+        return missing
+
+    def add_days(self, start, end, days):
+        """ Incorpora o resultado de get_agenda_days(start, end) ao trecho consultado. """
+        if self.covered is None or not self._touches(start, end):
+            # Trecho separado do anterior: recomeça (o cache precisa ser contíguo)
+            self._days = {}
+            self.covered = (start, end)
+        else:
+            self.covered = (min(self.covered[0], start), max(self.covered[1], end))
+        for data, rows in days:
+            self._days[data] = rows
+
+    def _touches(self, start, end):
+        covered_start, covered_end = self.covered
+        return _shift(end, 1) >= covered_start and _shift(start, -1) <= covered_end
+
+    def show_range(self, start, end, has_more=True):
+        """ Exibe [start, end] com os dias já consultados, em uma passagem pelas datas ordenadas. """
+        self.visible = (start, end)
+        items = []
+        for data in sorted(data for data in self._days if start <= data <= end):
+            items.append(self._header_for(data))
+            items.extend(self._days[data])
+        self._trim(start, end)
+        self.set_rows(items, has_more)
+
+    def _header_for(self, data):
+        title = QDate.fromString(data, "yyyy-MM-dd").toString("dddd, dd/MM/yyyy")
+        return DayHeader(data, f"{title}  ({len(self._days.get(data, ()))})")
+
+    def has_days(self, start, end):
+        """ Indica se algum dia já consultado de [start, end] tem compromissos. """
+        return any(start <= data <= end for data in self._days)
+
+    def invalidate(self):
+        """ Esquece os dias consultados (após uma escrita); o intervalo exibido continua o mesmo. """
+        self._days = {}
+        self.covered = None
+
+    def _trim(self, start, end):
+        """ Limita o trecho guardado a KEEP_MARGIN_DAYS além do exibido. """
+        low = _shift(start, -self.KEEP_MARGIN_DAYS)
+        high = _shift(end, self.KEEP_MARGIN_DAYS)
+        if self.covered is None or (self.covered[0] >= low and self.covered[1] <= high):
+            return
+        self.covered = (max(self.covered[0], low), min(self.covered[1], high))
+        self._days = {data: rows for data, rows in self._days.items() if low <= data <= high}
+
+    # --- Atualização pontual após uma escrita ---
+
+    def replace_row(self, old, new):
+        """ Como em AppointmentListModel, mantendo em dia os dias consultados e os cabeçalhos (e suas contagens). """
+        if old is not None:
+            self._replace_in_day(old.data, old, None)
+        if new is not None and self.covered is not None and self.covered[0] <= new.data <= self.covered[1]:
+            self._replace_in_day(new.data, None, new)
+
+        shown = new if new is not None and self._is_visible(new.data) else None
+        if shown is not None and self._index_of(DayHeader(new.data, "")) is None:
+            header = self._header_for(new.data)
+            self._insert_at(self._position_for(header), header)
+        super().replace_row(old, shown)
+
+        for data in {row.data for row in (old, new) if row is not None}:
+            self._refresh_header(data)
+
+    def _replace_in_day(self, data, old, new):
+        rows = [row for row in self._days.get(data, ())
+                if old is None or appointment_identity(row) != appointment_identity(old)]
+        if new is not None:
+            rows.insert(bisect_right([row.page_key for row in rows], new.page_key), new)
+        if rows:
+            self._days[data] = tuple(rows)
+        else:
+            self._days.pop(data, None)
+
+    def _refresh_header(self, data):
+        """ Atualiza a contagem do cabeçalho do dia, ou o remove se o dia ficou sem compromissos. """
+        index = self._index_of(DayHeader(data, ""))
+        if index is None:
+            return
+        if data not in self._days:
+            self._remove_at(index)
+            return
+        self.rows[index] = self._header_for(data)
+        self.dataChanged.emit(self.index(index), self.index(index))
+
+    def _is_visible(self, data):
+        return self.visible is not None and self.visible[0] <= data <= self.visible[1]
+
+    def _identity(self, item):
+        if isinstance(item, DayHeader):
+            return ("dia", item.data)
+        return appointment_identity(item)
+
+    def _sort_key(self, item):
+        # O cabeçalho vem antes de qualquer compromisso do seu dia
+        if isinstance(item, DayHeader):
+            return (item.data,)
+        return item.page_key
+
+    # --- Itens de cabeçalho ---
+
+    def row_at(self, index):
+        item = super().row_at(index)
+        return None if isinstance(item, DayHeader) else item
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and index.row() < len(self.rows):
+            item = self.rows[index.row()]
+            if isinstance(item, DayHeader):
+                if role in (Qt.DisplayRole, DayHeaderRole):
+                    return item.title
+                if role == DateRole:
+                    return QDate.fromString(item.data, "yyyy-MM-dd")
+                return None
+        return super().data(index, role)
+
+
+def _shift(data, days):
+    """ Soma `days` dias a uma data AAAA-MM-DD. """
+    return (date.fromisoformat(data) + timedelta(days=days)).isoformat()
+
+# --- DELEGATE: DESENHA O ITEM EM 3 LINHAS SEM WIDGETS POR LINHA ---
+
+class AppointmentDelegate(QStyledItemDelegate):
+    """ Pinta hora/cliente, tipo/local e responsável/observações diretamente com o QPainter. """
+    MARGIN = 5
+    LINE_SPACING = 4
+    COLUMN_SPACING = 15
+    TITLE_GAP = 5
+    MIN_HEIGHT = 80
+    EMPTY_HEIGHT = 40
+    HEADER_HEIGHT = 30
+
+    HEADER_BACKGROUND = QColor("#e8eef5")
+    CLIENT_COLOR = QColor("#00CED1")
+    TITLE_COLOR = QColor("#333333")
+    BORDER_COLOR = QColor("#f0f0f0")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._fonts_key = None
+        self._fonts = None
+        self._row_height = None
+
+    def _fonts_for(self, base_font):
+        """ Fontes e altura de linha derivadas da fonte da view (recalculadas só se ela mudar). """
+        key = base_font.key()
+        if key != self._fonts_key:
+            big = QFont(base_font)
+            big.setPointSize(14)
+            big.setBold(True)
+            title = QFont(base_font)
+            title.setBold(True)
+            content = QFont(base_font)
+            content.setPointSize(10)
+
+            self._fonts = (big, title, content)
+            self._fonts_key = key
+
+            small_height = max(QFontMetrics(title).height(), QFontMetrics(content).height())
+            self._row_height = max(
+                self.MIN_HEIGHT,
+                2 * self.MARGIN + QFontMetrics(big).height() + 2 * (self.LINE_SPACING + small_height),
+            )
+        return self._fonts
+
+    def sizeHint(self, option, index):
+        self._fonts_for(option.font)
+        if index.data(DayHeaderRole) is not None:
+            return QSize(option.rect.width(), self.HEADER_HEIGHT)
+        if index.data(RowRole) is None:
+            return QSize(option.rect.width(), self.EMPTY_HEIGHT)
+        return QSize(option.rect.width(), self._row_height)
+
+    def paint(self, painter, option, index):
+        header = index.data(DayHeaderRole)
+        if header is not None:
+            # Cabeçalho de dia nas visões de semana/mês
+            _, title_font, _ = self._fonts_for(option.font)
+            painter.save()
+            painter.fillRect(option.rect, self.HEADER_BACKGROUND)
+            painter.setFont(title_font)
+            painter.setPen(self.TITLE_COLOR)
+            painter.drawText(option.rect.adjusted(self.MARGIN, 0, -self.MARGIN, 0),
+                             Qt.AlignVCenter | Qt.AlignLeft, header)
+            painter.restore()
+            return
+
+        row = index.data(RowRole)
+        if row is None:
+            # Item de aviso ("Nenhum compromisso ...")
+            painter.save()
+            painter.setPen(self.TITLE_COLOR)
+            painter.drawText(option.rect.adjusted(self.MARGIN, 0, -self.MARGIN, 0),
+                             Qt.AlignVCenter | Qt.AlignLeft, index.data(Qt.DisplayRole) or "")
+            painter.restore()
+            return
+
+        big_font, title_font, content_font = self._fonts_for(option.font)
+        rect = option.rect
+
+        painter.save()
+        painter.setClipRect(rect)
+
+        # Fundo pela cor do tipo e destaque de seleção por cima
+        painter.fillRect(rect, index.data(Qt.BackgroundRole))
+        if option.state & QStyle.State_Selected:
+            highlight = QColor(option.palette.highlight().color())
+            highlight.setAlpha(70)
+            painter.fillRect(rect, highlight)
+        painter.setPen(QPen(self.BORDER_COLOR, 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+
+        x = rect.left() + self.MARGIN
+        right = rect.right() - self.MARGIN
+        y = rect.top() + self.MARGIN
+
+        # 1. LINHA PRINCIPAL (HORA E CLIENTE)
+        big_height = QFontMetrics(big_font).height()
+        hora_display = index.model().display_hora(row) if hasattr(index.model(), "display_hora") else row.hora
+        next_x = self._draw_text(painter, x, y, right, big_height, hora_display, big_font, self.TITLE_COLOR)
+        self._draw_text(painter, next_x + self.COLUMN_SPACING, y, right, big_height,
+                        row.nome_cliente, big_font, self.CLIENT_COLOR)
+        y += big_height + self.LINE_SPACING
+
+        line_height = max(QFontMetrics(title_font).height(), QFontMetrics(content_font).height())
+
+        # 2. SEGUNDA LINHA (TIPO E LOCAL/ENDEREÇO)
+        next_x = self._draw_pair(painter, x, y, right, line_height, "Tipo:", row.tipo_visita, title_font, content_font)
+        self._draw_pair(painter, next_x + self.COLUMN_SPACING, y, right, line_height,
+                        "Local:", format_local_display(row.local_visita, row.endereco), title_font, content_font)
+        y += line_height + self.LINE_SPACING
+
+        # 3. TERCEIRA LINHA (QUEM VAI? E OBSERVAÇÕES)
+        next_x = self._draw_pair(painter, x, y, right, line_height,
+                                 "Quem vai?:", row.quem_vai or 'Não Definido', title_font, content_font)
+        self._draw_pair(painter, next_x + self.COLUMN_SPACING, y, right, line_height,
+                        "Obs:", row.observacoes or 'Nenhuma', title_font, content_font)
+
+        painter.restore()
+
+    def _draw_pair(self, painter, x, y, right, height, title, value, title_font, content_font):
+        """ Desenha "Título: valor" e retorna a coordenada x onde o texto terminou. """
+        x = self._draw_text(painter, x, y, right, height, title, title_font, self.TITLE_COLOR)
+        return self._draw_text(painter, x + self.TITLE_GAP, y, right, height, value, content_font, self.TITLE_COLOR)
+
+    def _draw_text(self, painter, x, y, right, height, text, font, color):
+        """ Desenha uma linha de texto (com reticências se não couber) e retorna o x final. """
+        available = right - x
+        if available <= 0:
+            return x
+        metrics = QFontMetrics(font)
+        text = metrics.elidedText(str(text).replace("\n", " "), Qt.ElideRight, available)
+        width = metrics.horizontalAdvance(text)
+        painter.setFont(font)
+        painter.setPen(color)
+        painter.drawText(QRect(x, y, width + 1, height), Qt.AlignLeft | Qt.AlignVCenter, text)
+        return x + width
@@ -0,0 +1,208 @@
+""" Teste de carga da API HTTP (agenda_api.py): pedidos por segundo e percentis de latência.
+
+Gera um agenda.db sintético, sobe o servidor em um processo separado em
+localhost e abre `--clients` conexões keep-alive que repetem, durante
+`--seconds` segundos, uma mistura de pedidos: dia, semana, busca, páginas
+de futuros e passados e pedidos condicionais (If-None-Match com o ETag de
+uma resposta anterior, que devem voltar 304 sem consultar o banco).
+
+Com --write-every, um processo à parte grava um compromisso a cada N
+segundos, invalidando os ETags como outra instância da agenda faria.
+
+O cliente também é Python (asyncio, uma thread): em máquinas com poucos
+núcleos ele disputa a CPU com o servidor, então os números são um limite
+inferior.
+
+Uso:
+    python benchmarks/api_load_test.py --rows 1000000 --clients 16 --seconds 20 --readers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from multiprocessing import Process
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import DataManager
+from synthetic_data import generate_database
+
+SEARCH_TERMS = ("silva", "rua", "treinamento", "mercado", "souza", "barbacena")
+
+
+def _random_request(rng, etags):
+    """ (nome, caminho, If-None-Match) de um pedido da mistura. """
+    today = date.today()
+    day = today + timedelta(days=rng.randint(-365, 365))
+    kind = rng.random()
+    if kind < 0.35:
+        path = f"/day/{day.isoformat()}"
+        name = "day"
+    elif kind < 0.50:
+        path = f"/range?start={day.isoformat()}&end={(day + timedelta(days=6)).isoformat()}"
+        name = "range"
+    elif kind < 0.65:
+        path = f"/search?q={rng.choice(SEARCH_TERMS)}"
+        name = "search"
+    elif kind < 0.75:
+        path = "/future"
+        name = "future"
+    elif kind < 0.85:
+        path = "/past"
+        name = "past"
+    else:
+        # Cliente que consulta de novo o dia de hoje com o ETag que já tem
+        path = f"/day/{today.isoformat()}"
+        return "day_conditional", path, etags.get(path)
+    return name, path, None
+
+
+async def _client(host, port, deadline, seed, latencies, statuses, etags):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            name, path, etag = _random_request(rng, etags)
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if etag:
+                request += f"If-None-Match: {etag}\r\n"
+            started = time.perf_counter()
+            writer.write((request + "\r\n").encode("latin-1"))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length:
+                await reader.readexactly(length)
+            latencies[name].append(time.perf_counter() - started)
+
+            status = int(status_line.split()[1])
+            statuses[status] += 1
+            if status == 200 and "etag" in headers:
+                etags[path] = headers["etag"]
+    finally:
+        writer.close()
+
+
+def _write_periodically(db_path, interval, stop_at):
+    """ Outra "instância" (processo próprio) que grava um compromisso a cada `interval` segundos. """
+    dm = DataManager(db_path)
+    today = date.today().isoformat()
+    while time.time() < stop_at:
+        dm.add_compromisso(today, "12:00", "Carga", "Outro", "Escritório", "", "", "")
+        time.sleep(interval)
+    dm.close()
+
+
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 2)
+
+    return {"count": len(values), "p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99),
+            "max_ms": round(values[-1] * 1000, 2), "mean_ms": round(statistics.fmean(values) * 1000, 2)}
+
+
+async def _load(host, port, clients, seconds):
+    latencies = defaultdict(list)
+    statuses = Counter()
+    etags = {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, deadline, seed, latencies, statuses, etags) for seed in range(clients)
+    ))
+    return time.perf_counter() - started, latencies, statuses
+
+
+def _wait_for_server(host, port, process, timeout=60):
+    limit = time.time() + timeout
+    while time.time() < limit:
+        if process.poll() is not None:
+            raise RuntimeError("O servidor da API encerrou ao iniciar")
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection(host, port), 1))
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("O servidor da API não respondeu")
+
+
+def run(rows, clients, seconds, readers, data_dir, port, write_every):
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.abspath(os.path.join(data_dir, f"agenda_api_{rows}.db"))
+    if not os.path.exists(db_path):
+        print(f"Gerando {db_path} ({rows} compromissos)...", file=sys.stderr)
+        generate_database(db_path, rows)
+    DataManager(db_path).close()  # Garante o esquema atual antes das conexões só de leitura
+
+    host = "127.0.0.1"
+    server = subprocess.Popen([
+        sys.executable, os.path.join(ROOT_DIR, "agenda_api.py"),
+        "--db", db_path, "--host", host, "--port", str(port), "--readers", str(readers),
+    ])
+    writer = None
+    try:
+        _wait_for_server(host, port, server)
+        if write_every:
+            writer = Process(target=_write_periodically, args=(db_path, write_every, time.time() + seconds))
+            writer.start()
+        elapsed, latencies, statuses = asyncio.run(_load(host, port, clients, seconds))
+    finally:
+        if writer is not None:
+            writer.join()
+        server.terminate()
+        server.wait()
+
+    total = sum(statuses.values())
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "rows": rows,
+        "clients": clients,
+        "readers": readers,
+        "seconds": round(elapsed, 2),
+        "write_every_s": write_every,
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "statuses": dict(statuses),
+        "latency": _percentiles(everything),
+        "by_endpoint": {name: _percentiles(values) for name, values in sorted(latencies.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=16, help="conexões keep-alive simultâneas")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--readers", type=int, default=4, help="conexões só de leitura do servidor")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--write-every", type=float, default=0, help="segundos entre escritas de outra instância (0 = nenhuma)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    args = parser.parse_args()
+
+    result = run(args.rows, args.clients, args.seconds, args.readers, args.data_dir, args.port, args.write_every)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+""" Tamanho do agenda.db e velocidade das consultas antes e depois do arquivamento.
+
+Gera um agenda.db sintético, mede as consultas do dia a dia (dia atual,
+primeiras páginas da consulta, densidade do mês, busca) e as que alcançam
+o histórico antigo (um dia arquivado, uma página funda do passado, um
+compromisso arquivado pelo id), arquiva com DataManager.archive_older_than,
+compacta com vacuum() e mede tudo de novo em uma instância nova, que só
+abre o arquivo quando a consulta precisa dele.
+
+Uso:
+    python benchmarks/archive_benchmark.py --rows 1000000 --days 730
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import DEFAULT_ARCHIVE_AGE_DAYS, DataManager
+from synthetic_data import generate_database
+
+
+SEARCH_TERM = "silva"
+
+
+def _median_ms(func, repeat):
+    func()  # Aquece o cache de páginas
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def _queries(dm, old_day, old_id):
+    """ (nome, função) das consultas medidas; `old_day` e `old_id` ficam antes da data de corte. """
+    today = date.today()
+    deep_key = (old_day, "\uffff", 0)
+    return [
+        ("day_today", lambda: dm.get_compromissos_by_date(today.isoformat())),
+        ("past_first_page", lambda: dm.get_past_appointments_page()),
+        ("future_first_page", lambda: dm.get_future_appointments_page()),
+        ("month_density", lambda: dm.get_month_density(today.year, today.month)),
+        ("search_first_page", lambda: dm.search(SEARCH_TERM)),
+        ("archived_day", lambda: dm.get_compromissos_by_date(old_day)),
+        ("archived_past_page", lambda: dm.get_past_appointments_page(deep_key)),
+        ("archived_by_id", lambda: dm.get_compromisso_by_id(old_id)),
+    ]
+
+
+def _measure(db_path, old_day, old_id, repeat):
+    started = time.perf_counter()
+    dm = DataManager(db_path, day_cache_size=0)
+    open_ms = round((time.perf_counter() - started) * 1000, 2)
+    timings = {"open": open_ms}
+    for name, func in _queries(dm, old_day, old_id):
+        timings[name] = _median_ms(func, repeat)
+    dm.close()
+    return timings
+
+
+def run(rows, days, data_dir, repeat):
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.abspath(os.path.join(data_dir, f"agenda_arquivo_{rows}.db"))
+    archive_path = os.path.abspath(os.path.join(data_dir, f"agenda_arquivo_{rows}_arquivo.db"))
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+
+    print(f"Gerando {db_path} ({rows} compromissos)...", file=sys.stderr)
+    generate_database(db_path, rows)
+    size_before = os.path.getsize(db_path)
+
+    # O dia mais cheio antes da data de corte e um compromisso dele
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    dm = DataManager(db_path, day_cache_size=0)
+    old_day = dm.conn.execute("""
+        SELECT data FROM compromissos_base WHERE data < ? GROUP BY data ORDER BY COUNT(*) DESC LIMIT 1;
+    """, (cutoff,)).fetchone()[0]
+    old_id = dm.conn.execute("SELECT id FROM compromissos_base WHERE data = ? LIMIT 1;", (old_day,)).fetchone()[0]
+    dm.close()
+
+    before = _measure(db_path, old_day, old_id, repeat)
+
+    dm = DataManager(db_path, day_cache_size=0)
+    started = time.perf_counter()
+    moved = dm.archive_older_than(days)
+    archive_s = round(time.perf_counter() - started, 2)
+    started = time.perf_counter()
+    size_after = dm.vacuum()
+    vacuum_s = round(time.perf_counter() - started, 2)
+    dm.close()
+
+    after = _measure(db_path, old_day, old_id, repeat)
+
+    return {
+        "rows": rows,
+        "days": days,
+        "cutoff": cutoff,
+        "archived_rows": moved,
+        "archive_s": archive_s,
+        "vacuum_s": vacuum_s,
+        "size_before_bytes": size_before,
+        "size_after_bytes": size_after,
+        "archive_size_bytes": os.path.getsize(archive_path),
+        "queries": [
+            {"name": name, "before_ms": before[name], "after_ms": after[name]}
+            for name in before
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=DEFAULT_ARCHIVE_AGE_DAYS)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.days, args.data_dir, args.repeat), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
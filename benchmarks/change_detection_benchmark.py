@@ -0,0 +1,86 @@
+""" Custo da detecção de escritas de outras instâncias (PRAGMA data_version).
+
+Abre duas instâncias do DataManager sobre o mesmo agenda.db sintético e
+mede: o custo de uma verificação sem mudanças (o que o timer da agenda faz
+a cada poucos segundos), uma leitura do dia que sai do cache (que agora
+também verifica a versão) e o tempo entre a escrita de uma instância e a
+outra enxergar o dia atualizado.
+
+Uso:
+    python benchmarks/change_detection_benchmark.py --rows 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import DataManager
+from synthetic_data import generate_database
+
+
+def _median_us(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1_000_000, 2)
+
+
+def run(rows, data_dir, repeat, journal_mode):
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.abspath(os.path.join(data_dir, f"agenda_mudancas_{rows}.db"))
+    print(f"Gerando {db_path} ({rows} compromissos)...", file=sys.stderr)
+    generate_database(db_path, rows)
+
+    reader = DataManager(db_path, journal_mode=journal_mode)
+    writer = DataManager(db_path, journal_mode=journal_mode)
+    today = date.today().isoformat()
+    reader.get_compromissos_by_date(today)
+
+    idle_poll_us = _median_us(reader.get_data_version, repeat)
+    cached_day_us = _median_us(lambda: reader.get_compromissos_by_date(today), repeat)
+
+    before = len(reader.get_compromissos_by_date(today))
+    version = reader.get_data_version()
+    added = writer.add_compromisso(today, "23:59", "Outra instância", "Outro", "Escritório", "", "", "")
+    started = time.perf_counter()
+    changed = reader.get_data_version() != version
+    after = len(reader.get_compromissos_by_date(today))
+    refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+    writer.delete_compromisso(added.id)
+
+    reader.close()
+    writer.close()
+    return {
+        "rows": rows,
+        "journal_mode": journal_mode or "padrão",
+        "idle_poll_us": idle_poll_us,
+        "cached_day_us": cached_day_us,
+        "change_detected": changed,
+        "day_rows_before": before,
+        "day_rows_after": after,
+        "detect_and_reload_day_ms": refresh_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--journal-mode", default=None)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.data_dir, args.repeat, args.journal_mode), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+""" Benchmark da linha de comando (agenda_cli.py): tempo de abertura e memória em fluxo.
+
+Cada comando roda em um processo Python novo sobre um banco sintético,
+como faria o agendador de tarefas. Mede a mediana do tempo total de cada
+comando ao lado de `python -c pass` (só o interpretador) e, em sistemas
+Unix, o pico de memória de uma listagem do intervalo inteiro, que deve
+ficar perto do de uma listagem de um dia (a saída é gravada em fluxo).
+
+Uso:
+    python benchmarks/cli_benchmark.py --rows 100000 --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic_data import generate_database
+
+CLI_PATH = os.path.join(ROOT_DIR, "agenda_cli.py")
+
+
+def _commands(db_path):
+    cli = [sys.executable, CLI_PATH, "--db", db_path]
+    return [
+        ("interpreter", [sys.executable, "-c", "pass"]),
+        ("help", [sys.executable, CLI_PATH, "--help"]),
+        ("list-day", cli + ["list-day"]),
+        ("stats", cli + ["stats"]),
+        ("list-range[all]", cli + ["list-range", "1900-01-01", "9999-12-31"]),
+        ("list-range[all,jsonl]", cli + ["list-range", "1900-01-01", "9999-12-31", "--format", "jsonl"]),
+    ]
+
+
+def _peak_rss_kb(command):
+    """ Pico de memória (KB) de um processo filho, ou None fora do Unix. """
+    if sys.platform == "win32":
+        return None  # Sem o módulo resource
+    code = (
+        "import resource, subprocess, sys;"
+        "subprocess.run(sys.argv[1:], stdout=subprocess.DEVNULL, check=True);"
+        "print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)"
+    )
+    output = subprocess.run([sys.executable, "-c", code] + command, capture_output=True, text=True, check=True)
+    return int(output.stdout.strip())
+
+
+def run(rows, runs, data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.abspath(os.path.join(data_dir, f"agenda_cli_{rows}.db"))
+    if not os.path.exists(db_path):
+        print(f"Gerando {db_path} ({rows} compromissos)...", file=sys.stderr)
+        generate_database(db_path, rows)
+
+    results = []
+    for name, command in _commands(db_path):
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)  # Aquece o cache de disco e os .pyc
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - started)
+        results.append({
+            "command": name,
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "peak_rss_kb": _peak_rss_kb(command),
+        })
+    return {"rows": rows, "runs": runs, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.runs, args.data_dir), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+""" Tamanho do arquivo e velocidade dos agrupamentos antes e depois da migração 3.
+
+Monta um agenda.db no esquema antigo (versão 2: tipo, local e responsável
+como texto em cada linha) com os dados do gerador sintético, parte deles
+com o responsável escrito de outro jeito ("joão", "JOAO ", ...), como
+acontece na digitação. Uma cópia é aberta pelo DataManager, que aplica a
+migração 3 (tabelas de domínio + view 'compromissos'). Depois de um VACUUM
+nos dois arquivos, compara o tamanho, o número de grupos por responsável e
+o tempo (mediana) das mesmas consultas.
+
+Uso:
+    python benchmarks/normalization_benchmark.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import unicodedata
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import DataManager, SCHEMA_MIGRATIONS
+from synthetic_data import iter_rows
+
+
+SEED = 42
+BATCH_SIZE = 50000
+# Fração das linhas com o responsável digitado de outro jeito
+VARIANT_RATIO = 0.15
+
+# Tabela 'compromissos' até a versão 2 do esquema
+LEGACY_TABLE_SQL = """
+    CREATE TABLE compromissos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data TEXT NOT NULL,
+        hora TEXT NOT NULL,
+        nome_cliente TEXT NOT NULL,
+        tipo_visita TEXT NOT NULL,
+        local_visita TEXT NOT NULL,
+        endereco TEXT,
+        quem_vai TEXT,
+        observacoes TEXT
+    );
+"""
+
+# (nome, consulta no esquema antigo, consulta no esquema novo)
+QUERIES = [
+    ("group_by_responsavel",
+     "SELECT quem_vai, COUNT(*) FROM compromissos GROUP BY quem_vai ORDER BY 2 DESC;",
+     None),  # No esquema novo: DataManager.count_by_responsavel
+    ("group_by_responsavel[view]",
+     "SELECT quem_vai, COUNT(*) FROM compromissos GROUP BY quem_vai ORDER BY 2 DESC;",
+     "SELECT quem_vai, COUNT(*) FROM compromissos GROUP BY quem_vai ORDER BY 2 DESC;"),
+    ("group_by_tipo",
+     "SELECT tipo_visita, COUNT(*) FROM compromissos GROUP BY tipo_visita;",
+     "SELECT t.nome, g.n FROM (SELECT tipo_id, COUNT(*) AS n FROM compromissos_base GROUP BY tipo_id) AS g "
+     "JOIN tipos_visita AS t ON t.id = g.tipo_id;"),
+    ("month_density",
+     "SELECT data, tipo_visita, COUNT(*) FROM compromissos WHERE data >= :inicio AND data < :fim GROUP BY data, tipo_visita;",
+     "SELECT data, tipo_visita, COUNT(*) FROM compromissos WHERE data >= :inicio AND data < :fim GROUP BY data, tipo_visita;"),
+    ("day_list",
+     "SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes "
+     "FROM compromissos WHERE data = :inicio ORDER BY hora;",
+     "SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes "
+     "FROM compromissos WHERE data = :inicio ORDER BY hora;"),
+]
+
+
+def _variant(nome, rng):
+    """ O mesmo responsável com outra caixa, sem acentos ou com espaços sobrando. """
+    plain = "".join(ch for ch in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(ch))
+    return rng.choice([nome.lower(), nome.upper(), plain, plain.lower(), f" {nome} "])
+
+
+def build_legacy_database(path, rows, seed=SEED):
+    """ Cria `path` no esquema da versão 2 com `rows` compromissos sintéticos. """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_TABLE_SQL)
+    for version, statements in SCHEMA_MIGRATIONS:
+        if version > 2:
+            break
+        for statement in statements:
+            conn.execute(statement)
+    conn.execute("PRAGMA user_version = 2;")
+
+    insert = """
+        INSERT INTO compromissos (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+    """
+    batch = []
+    for row in iter_rows(rows, seed):
+        if row[6] and rng.random() < VARIANT_RATIO:
+            row = row[:6] + (_variant(row[6], rng),) + row[7:]
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(insert, batch)
+            batch = []
+    if batch:
+        conn.executemany(insert, batch)
+    conn.commit()
+    conn.close()
+
+
+def _vacuum_size(path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM;")
+    conn.execute("ANALYZE;")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def _median_ms(func, repeat):
+    func()  # Aquece o cache de páginas
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def run(rows, data_dir, repeat):
+    os.makedirs(data_dir, exist_ok=True)
+    legacy_path = os.path.join(data_dir, f"agenda_v2_{rows}.db")
+    normalized_path = os.path.join(data_dir, f"agenda_v3_{rows}.db")
+
+    print(f"Gerando {legacy_path} ({rows} compromissos)...", file=sys.stderr)
+    build_legacy_database(legacy_path, rows)
+    legacy_size = _vacuum_size(legacy_path)
+
+    shutil.copyfile(legacy_path, normalized_path)
+    started = time.perf_counter()
+    dm = DataManager(os.path.abspath(normalized_path), day_cache_size=0)
+    migration_s = round(time.perf_counter() - started, 2)
+    dm.close()
+    normalized_size = _vacuum_size(normalized_path)
+
+    legacy = sqlite3.connect(legacy_path)
+    dm = DataManager(os.path.abspath(normalized_path), day_cache_size=0)
+    busiest_day = legacy.execute("SELECT data FROM compromissos GROUP BY data ORDER BY COUNT(*) DESC LIMIT 1;").fetchone()[0]
+    params = {"inicio": busiest_day, "fim": busiest_day[:8] + "32"}
+
+    results = []
+    for name, legacy_sql, normalized_sql in QUERIES:
+        if normalized_sql is None:
+            run_normalized = dm.count_by_responsavel
+        else:
+            run_normalized = lambda sql=normalized_sql: dm.conn.execute(sql, params).fetchall()
+        results.append({
+            "name": name,
+            "before_ms": _median_ms(lambda: legacy.execute(legacy_sql, params).fetchall(), repeat),
+            "after_ms": _median_ms(run_normalized, repeat),
+        })
+
+    report = {
+        "rows": rows,
+        "migration_s": migration_s,
+        "size_before_bytes": legacy_size,
+        "size_after_bytes": normalized_size,
+        "size_ratio": round(normalized_size / legacy_size, 3),
+        "responsavel_groups_before": legacy.execute("SELECT COUNT(DISTINCT quem_vai) FROM compromissos;").fetchone()[0],
+        "responsavel_groups_after": len(dm.count_by_responsavel()),
+        "queries": results,
+    }
+    legacy.close()
+    dm.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.data_dir, args.repeat), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
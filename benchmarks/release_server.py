@@ -0,0 +1,200 @@
+""" Servidor HTTP local que imita a API de releases do GitHub, para testar o Updater.
+
+Responde GET /repos/<repo>/releases/latest com um JSON de release e ETag,
+devolve 304 para If-None-Match igual e pode simular falhas (status 500 ou
+limite de requisições). Conta as requisições recebidas.
+
+Também serve o executável da release (/download/<tag>/<arquivo>, com
+suporte a Range), deltas extras (add_asset) e o "<arquivo>.sha256" ao lado
+de cada um. Para testar a retomada, o servidor pode derrubar a conexão
+depois de N bytes.
+
+Uso:
+    python benchmarks/release_server.py --port 8765 --tag v9.0
+        (e rode a agenda com AGENDA_UPDATE_API_URL=http://127.0.0.1:8765/repos/Azzaleh/Agenda/releases/latest)
+Os testes do cache/backoff e do download (tests/test_updater.py e
+tests/test_update_download.py) sobem este servidor com start_server.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tamanho do executável falso servido pela release
+ASSET_SIZE = 8 * 1024 * 1024
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class ReleaseServer(ThreadingHTTPServer):
+    """ Estado compartilhado pelas requisições: release atual, modo de falha e contadores. """
+    daemon_threads = True
+
+    def __init__(self, address, tag="v9.0", asset_name="AgendaDataServis.exe", asset_size=ASSET_SIZE):
+        super().__init__(address, ReleaseHandler)
+        self.asset_name = asset_name
+        self.asset_size = asset_size
+        self.fail_status = None   # Ex.: 500 para simular falha do servidor
+        self.rate_limited = False
+        self.publish_digest = False  # Inclui "digest" no JSON do asset (como a API atual do GitHub)
+        self.drop_after = None       # Derruba a próxima resposta do executável após N bytes
+        self.ignore_range = False    # Responde 200 com o arquivo inteiro mesmo com Range
+        self.requests = 0
+        self.not_modified = 0
+        self.downloads = []          # Cabeçalho Range (ou None) de cada download do executável
+        self.extra_assets = {}       # Nome -> conteúdo (ex.: deltas)
+        self.set_tag(tag)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/repos/Azzaleh/Agenda/releases/latest"
+
+    def set_tag(self, tag, content=None):
+        """ Publica a release `tag`; sem `content`, o executável é determinístico por tag. """
+        self.tag = tag
+        self.asset = content if content is not None else random.Random(tag).randbytes(self.asset_size)
+        self.asset_sha256 = hashlib.sha256(self.asset).hexdigest()
+        self.extra_assets = {}
+        self._publish()
+
+    def add_asset(self, name, content):
+        self.extra_assets[name] = content
+        self._publish()
+
+    def _publish(self):
+        assets = []
+        for name, content in [(self.asset_name, self.asset)] + list(self.extra_assets.items()):
+            asset = {"name": name, "browser_download_url": f"{self.base_url}/download/{self.tag}/{name}"}
+            if self.publish_digest:
+                asset["digest"] = f"sha256:{hashlib.sha256(content).hexdigest()}"
+            assets.append(asset)
+        self.release = {"tag_name": self.tag, "assets": assets}
+        body = json.dumps(self.release).encode("utf-8")
+        self.release_body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # Silencioso: os testes sobem o servidor várias vezes
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith("/download/"):
+            self._send_asset()
+            return
+        if not self.path.endswith("/releases/latest"):
+            self.send_error(404)
+            return
+
+        server.requests += 1
+        if server.rate_limited:
+            self.send_response(403)
+            self.send_header("X-RateLimit-Remaining", "0")
+            self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+            self.end_headers()
+            return
+        if server.fail_status:
+            self.send_error(server.fail_status)
+            return
+        if self.headers.get("If-None-Match") == server.etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", server.etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(server.release_body)))
+        self.send_header("ETag", server.etag)
+        self.end_headers()
+        self.wfile.write(server.release_body)
+
+    def _send_asset(self):
+        server = self.server
+        name = self.path.rsplit("/", 1)[-1]
+        checksum_only = name.endswith(".sha256")
+        if checksum_only:
+            name = name[:-len(".sha256")]
+        content = server.asset if name == server.asset_name else server.extra_assets.get(name)
+        if content is None:
+            self.send_error(404)
+            return
+
+        if checksum_only:
+            body = f"{hashlib.sha256(content).hexdigest()}  {name}\n".encode("ascii")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        range_header = self.headers.get("Range")
+        server.downloads.append(range_header)
+        size = len(content)
+        start, end = 0, size - 1
+        match = _RANGE_RE.match(range_header or "")
+        if match and not server.ignore_range:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        body = memoryview(content)[start:end + 1]
+        drop_after, server.drop_after = server.drop_after, None
+        if drop_after is not None:
+            # Envia só uma parte e fecha a conexão (queda de rede simulada)
+            self.wfile.write(body[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        for offset in range(0, len(body), 64 * 1024):
+            self.wfile.write(body[offset:offset + 64 * 1024])
+
+
+def start_server(tag="v9.0", port=0, asset_size=ASSET_SIZE):
+    """ Sobe o servidor em uma thread e o retorna (use server.shutdown() e server.server_close() no fim). """
+    server = ReleaseServer(("127.0.0.1", port), tag, asset_size=asset_size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tag", default="v9.0")
+    args = parser.parse_args()
+
+    server = start_server(args.tag, args.port)
+    print(f"Servindo {server.api_url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+""" Memória e tempo de leitura por linha: tuplas do sqlite3 x Appointment.
+
+Lê os mesmos `--rows` compromissos (padrão 100k, a ordem do histórico) de
+um banco sintético de três formas e mede a memória retida pela lista
+resultante (tracemalloc, com a lista ainda viva, como no cache de dias e
+nos modelos das views) e a mediana do tempo de leitura:
+
+- tuple: cursor sem row_factory (formato anterior ao Appointment);
+- appointment_plain: Appointment com __slots__, sem compartilhar strings;
+- appointment: Appointment.from_row, o row_factory usado pelo DataManager.
+
+Uso:
+    python benchmarks/row_memory_benchmark.py --rows 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import Appointment
+from synthetic_data import generate_database
+
+
+QUERY = """
+    SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+    FROM compromissos
+    ORDER BY data DESC, hora DESC, id DESC
+    LIMIT ?;
+"""
+SEED = 42
+
+ROW_FACTORIES = {
+    "tuple": None,
+    "appointment_plain": lambda cursor, row: Appointment(*row),
+    "appointment": Appointment.from_row,
+}
+
+
+def _fetch(conn, row_factory, rows):
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    try:
+        return cursor.execute(QUERY, (rows,)).fetchall()
+    finally:
+        cursor.close()
+
+
+def measure(conn, name, row_factory, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = _fetch(conn, row_factory, rows)
+        timings.append(time.perf_counter() - started)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = _fetch(conn, row_factory, rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "rows": len(result),
+        "retained_bytes": retained,
+        "bytes_per_row": round(retained / len(result), 1) if result else None,
+        "median_fetch_s": round(statistics.median(timings), 4),
+    }
+
+
+def run(rows, db_rows, data_dir, repeat):
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.join(data_dir, f"agenda_rows{db_rows}_seed{SEED}.db")
+    if not os.path.exists(db_path):
+        print(f"Gerando {db_path} ({db_rows} compromissos)...", file=sys.stderr)
+        generate_database(db_path, db_rows, SEED)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        results = [measure(conn, name, factory, rows, repeat) for name, factory in ROW_FACTORIES.items()]
+    finally:
+        conn.close()
+
+    baseline = results[0]["retained_bytes"]
+    for result in results:
+        result["vs_tuple"] = round(result["retained_bytes"] / baseline, 3) if baseline else None
+    return {"db_path": db_path, "rows": rows, "repeat": repeat, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="linhas lidas em cada medição")
+    parser.add_argument("--db-rows", type=int, default=None, help="tamanho do banco sintético (padrão: --rows)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = run(args.rows, args.db_rows or args.rows, args.data_dir, args.repeat)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
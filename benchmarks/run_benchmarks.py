@@ -0,0 +1,348 @@
+""" Benchmarks do DataManager e das views, com saída em JSON para comparar execuções.
+
+Para cada tamanho (1k, 100k e 1M compromissos por padrão) gera um banco
+sintético (reaproveitado entre execuções), mede cada método do DataManager
+e, sob a plataforma Qt "offscreen", o tempo até a lista do dia
+(AgendaApp.update_daily_appointments), a lista depois de uma edição
+(que deve atualizar só o item, sem recarga: list_resets = 0) e a primeira
+página da consulta (QueryDialog._fetch_appointments) ficarem prontas.
+
+Cada medição registra a mediana e o mínimo de várias execuções, as linhas
+por segundo e o pico de memória alocada pelo Python (tracemalloc, em uma
+execução extra separada para não distorcer o tempo).
+
+Uso:
+    python benchmarks/run_benchmarks.py --sizes 1k 100k --output resultado.json
+    python benchmarks/run_benchmarks.py --compare antes.json depois.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from database import DataManager, RecurrenceRule, PAGE_SIZE
+from synthetic_data import generate_database
+
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_REPEAT = 5
+SEED = 42
+# Séries diárias sem fim criadas para medir a expansão das recorrências
+SERIES_COUNT = 100
+
+
+def _count_rows(result):
+    """ Quantidade de linhas de um resultado (lista, dicionário, inteiro ou relatório). """
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 1 if result is not None else 0
+
+
+def measure(name, func, repeat=DEFAULT_REPEAT, setup=None):
+    """ Executa `func` `repeat` vezes e retorna o resultado da medição em um dicionário.
+
+    `setup`, se informado, roda antes de cada execução fora do tempo medido.
+    """
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        rows = _count_rows(func())
+        timings.append(time.perf_counter() - started)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "runs": repeat,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "rows": rows,
+        "rows_per_s": round(rows / median, 1) if median and rows else None,
+        "peak_alloc_bytes": peak,
+    }
+
+
+def _busiest_day(db_path):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT data, COUNT(*) FROM compromissos GROUP BY data ORDER BY 2 DESC LIMIT 1;").fetchone()
+    conn.close()
+    return row[0] if row else date.today().isoformat()
+
+
+def bench_data_manager(db_path, repeat):
+    """ Mede os métodos de leitura e escrita do DataManager. """
+    results = []
+    busiest = _busiest_day(db_path)
+    year, month = int(busiest[:4]), int(busiest[5:7])
+
+    cold = DataManager(db_path, day_cache_size=0)
+    warm = DataManager(db_path)
+
+    results.append(measure("get_compromissos_by_date[cold]", lambda: cold.get_compromissos_by_date(busiest), repeat))
+    warm.get_compromissos_by_date(busiest)
+    results.append(measure("get_compromissos_by_date[cached]", lambda: warm.get_compromissos_by_date(busiest), repeat))
+    results.append(measure("prefetch_neighbors", lambda: cold.prefetch_neighbors(busiest), repeat))
+
+    any_id = cold.conn.execute("SELECT MAX(id) FROM compromissos;").fetchone()[0]
+    results.append(measure("get_compromisso_by_id", lambda: cold.get_compromisso_by_id(any_id), repeat))
+
+    results.append(measure("get_future_appointments", cold.get_future_appointments, repeat))
+    results.append(measure("get_past_appointments", cold.get_past_appointments, repeat))
+    results.append(measure("get_future_appointments_page[first]", lambda: cold.get_future_appointments_page(None, PAGE_SIZE), repeat))
+    results.append(measure("get_past_appointments_page[first]", lambda: cold.get_past_appointments_page(None, PAGE_SIZE), repeat))
+
+    # Página "funda": a chave da última linha depois de ~metade do histórico
+    past = cold.get_past_appointments()
+    if past:
+        deep_key = cold.page_key(past[len(past) // 2])
+        results.append(measure("get_past_appointments_page[deep]", lambda: cold.get_past_appointments_page(deep_key, PAGE_SIZE), repeat))
+    del past
+
+    results.append(measure("iter_future_appointments", lambda: sum(1 for _ in cold.iter_future_appointments(1000)), repeat))
+    results.append(measure("iter_past_appointments", lambda: sum(1 for _ in cold.iter_past_appointments(1000)), repeat))
+    results.append(measure("iter_all_compromissos", lambda: sum(1 for _ in cold.iter_all_compromissos(1000)), repeat))
+
+    results.append(measure("get_month_density[cold]", lambda: cold.get_month_density(year, month), repeat,
+                           setup=cold._month_density_cache.clear))
+    results.append(measure("get_month_density[cached]", lambda: warm.get_month_density(year, month), repeat))
+
+    results.append(measure("get_workload_report[mes]", lambda: cold.get_workload_report("mes"), repeat))
+    results.append(measure("get_workload_report[semana]", lambda: cold.get_workload_report("semana"), repeat))
+    results.append(measure("rebuild_workload_summary", cold.rebuild_workload_summary, repeat))
+
+    for text in ("silva", "conceicao magal", "joao"):
+        results.append(measure(f"search[{text}]", lambda text=text: cold.search(text, PAGE_SIZE), repeat))
+
+    # Escritas: cada execução grava uma linha nova, que depois é atualizada e excluída
+    new_ids = []
+    results.append(measure("add_compromisso", lambda: new_ids.append(cold.add_compromisso(
+        busiest, "12:00", "Benchmark", "Outro", "Escritório", "", "Bench", "").id) or 1, repeat))
+    update_ids = iter(list(new_ids))
+    results.append(measure("update_compromisso", lambda: cold.update_compromisso(
+        next(update_ids, new_ids[0]), busiest, "13:00", "Benchmark", "Outro", "Escritório", "", "Bench", "x"), repeat))
+    delete_ids = iter(list(new_ids))
+    results.append(measure("delete_compromisso", lambda: cold.delete_compromisso(
+        next(delete_ids, new_ids[0])), repeat))
+    cold.conn.execute("DELETE FROM compromissos WHERE nome_cliente = 'Benchmark';")
+    cold.conn.commit()
+
+    # Séries sem fim iniciadas bem antes do histórico: a expansão vai direto ao intervalo pedido
+    series_ids = [
+        cold.add_recorrencia(RecurrenceRule("diaria"), "2000-01-01", "07:00", f"Benchmark Série {i}",
+                             "Outro", "Escritório", "", "Bench", "")
+        for i in range(SERIES_COUNT)
+    ]
+    results.append(measure(f"get_compromissos_by_date[{SERIES_COUNT} séries]",
+                           lambda: cold.get_compromissos_by_date(busiest), repeat))
+    results.append(measure(f"get_month_density[{SERIES_COUNT} séries]", lambda: cold.get_month_density(year, month), repeat,
+                           setup=cold._month_density_cache.clear))
+    results.append(measure(f"get_future_appointments_page[{SERIES_COUNT} séries]",
+                           lambda: cold.get_future_appointments_page(None, PAGE_SIZE), repeat))
+    for serie_id in series_ids:
+        cold.delete_recorrencia(serie_id)
+
+    batch = [(busiest, "12:00", "Benchmark Lote", "Outro", "Escritório", "", "Bench", "")] * 1000
+    results.append(measure("add_compromissos_batch[1000]", lambda: cold.add_compromissos_batch(batch), repeat))
+    cold.conn.execute("DELETE FROM compromissos WHERE nome_cliente = 'Benchmark Lote';")
+    cold.conn.commit()
+
+    cold.close()
+    warm.close()
+    return results
+
+
+def bench_views(db_path, repeat):
+    """ Mede as views sob a plataforma Qt "offscreen" (sem janela real). """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QDate, QEventLoop
+    from PyQt5.QtWidgets import QApplication
+
+    import agenda
+
+    app = QApplication.instance() or QApplication([])
+
+    def wait_for(db_manager, channel, timeout=120):
+        """ Processa eventos até a resposta do canal chegar e a view ser repintada. """
+        deadline = time.perf_counter() + timeout
+        while db_manager.is_pending(channel):
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"Sem resposta do canal '{channel}'")
+            app.processEvents(QEventLoop.AllEvents, 5)
+        app.processEvents()
+
+    window = agenda.AgendaApp(db_name=db_path, check_updates=False)
+    window.resize(1280, 800)
+    window.show()
+    wait_for(window.db_manager, "day")
+
+    busiest = QDate.fromString(_busiest_day(db_path), "yyyy-MM-dd")
+    window.calendar.setSelectedDate(busiest)
+    wait_for(window.db_manager, "day")
+
+    def refresh_day():
+        window.update_daily_appointments()
+        wait_for(window.db_manager, "day")
+        return window.appointment_model.rows
+
+    dialog = agenda.QueryDialog(window.db_manager, parent=window)
+    dialog.show()
+    wait_for(window.db_manager, "query")
+
+    def fetch_query(past):
+        dialog.radio_past.setChecked(past)
+        dialog._fetch_appointments()
+        wait_for(window.db_manager, "query")
+        return dialog.result_model.rows
+
+    def edit_first_row():
+        """ Regrava o primeiro compromisso do dia pelo mesmo caminho do diálogo de edição (atualização pontual). """
+        old = next(row for row in window.appointment_model.rows if row.recorrencia_id is None)
+        window.db_manager.submit('update_compromisso', old.id, *old.fields(), channel='bench',
+                                 callback=lambda updated: window._refresh_after_write(old, updated))
+        wait_for(window.db_manager, "bench")
+        return window.appointment_model.rows
+
+    model = window.appointment_model
+    resets, patches = model.reset_count, model.patch_count
+    edit_result = measure("AgendaApp._refresh_after_write[edição]", edit_first_row, repeat)
+    # Uma edição deve mudar só o item: nenhuma recarga completa da lista
+    edit_result["list_resets"] = model.reset_count - resets
+    edit_result["list_patches"] = model.patch_count - patches
+
+    results = [
+        measure("AgendaApp.update_daily_appointments", refresh_day, repeat),
+        edit_result,
+        measure("QueryDialog._fetch_appointments[future]", lambda: fetch_query(False), repeat),
+        measure("QueryDialog._fetch_appointments[past]", lambda: fetch_query(True), repeat),
+    ]
+
+    dialog.close()
+    window.close()
+    app.processEvents()
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_bytes():
+    """ Pico de memória residente do processo (apenas em sistemas com o módulo resource). """
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def run(sizes, data_dir, repeat, with_views):
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "sizes": [],
+    }
+
+    os.makedirs(data_dir, exist_ok=True)
+    for label in sizes:
+        count = SIZES[label]
+        db_path = os.path.join(data_dir, f"agenda_{label}_seed{SEED}.db")
+        generated_s = None
+        if not os.path.exists(db_path):
+            print(f"Gerando {db_path} ({count} compromissos)...", file=sys.stderr)
+            generated_s = round(generate_database(db_path, count, SEED), 3)
+
+        print(f"Medindo {label}...", file=sys.stderr)
+        entry = {
+            "label": label,
+            "rows": count,
+            "db_path": db_path,
+            "db_size_bytes": os.path.getsize(db_path),
+            "generate_s": generated_s,
+            "results": bench_data_manager(db_path, repeat),
+        }
+        if with_views:
+            entry["results"].extend(bench_views(db_path, repeat))
+        report["sizes"].append(entry)
+
+    report["meta"]["max_rss_bytes"] = _max_rss_bytes()
+    return report
+
+
+def compare(before_path, after_path):
+    """ Imprime a variação da mediana de cada medição entre dois arquivos JSON. """
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    previous = {(size["label"], result["name"]): result
+                for size in before["sizes"] for result in size["results"]}
+    for size in after["sizes"]:
+        for result in size["results"]:
+            old = previous.get((size["label"], result["name"]))
+            if old is None or not old["median_s"]:
+                continue
+            change = (result["median_s"] - old["median_s"]) / old["median_s"] * 100
+            print(f"{size['label']:>5}  {result['name']:<45} {old['median_s']*1000:10.3f} ms -> "
+                  f"{result['median_s']*1000:10.3f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"),
+                        help="pasta dos bancos sintéticos (reaproveitados entre execuções)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--no-views", action="store_true", help="não mede as views Qt")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: saída padrão)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois resultados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.sizes, args.data_dir, args.repeat, not args.no_views)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+""" Benchmark de abertura da agenda: tempo até o primeiro frame.
+
+Cada execução é um processo Python novo (imports frios do módulo, como
+na abertura real) que roda agenda.main com --profile-startup e
+--quit-after-startup sobre um banco sintético. O processo filho devolve as
+fases do StartupProfiler e o tempo desde o disparo do processo até o
+primeiro frame, que inclui a inicialização do interpretador.
+
+Com --exe, mede um executável do PyInstaller (one-file ou one-directory)
+pelo tempo total até ele fechar sozinho.
+
+Uso:
+    python benchmarks/startup_benchmark.py --runs 10 --rows 100000
+    python benchmarks/startup_benchmark.py --exe dist/AgendaDataServis/AgendaDataServis.exe
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_FLAGS = ["--profile-startup", "--quit-after-startup", "--no-update-check"]
+FIRST_PAINT_PHASE = "primeiro frame"
+RESULT_PREFIX = "STARTUP_RESULT "
+
+
+def _child(db_path, spawned_at):
+    """ Executado no processo filho: abre a agenda e imprime as fases em JSON. """
+    sys.argv = [os.path.join(ROOT_DIR, "agenda.py")] + STARTUP_FLAGS
+    sys.path.insert(0, ROOT_DIR)
+
+    import agenda
+    from startup_profile import profiler
+
+    agenda.main(db_path)
+
+    first_paint = profiler.elapsed(FIRST_PAINT_PHASE)
+    result = profiler.as_dict()
+    result["spawn_to_first_paint_ms"] = (
+        round((profiler.started_wall + first_paint - spawned_at) * 1000, 2) if first_paint is not None else None
+    )
+    print(RESULT_PREFIX + json.dumps(result, ensure_ascii=False), flush=True)
+
+
+def _run_child(db_path, env):
+    spawned_at = time.time()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", db_path, str(spawned_at)],
+        env=env, capture_output=True, text=True, timeout=120, check=True,
+    ).stdout
+    for line in output.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError("O processo filho não informou o resultado")
+
+
+def _run_exe(exe_path, env):
+    started = time.perf_counter()
+    subprocess.run([exe_path] + STARTUP_FLAGS, env=env, timeout=120, check=True)
+    return {"wall_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _summary(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"median_ms": round(statistics.median(values), 2), "min_ms": round(min(values), 2),
+            "max_ms": round(max(values), 2)}
+
+
+def run(runs, rows, data_dir, exe_path=None):
+    """ Executa `runs` aberturas e retorna um dicionário com as medianas por fase. """
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    if exe_path:
+        results = [_run_exe(exe_path, env) for _ in range(runs)]
+        return {"exe": exe_path, "runs": runs, "wall": _summary([r["wall_ms"] for r in results])}
+
+    sys.path.insert(0, ROOT_DIR)
+    from synthetic_data import generate_database
+
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.join(data_dir, f"agenda_startup_{rows}.db")
+    if not os.path.exists(db_path):
+        print(f"Gerando {db_path} ({rows} compromissos)...", file=sys.stderr)
+        generate_database(db_path, rows)
+
+    # Uma abertura descartada para aquecer o cache de disco do sistema
+    _run_child(db_path, env)
+    results = [_run_child(db_path, env) for _ in range(runs)]
+
+    phases = {}
+    for result in results:
+        for name, at_ms in result["phases_ms"]:
+            phases.setdefault(name, []).append(at_ms)
+
+    return {
+        "db_path": db_path,
+        "rows": rows,
+        "runs": runs,
+        "spawn_to_first_paint": _summary([r["spawn_to_first_paint_ms"] for r in results]),
+        "phases_cumulative": {name: _summary(values) for name, values in phases.items()},
+    }
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        _child(sys.argv[2], float(sys.argv[3]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100_000, help="tamanho do banco sintético")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "agenda_benchmarks"))
+    parser.add_argument("--exe", help="executável do PyInstaller a medir no lugar do agenda.py")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.runs, args.rows, args.data_dir, args.exe), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+""" Teste de estresse: vários processos escrevendo no mesmo agenda.db ao mesmo tempo.
+
+Cada processo adiciona, atualiza e exclui os próprios compromissos pelo
+DataManager e devolve o estado que espera encontrar no fim. O processo
+principal compara esse estado com o conteúdo real do banco (nada pode se
+perder nem sobrar) e informa a vazão em operações por segundo.
+
+Uso:
+    python benchmarks/stress_concurrency.py --processes 8 --ops 500 --journal-mode WAL
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager, DataManagerError
+
+
+def _worker(args):
+    """ Executa `ops` operações e retorna (linhas esperadas, contadores, falhas). """
+    worker_id, db_path, ops, journal_mode, busy_timeout_ms = args
+    dm = DataManager(db_path, journal_mode=journal_mode, busy_timeout_ms=busy_timeout_ms)
+
+    expected = {}  # id -> (nome_cliente, observacoes)
+    counts = {"add": 0, "update": 0, "delete": 0}
+    failures = []
+
+    for i in range(ops):
+        try:
+            if i % 5 == 4 and expected:
+                # Exclui o compromisso mais antigo deste processo
+                target_id = next(iter(expected))
+                if dm.delete_compromisso(target_id):
+                    del expected[target_id]
+                    counts["delete"] += 1
+                else:
+                    failures.append(f"delete {target_id}: linha não encontrada")
+            elif i % 3 == 2 and expected:
+                # Atualiza o compromisso mais recente deste processo
+                target_id = next(reversed(expected))
+                nome, _ = expected[target_id]
+                obs = f"atualizado {i}"
+                if dm.update_compromisso(target_id, "2030-01-01", "10:00", nome, "Outro",
+                                         "Escritório", "", f"p{worker_id}", obs):
+                    expected[target_id] = (nome, obs)
+                    counts["update"] += 1
+                else:
+                    failures.append(f"update {target_id}: linha não encontrada")
+            else:
+                nome = f"p{worker_id}-{i}"
+                added = dm.add_compromisso("2030-01-01", "10:00", nome, "Outro",
+                                           "Escritório", "", f"p{worker_id}", "")
+                expected[added.id] = (nome, "")
+                counts["add"] += 1
+        except DataManagerError as e:
+            failures.append(str(e))
+
+    dm.close()
+    return expected, counts, failures
+
+
+def run(processes, ops, journal_mode, busy_timeout_ms, db_path=None):
+    """ Roda o estresse e retorna um dicionário com o resultado. """
+    own_dir = None
+    if db_path is None:
+        own_dir = tempfile.mkdtemp(prefix="agenda_stress_")
+        db_path = os.path.join(own_dir, "stress.db")
+
+    # Cria o arquivo (tabela, migrações e modo de journal) antes dos processos
+    DataManager(db_path, journal_mode=journal_mode).close()
+
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        results = pool.map(_worker, [(n, db_path, ops, journal_mode, busy_timeout_ms) for n in range(processes)])
+    elapsed = time.perf_counter() - started
+
+    expected = {}
+    totals = {"add": 0, "update": 0, "delete": 0}
+    failures = []
+    for worker_expected, counts, worker_failures in results:
+        expected.update(worker_expected)
+        for key, value in counts.items():
+            totals[key] += value
+        failures.extend(worker_failures)
+
+    dm = DataManager(db_path)
+    actual = {
+        row_id: (nome, obs or "")
+        for row_id, nome, obs in dm.conn.execute("SELECT id, nome_cliente, observacoes FROM compromissos;")
+    }
+    journal = dm.journal_mode
+    dm.close()
+
+    missing = sorted(set(expected) - set(actual))
+    unexpected = sorted(set(actual) - set(expected))
+    mismatched = sorted(row_id for row_id in set(expected) & set(actual) if expected[row_id] != actual[row_id])
+    total_ops = sum(totals.values())
+
+    return {
+        "db_path": db_path,
+        "journal_mode": journal,
+        "processes": processes,
+        "ops_per_process": ops,
+        "operations": totals,
+        "failures": len(failures),
+        "failure_samples": failures[:5],
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(total_ops / elapsed, 1) if elapsed else None,
+        "missing_rows": len(missing),
+        "unexpected_rows": len(unexpected),
+        "mismatched_rows": len(mismatched),
+        "ok": not (failures or missing or unexpected or mismatched),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=300, help="operações por processo")
+    parser.add_argument("--journal-mode", default="WAL", choices=["WAL", "DELETE", "TRUNCATE", "PERSIST"])
+    parser.add_argument("--busy-timeout-ms", type=int, default=5000)
+    parser.add_argument("--db", help="arquivo a usar (padrão: um banco novo em uma pasta temporária)")
+    args = parser.parse_args()
+
+    result = run(args.processes, args.ops, args.journal_mode, args.busy_timeout_ms, args.db)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
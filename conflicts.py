@@ -0,0 +1,124 @@
+""" Verificação em massa de conflitos de horário (mesmo responsável, mesmo dia).
+
+Importado só quando o usuário abre a verificação. A busca é feita por
+DataManager.find_conflicts_between, que percorre o índice de
+responsável/dia em vez de comparar todos os compromissos de cada dia; um
+duplo clique leva o calendário ao dia do conflito.
+"""
+from PyQt5.QtCore import QDate, pyqtSignal
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QDateEdit, QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QVBoxLayout
+)
+
+
+# Pares exibidos por verificação (o resto é só contado como "mais de")
+MAX_CONFLICTS = 2000
+# Intervalo inicial: de hoje até DEFAULT_DAYS_AHEAD dias à frente
+DEFAULT_DAYS_AHEAD = 90
+
+HEADERS = ("Data", "Responsável", "Horário", "Cliente", "Conflita com", "Cliente")
+
+
+def _hours(appointment):
+    if appointment.hora_fim:
+        return f"{appointment.hora}-{appointment.hora_fim}"
+    return appointment.hora
+
+
+class ConflictsDialog(QDialog):
+    # Emitido com o dia do conflito escolhido (duplo clique)
+    appointment_selected = pyqtSignal(QDate)
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Conflitos de Horário")
+        self.resize(860, 520)
+
+        self.db_manager = db_manager
+        self.pairs = []
+
+        main_layout = QVBoxLayout(self)
+
+        # 1. INTERVALO
+        range_layout = QHBoxLayout()
+        today = QDate.currentDate()
+        self.start_edit = QDateEdit(today)
+        self.end_edit = QDateEdit(today.addDays(DEFAULT_DAYS_AHEAD))
+        for edit in (self.start_edit, self.end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("dd/MM/yyyy")
+
+        self.check_button = QPushButton("Verificar")
+        self.check_button.clicked.connect(self._find_conflicts)
+
+        range_layout.addWidget(QLabel("De:"))
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("Até:"))
+        range_layout.addWidget(self.end_edit)
+        range_layout.addStretch(1)
+        range_layout.addWidget(self.check_button)
+        main_layout.addLayout(range_layout)
+
+        # 2. PARES EM CONFLITO
+        self.table = QTableWidget(0, len(HEADERS))
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setAlternatingRowColors(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.doubleClicked.connect(self._select_and_return_date)
+        main_layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        main_layout.addWidget(self.status_label)
+
+        self.check_button.setStyleSheet("background-color: #e65100; color: white; padding: 6px 12px; border-radius: 8px;")
+
+        self._find_conflicts()
+
+    def _find_conflicts(self):
+        start = self.start_edit.date().toString("yyyy-MM-dd")
+        end = self.end_edit.date().toString("yyyy-MM-dd")
+        self.status_label.setText("Verificando...")
+        # Um pedido a mais que o exibido indica que há mais conflitos
+        self.db_manager.submit(
+            'find_conflicts_between', start, end, MAX_CONFLICTS + 1, channel='conflicts',
+            callback=self._show_conflicts, error_callback=self._show_error,
+        )
+
+    def _show_conflicts(self, pairs):
+        truncated = len(pairs) > MAX_CONFLICTS
+        self.pairs = pairs[:MAX_CONFLICTS]
+
+        self.table.setUpdatesEnabled(False)
+        self.table.clearContents()
+        self.table.setRowCount(len(self.pairs))
+        for row_index, (first, second) in enumerate(self.pairs):
+            values = (
+                QDate.fromString(first.data, "yyyy-MM-dd").toString("dd/MM/yyyy"), first.quem_vai,
+                _hours(first), first.nome_cliente, _hours(second), second.nome_cliente,
+            )
+            for column, value in enumerate(values):
+                self.table.setItem(row_index, column, QTableWidgetItem(value))
+        self.table.setUpdatesEnabled(True)
+
+        if not self.pairs:
+            self.status_label.setText("Nenhum conflito de horário no intervalo.")
+        elif truncated:
+            self.status_label.setText(f"Mais de {MAX_CONFLICTS} conflitos; exibindo os primeiros. Reduza o intervalo.")
+        else:
+            self.status_label.setText(f"{len(self.pairs)} conflito(s) encontrado(s).")
+
+    def _show_error(self, message):
+        print(f"Erro ao verificar conflitos: {message}")
+        self.status_label.setText("Erro ao verificar os conflitos.")
+
+    def _select_and_return_date(self, index):
+        """ Emite o dia do conflito escolhido e fecha o diálogo. """
+        if 0 <= index.row() < len(self.pairs):
+            self.appointment_selected.emit(QDate.fromString(self.pairs[index.row()][0].data, "yyyy-MM-dd"))
+            self.accept()
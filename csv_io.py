@@ -0,0 +1,155 @@
+""" Importação e exportação em massa da tabela 'compromissos' em CSV.
+
+As duas operações são em fluxo (linha a linha, memória constante). A
+importação valida cada linha com as mesmas regras do AddEventDialog e grava
+em lotes com executemany, um commit por lote.
+"""
+import csv
+import re
+from datetime import date
+
+from database import COMPROMISSO_FIELDS
+
+
+# Linhas por transação na importação
+IMPORT_BATCH_SIZE = 50000
+# Quantidade máxima de mensagens de erro guardadas no relatório
+MAX_REPORTED_ERRORS = 1000
+
+EXPORT_FIELDS = ("id",) + COMPROMISSO_FIELDS
+
+_HORA_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+
+class ImportReport:
+    """ Resultado de uma importação: linhas gravadas, rejeitadas e os erros por linha. """
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []  # [(número da linha no arquivo, mensagem)]
+
+    def add_error(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def summary(self):
+        """ Texto curto para exibir ao usuário. """
+        text = f"{self.imported} compromisso(s) importado(s), {self.rejected} linha(s) rejeitada(s)."
+        if self.errors:
+            details = "\n".join(f"Linha {line}: {message}" for line, message in self.errors[:10])
+            text += f"\n\n{details}"
+            if self.rejected > 10:
+                text += f"\n... e mais {self.rejected - 10} erro(s)."
+        return text
+
+
+def _normalize_date(value):
+    """ Aceita AAAA-MM-DD ou DD/MM/AAAA e retorna AAAA-MM-DD (ValueError se inválida). """
+    if len(value) == 10 and value[2] == "/" and value[5] == "/":
+        value = f"{value[6:]}-{value[3:5]}-{value[:2]}"
+    if len(value) != 10 or value[4] != "-" or value[7] != "-":
+        raise ValueError
+    date.fromisoformat(value)
+    return value
+
+
+def _normalize_hora(value):
+    """ Completa H:mm para HH:mm. """
+    if len(value) == 4 and value[1] == ":":
+        return "0" + value
+    return value
+
+
+def validate_row(record, tipos, locais):
+    """ Valida um dicionário com COMPROMISSO_FIELDS e retorna a tupla pronta para gravar.
+
+    Segue as regras do AddEventDialog.save_compromisso: cliente obrigatório,
+    tipo e local entre as opções das listas (`tipos` e `locais`, os valores
+    cadastrados no banco), endereço só para "No Cliente" e término (hora_fim,
+    opcional) depois do início. Levanta ValueError com a mensagem do problema.
+    """
+    data = (record.get("data") or "").strip()
+    hora = (record.get("hora") or "").strip()
+    cliente = (record.get("nome_cliente") or "").strip()
+    tipo_visita = (record.get("tipo_visita") or "").strip()
+    local_visita = (record.get("local_visita") or "").strip()
+
+    try:
+        data = _normalize_date(data)
+    except ValueError:
+        raise ValueError(f"data inválida '{data}' (use AAAA-MM-DD ou DD/MM/AAAA)")
+    hora = _normalize_hora(hora)
+    if not _HORA_RE.match(hora):
+        raise ValueError(f"hora inválida '{hora}' (use HH:mm)")
+    hora_fim = _normalize_hora((record.get("hora_fim") or "").strip())
+    if hora_fim and not _HORA_RE.match(hora_fim):
+        raise ValueError(f"hora de término inválida '{hora_fim}' (use HH:mm)")
+    if hora_fim and hora_fim <= hora:
+        raise ValueError(f"o término ({hora_fim}) deve ser depois do início ({hora})")
+    if not cliente:
+        raise ValueError("o nome do cliente não pode ser vazio")
+    if tipo_visita not in tipos:
+        raise ValueError(f"tipo de visita desconhecido '{tipo_visita}'")
+    if local_visita not in locais:
+        raise ValueError(f"local desconhecido '{local_visita}'")
+
+    endereco = (record.get("endereco") or "").strip() if local_visita == "No Cliente" else ""
+    quem_vai = (record.get("quem_vai") or "").strip()
+    observacoes = (record.get("observacoes") or "").strip()
+
+    return (data, hora, cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim)
+
+
+def import_csv(data_manager, path, batch_size=IMPORT_BATCH_SIZE, progress_callback=None):
+    """ Importa um CSV (cabeçalho com os nomes das colunas) para o banco.
+
+    Uma coluna 'id' é ignorada: cada linha vira um novo compromisso. Retorna
+    um ImportReport; `progress_callback(linhas_lidas)` é chamado a cada lote.
+    """
+    report = ImportReport()
+    batch = []
+    # Valores cadastrados (inclusive os personalizados): o que foi exportado volta a ser importado
+    lookup_values = data_manager.get_lookup_values()
+    tipos = frozenset(lookup_values["tipo_visita"])
+    locais = frozenset(lookup_values["local_visita"])
+
+    # utf-8-sig aceita o BOM gravado pelo Excel
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        missing = [field for field in ("data", "hora", "nome_cliente", "tipo_visita", "local_visita")
+                   if field not in (reader.fieldnames or [])]
+        if missing:
+            report.add_error(1, f"colunas obrigatórias ausentes: {', '.join(missing)}")
+            return report
+
+        for record in reader:
+            try:
+                batch.append(validate_row(record, tipos, locais))
+            except ValueError as e:
+                report.add_error(reader.line_num, str(e))
+                continue
+
+            if len(batch) >= batch_size:
+                report.imported += data_manager.add_compromissos_batch(batch)
+                batch = []
+                if progress_callback is not None:
+                    progress_callback(reader.line_num)
+
+        if batch:
+            report.imported += data_manager.add_compromissos_batch(batch)
+
+    return report
+
+
+def export_csv(data_manager, path, batch_size=IMPORT_BATCH_SIZE):
+    """ Grava todos os compromissos em CSV (ordem de data e hora) e retorna quantos foram escritos. """
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(EXPORT_FIELDS)
+        for row in data_manager.iter_all_compromissos(batch_size):
+            writer.writerow(row.as_tuple())
+            written += 1
+    return written
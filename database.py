@@ -1,10 +1,853 @@
 import sqlite3
 import os
 import sys
-from datetime import date # Importado para obter a data atual
+import time
+import random
+import re
+import calendar
+import heapq
+from collections import OrderedDict
+from itertools import count, groupby, islice
+from operator import attrgetter
+from datetime import date, timedelta # Importado para obter a data atual
+
+
+# --- CONCORRÊNCIA (VÁRIAS INSTÂNCIAS NO MESMO agenda.db) ---
+# Modo de journal do SQLite. "WAL" permite leituras simultâneas a uma escrita,
+# mas exige que todas as instâncias rodem na MESMA máquina (o SQLite não suporta
+# WAL em pastas de rede); para um agenda.db compartilhado pela rede use "DELETE".
+# Vazio mantém o modo já gravado no arquivo.
+DEFAULT_JOURNAL_MODE = os.environ.get("AGENDA_JOURNAL_MODE", "")
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "WAL")
+# Quanto tempo uma conexão espera por um lock antes de receber SQLITE_BUSY.
+DEFAULT_BUSY_TIMEOUT_MS = int(os.environ.get("AGENDA_BUSY_TIMEOUT_MS", "5000"))
+# Novas tentativas de uma escrita que ainda falhou por lock, com backoff exponencial.
+DEFAULT_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.05  # segundos
+RETRY_MAX_DELAY = 2.0    # segundos
+
+# Quantos dias o cache LRU de get_compromissos_by_date guarda (0 desativa).
+DEFAULT_DAY_CACHE_SIZE = 64
+
+# --- ARQUIVAMENTO (HISTÓRICO ANTIGO EM OUTRO ARQUIVO) ---
+# Compromissos com mais de DEFAULT_ARCHIVE_AGE_DAYS dias saem do agenda.db
+# para agenda_arquivo.db (ao lado dele), em transações de ARCHIVE_BATCH_SIZE
+# linhas para não segurar o lock de escrita por muito tempo.
+DEFAULT_ARCHIVE_AGE_DAYS = int(os.environ.get("AGENDA_ARCHIVE_AGE_DAYS", "730"))
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_SUFFIX = "_arquivo"
+
+
+class DataManagerError(Exception):
+    """ Falha de acesso ao banco devolvida a quem chamou o DataManager. """
+
+
+def _is_busy_error(error):
+    """ Indica se o erro do sqlite3 é de banco ocupado/travado (SQLITE_BUSY/SQLITE_LOCKED). """
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _sleep_before_retry(attempt):
+    """ Espera antes da tentativa seguinte a um SQLITE_BUSY: backoff exponencial com jitter. """
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def _read_only_uri(path):
+    """ URI "file:" de `path` com mode=ro, para conexões que só leem o banco. """
+    path = os.path.abspath(path).replace(os.sep, "/")
+    if not path.startswith("/"):
+        path = "/" + path  # Windows: file:///C:/...
+    for char, escaped in (("%", "%25"), ("?", "%3F"), ("#", "%23")):
+        path = path.replace(char, escaped)
+    return f"file://{path}?mode=ro"
+
+
+# Valores aceitos nos campos de escolha (os mesmos das listas do AddEventDialog)
+TIPOS_VISITA = ["Treinamento", "Visita Técnica", "Outro"]
+LOCAIS_VISITA = ["Escritório", "No Cliente"]
+
+# Colunas gravadas por compromisso, na ordem usada pelos métodos de escrita
+# (hora_fim é opcional: "" quando o término não foi informado)
+COMPROMISSO_FIELDS = ("data", "hora", "nome_cliente", "tipo_visita", "local_visita", "endereco", "quem_vai", "observacoes",
+                      "hora_fim")
+
+_intern = sys.intern
+
+
+class Appointment:
+    """ Um compromisso lido do banco: o id e os campos de COMPROMISSO_FIELDS como atributos.
+
+    Criado direto pelo row_factory dos cursores de leitura (from_row), no
+    lugar das tuplas posicionais. Usa __slots__ (sem __dict__ por instância)
+    e compartilha as strings que se repetem de linha para linha (data, hora,
+    tipo, local e responsável), que em listas grandes ocupam mais memória que
+    a própria linha.
+
+    A ocorrência de uma série (RECORRÊNCIAS) não é gravada: vem com id None e
+    o id da série em recorrencia_id.
+    """
+    __slots__ = ("id",) + COMPROMISSO_FIELDS + ("recorrencia_id",)
+
+    def __init__(self, id, data, hora, nome_cliente, tipo_visita, local_visita, endereco="", quem_vai="", observacoes="",
+                 hora_fim="", recorrencia_id=None):
+        self.id = id
+        self.data = data
+        self.hora = hora
+        self.nome_cliente = nome_cliente
+        self.tipo_visita = tipo_visita
+        self.local_visita = local_visita
+        self.endereco = endereco
+        self.quem_vai = quem_vai
+        self.observacoes = observacoes
+        self.hora_fim = hora_fim
+        self.recorrencia_id = recorrencia_id
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """ row_factory do sqlite3 para consultas que selecionam id + COMPROMISSO_FIELDS. """
+        id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim = row
+        return cls(id, _intern(data), _intern(hora), nome_cliente, _intern(tipo_visita), _intern(local_visita),
+                   endereco, _intern(quem_vai) if quem_vai else quem_vai, observacoes,
+                   _intern(hora_fim) if hora_fim else hora_fim)
+
+    def fields(self):
+        """ Valores na ordem de COMPROMISSO_FIELDS (a dos métodos de escrita). """
+        return (self.data, self.hora, self.nome_cliente, self.tipo_visita, self.local_visita,
+                self.endereco, self.quem_vai, self.observacoes, self.hora_fim)
+
+    def as_tuple(self):
+        """ (id,) + fields(), na ordem das colunas exportadas. """
+        return (self.id,) + self.fields()
+
+    def occurrence(self, data):
+        """ Cópia deste modelo de série na data `data` (AAAA-MM-DD), como ocorrência. """
+        return Appointment(None, _intern(data), self.hora, self.nome_cliente, self.tipo_visita, self.local_visita,
+                           self.endereco, self.quem_vai, self.observacoes, self.hora_fim, self.recorrencia_id)
+
+    @property
+    def page_key(self):
+        """ Chave de paginação (data, hora, id); nas ocorrências de série, -recorrencia_id no lugar do id. """
+        return (self.data, self.hora, self.id if self.id is not None else -self.recorrencia_id)
+
+    def __eq__(self, other):
+        if not isinstance(other, Appointment):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple() and self.recorrencia_id == other.recorrencia_id
+
+    __hash__ = None
+
+    def __repr__(self):
+        serie = f", recorrencia_id={self.recorrencia_id!r}" if self.recorrencia_id is not None else ""
+        return (f"Appointment(id={self.id!r}, data={self.data!r}, hora={self.hora!r}, "
+                f"nome_cliente={self.nome_cliente!r}{serie})")
+
+
+# --- RECORRÊNCIAS (TREINAMENTOS SEMANAIS, MENSAIS...) ---
+# Uma série é uma única linha de 'recorrencias': o compromisso-modelo e a
+# regra. As ocorrências não são gravadas; são calculadas só para o intervalo
+# consultado (dia, semana/mês, página da consulta, destaques do calendário).
+# "Só esta ocorrência" vira uma exceção da série (recorrencia_excecoes: a
+# data deixa de ser gerada) e, na edição, um compromisso comum no lugar dela.
+FREQUENCIAS = ("diaria", "semanal", "mensal")
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _add_months(day, months):
+    """ O mesmo dia `months` meses depois; em meses mais curtos, o último dia (31/01 -> 28/02 -> 31/03). """
+    year, month = divmod(_month_index(day) + months, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _hours_overlap(row, hora, fim):
+    """ Mesma regra de conflito de find_conflicts para um Appointment já carregado. """
+    return row.hora == hora or (row.hora < fim and max(row.hora, row.hora_fim or row.hora) > hora)
+
+
+class RecurrenceRule:
+    """ Repetição a cada `intervalo` dias, semanas ou meses a partir da primeira data da série.
+
+    `fim` (AAAA-MM-DD) é a última data possível e `ocorrencias`, o total de
+    ocorrências; os dois são opcionais (sem nenhum, a série não termina). A
+    n-ésima data é calculada direto, sem percorrer as anteriores: expandir
+    um intervalo custa só as ocorrências que caem nele, mesmo em séries sem
+    fim que começaram há anos.
+    """
+    __slots__ = ("frequencia", "intervalo", "fim", "ocorrencias")
+
+    def __init__(self, frequencia, intervalo=1, fim=None, ocorrencias=None):
+        if frequencia not in FREQUENCIAS:
+            raise ValueError(f"Frequência inválida: {frequencia}")
+        if int(intervalo) < 1 or (ocorrencias is not None and int(ocorrencias) < 1):
+            raise ValueError("O intervalo e a quantidade de ocorrências devem ser positivos.")
+        self.frequencia = frequencia
+        self.intervalo = int(intervalo)
+        self.fim = fim or None
+        self.ocorrencias = None if ocorrencias is None else int(ocorrencias)
+
+    def date_at(self, inicio, n):
+        """ Data (date) da n-ésima ocorrência de uma série que começa em `inicio` (date; n = 0 é o próprio início). """
+        if self.frequencia == "mensal":
+            return _add_months(inicio, n * self.intervalo)
+        step = self.intervalo * (7 if self.frequencia == "semanal" else 1)
+        return inicio + timedelta(days=n * step)
+
+    def _index_from(self, inicio, day):
+        """ Menor n cuja data é `day` ou posterior. """
+        if day <= inicio:
+            return 0
+        if self.frequencia == "mensal":
+            n = -(-(_month_index(day) - _month_index(inicio)) // self.intervalo)
+            # Mesmo mês de `day`, mas num dia anterior a ele: fica para a próxima
+            return n if self.date_at(inicio, n) >= day else n + 1
+        step = self.intervalo * (7 if self.frequencia == "semanal" else 1)
+        return -(-(day - inicio).days // step)
+
+    def _last_index(self, inicio, end=None):
+        """ Índice da última ocorrência até `end` (date, opcional); None se a série não termina. """
+        limits = [] if self.ocorrencias is None else [self.ocorrencias - 1]
+        for day in (self.fim and date.fromisoformat(self.fim), end):
+            if day:
+                limits.append(self._index_from(inicio, day + timedelta(days=1)) - 1)
+        return min(limits) if limits else None
+
+    def last_date(self, inicio):
+        """ Última ocorrência (AAAA-MM-DD) de uma série que começa em `inicio`, ou None se ela não termina. """
+        start = date.fromisoformat(inicio)
+        last = self._last_index(start)
+        if last is None:
+            return None
+        return self.date_at(start, max(last, 0)).isoformat()
+
+    def iter_dates(self, inicio, start=None, end=None, reverse=False):
+        """ Gera as datas (AAAA-MM-DD) das ocorrências de `start` a `end` (inclusive; None = sem limite).
+
+        Com `reverse`, da mais nova para a mais antiga; nesse caso a série
+        precisa terminar ou `end` precisa ser informado.
+        """
+        first_day = date.fromisoformat(inicio)
+        first = self._index_from(first_day, date.fromisoformat(start)) if start else 0
+        last = self._last_index(first_day, date.fromisoformat(end) if end else None)
+        if reverse:
+            if last is None:
+                raise ValueError("Série sem fim: informe a data final para percorrê-la de trás para frente.")
+            indexes = range(last, first - 1, -1)
+        else:
+            indexes = count(first) if last is None else range(first, last + 1)
+        for n in indexes:
+            try:
+                day = self.date_at(first_day, n)
+            except (OverflowError, ValueError):
+                return  # Passou do ano 9999
+            yield day.isoformat()
+
+    def as_row(self, inicio):
+        """ (frequencia, intervalo, fim, ocorrencias, ultima) na ordem das colunas de 'recorrencias'. """
+        return (self.frequencia, self.intervalo, self.fim, self.ocorrencias, self.last_date(inicio))
+
+    def __eq__(self, other):
+        if not isinstance(other, RecurrenceRule):
+            return NotImplemented
+        return (self.frequencia, self.intervalo, self.fim, self.ocorrencias) == \
+            (other.frequencia, other.intervalo, other.fim, other.ocorrencias)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"RecurrenceRule({self.frequencia!r}, intervalo={self.intervalo!r}, fim={self.fim!r}, "
+                f"ocorrencias={self.ocorrencias!r})")
+
+
+def _expand_series(rule, template, exceptions, start, end, reverse):
+    """ Ocorrências (Appointment) de uma série de `start` a `end`, menos as datas em `exceptions`. """
+    for data in rule.iter_dates(template.data, start, end, reverse):
+        if data not in exceptions:
+            yield template.occurrence(data)
+
+
+# Tamanho padrão das páginas das consultas de histórico (paginação por chave).
+PAGE_SIZE = 50
+
+# Maior rowid possível no SQLite (inteiro de 64 bits com sinal).
+_MAX_ROWID = 2**63 - 1
+
+# Ids por consulta "WHERE id IN (...)" (o SQLite antigo aceita até 999 parâmetros).
+IDS_PER_QUERY = 500
+
+# --- CHAVE DOS RESPONSÁVEIS ("joao", "João" e " JOÃO" são a mesma pessoa) ---
+# A mesma regra existe em Python (fold_key) e em SQL (_sql_fold, usada pela
+# migração e pelos gatilhos da view): espaços nas pontas, caixa e acentos do
+# português não contam. O SQLite só converte a caixa de letras ASCII, por isso
+# os acentos são trocados um a um com replace(), em subconsultas encadeadas de
+# _SQL_FOLD_STEP trocas (replace() aninhado demais estoura a pilha do parser).
+_ACCENTED = "áàâãäåÁÀÂÃÄÅéèêëÉÈÊËíìîïÍÌÎÏóòôõöÓÒÔÕÖúùûüÚÙÛÜçÇñÑ"
+_UNACCENTED = "aaaaaaaaaaaaeeeeeeeeiiiiiiiioooooooooouuuuuuuuccnn"
+_FOLD_TABLE = str.maketrans(_ACCENTED + "ABCDEFGHIJKLMNOPQRSTUVWXYZ", _UNACCENTED + "abcdefghijklmnopqrstuvwxyz")
+_SQL_FOLD_STEP = 10
+
+
+def fold_key(text):
+    """ Chave de comparação de um responsável ("" para vazio). """
+    return (text or "").strip(" ").translate(_FOLD_TABLE)
+
+
+def _sql_fold(expression):
+    """ Subconsulta SQL escalar equivalente a fold_key(expression). """
+    pairs = list(zip(_ACCENTED, _UNACCENTED))
+    steps = [pairs[i:i + _SQL_FOLD_STEP] for i in range(0, len(pairs), _SQL_FOLD_STEP)]
+
+    def replaced(sql, step):
+        for accented, plain in step:
+            sql = f"replace({sql}, '{accented}', '{plain}')"
+        return sql
+
+    sql = f"(SELECT {replaced(f'trim({expression}, {chr(39)} {chr(39)})', steps[0])} AS k)"
+    for step in steps[1:-1]:
+        sql = f"(SELECT {replaced('k', step)} AS k FROM {sql})"
+    return f"(SELECT lower({replaced('k', steps[-1])}) FROM {sql})"
+
+
+def _sql_ensure_lookups(row):
+    """ Comandos SQL (gatilhos da view) que cadastram o tipo, o local e o responsável de `row` se ainda não existirem. """
+    return f"""
+            INSERT OR IGNORE INTO tipos_visita (nome) VALUES ({row}.tipo_visita);
+            INSERT OR IGNORE INTO locais_visita (nome) VALUES ({row}.local_visita);
+            INSERT OR IGNORE INTO responsaveis (nome, chave)
+            SELECT trim({row}.quem_vai, ' '), {_sql_fold(f"{row}.quem_vai")} WHERE {_sql_fold(f"{row}.quem_vai")} <> '';"""
+
+
+def _sql_lookup_ids(row):
+    """ Subconsultas com os ids de tipo, local e responsável de `row`, na ordem das colunas de compromissos_base. """
+    return (f"(SELECT id FROM tipos_visita WHERE nome = {row}.tipo_visita)",
+            f"(SELECT id FROM locais_visita WHERE nome = {row}.local_visita)",
+            f"(SELECT id FROM responsaveis WHERE chave = {_sql_fold(f'{row}.quem_vai')})")
+
+
+_FTS_QUEM_VAI = "(SELECT nome FROM responsaveis WHERE id = {row}.quem_vai_id)"
+
+
+def _sql_compromissos_view(optional_columns=()):
+    """ View 'compromissos' (colunas de antes da migração 3) e seus gatilhos INSTEAD OF.
+
+    `optional_columns` são colunas de compromissos_base acrescentadas depois:
+    na view, NULL aparece como ""; nas gravações pela view, "" vira NULL.
+    """
+    view_columns = "".join(f", COALESCE(c.{column}, '') AS {column}" for column in optional_columns)
+    base_columns = "".join(f", {column}" for column in optional_columns)
+    new_values = "".join(f", NULLIF(new.{column}, '')" for column in optional_columns)
+    new_assignments = "".join(f", {column} = NULLIF(new.{column}, '')" for column in optional_columns)
+    tipo_id, local_id, quem_vai_id = _sql_lookup_ids("new")
+    return [
+        f"""
+        CREATE VIEW IF NOT EXISTS compromissos AS
+        SELECT c.id, c.data, c.hora, c.nome_cliente, t.nome AS tipo_visita, l.nome AS local_visita,
+               c.endereco, COALESCE(r.nome, '') AS quem_vai, c.observacoes{view_columns}
+        FROM compromissos_base AS c
+        LEFT JOIN tipos_visita AS t ON t.id = c.tipo_id
+        LEFT JOIN locais_visita AS l ON l.id = c.local_id
+        LEFT JOIN responsaveis AS r ON r.id = c.quem_vai_id;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS compromissos_ii INSTEAD OF INSERT ON compromissos BEGIN{_sql_ensure_lookups("new")}
+            INSERT INTO compromissos_base (id, data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes{base_columns})
+            VALUES (new.id, new.data, new.hora, new.nome_cliente, {tipo_id}, {local_id}, new.endereco,
+                    {quem_vai_id}, new.observacoes{new_values});
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS compromissos_iu INSTEAD OF UPDATE ON compromissos BEGIN{_sql_ensure_lookups("new")}
+            UPDATE compromissos_base
+            SET data = new.data, hora = new.hora, nome_cliente = new.nome_cliente,
+                tipo_id = {tipo_id}, local_id = {local_id},
+                endereco = new.endereco, quem_vai_id = {quem_vai_id}, observacoes = new.observacoes{new_assignments}
+            WHERE id = old.id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS compromissos_id INSTEAD OF DELETE ON compromissos BEGIN
+            DELETE FROM compromissos_base WHERE id = old.id;
+        END;
+        """,
+    ]
+
+# --- RESUMO DE CARGA (RELATÓRIOS POR RESPONSÁVEL) ---
+# resumo_carga guarda quantos compromissos cada responsável tem por tipo em
+# cada semana e mês; os gatilhos de compromissos_base o mantêm em dia a cada
+# escrita, então um relatório lê poucas linhas seja qual for o tamanho do
+# histórico. 'inicio' é a segunda-feira da semana ou o dia 1º do mês e
+# quem_vai_id 0 indica compromissos sem responsável. Uma data fora do padrão
+# AAAA-MM-DD fica como está (date() devolveria NULL).
+WORKLOAD_PERIODS = {
+    "semana": "COALESCE(date({data}, 'weekday 0', '-6 days'), {data})",
+    "mes": "COALESCE(date({data}, 'start of month'), {data})",
+}
+
+
+def _sql_workload_delta(row, sign):
+    """ Comandos SQL (gatilhos) que somam `sign` (1 ou -1) ao resumo de cada período do compromisso `row`. """
+    statements = []
+    for periodo, inicio in WORKLOAD_PERIODS.items():
+        key = (f"'{periodo}'", inicio.format(data=f"{row}.data"), f"COALESCE({row}.quem_vai_id, 0)", f"{row}.tipo_id")
+        statements.append(f"""
+            INSERT INTO resumo_carga (periodo, inicio, quem_vai_id, tipo_id, quantidade)
+            VALUES ({", ".join(key)}, {sign})
+            ON CONFLICT (periodo, inicio, quem_vai_id, tipo_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade;""")
+        if sign < 0:
+            statements.append(f"""
+            DELETE FROM resumo_carga
+            WHERE periodo = {key[0]} AND inicio = {key[1]} AND quem_vai_id = {key[2]} AND tipo_id = {key[3]}
+              AND quantidade <= 0;""")
+    return "".join(statements)
+
+
+def _sql_workload_adjust(source, sign):
+    """ Comandos SQL que somam `sign` (1 ou -1) ao resumo para cada compromisso de `source`.
+
+    `source` é o trecho FROM/WHERE de uma consulta em linhas de
+    compromissos_base. Corrige o resumo em massa quando linhas entram ou saem
+    de compromissos_base sem que o compromisso deixe de existir (arquivamento).
+    """
+    statements = [
+        f"""
+        INSERT INTO resumo_carga (periodo, inicio, quem_vai_id, tipo_id, quantidade)
+        SELECT '{periodo}', {inicio.format(data="data")}, COALESCE(quem_vai_id, 0), tipo_id, {int(sign)} * COUNT(*)
+        FROM {source}
+        GROUP BY 2, 3, 4
+        ON CONFLICT (periodo, inicio, quem_vai_id, tipo_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+        """
+        for periodo, inicio in WORKLOAD_PERIODS.items()
+    ]
+    if sign < 0:
+        statements.append("DELETE FROM resumo_carga WHERE quantidade <= 0;")
+    return statements
+
+
+# Recalcula o resumo inteiro: conta primeiro por dia, em uma única leitura
+# sequencial da tabela (NOT INDEXED: pelo índice de data, cada linha custaria
+# um acesso aleatório), e soma os dias em semanas e meses.
+WORKLOAD_DAY_STATEMENTS = [
+    "DELETE FROM resumo_carga;",
+    "DROP TABLE IF EXISTS temp.resumo_dias;",
+    """
+    CREATE TEMP TABLE resumo_dias AS
+    SELECT data, COALESCE(quem_vai_id, 0) AS quem_vai_id, tipo_id, COUNT(*) AS quantidade
+    FROM compromissos_base NOT INDEXED
+    GROUP BY data, quem_vai_id, tipo_id;
+    """,
+]
+WORKLOAD_PERIOD_STATEMENTS = [
+    f"""
+    INSERT INTO resumo_carga (periodo, inicio, quem_vai_id, tipo_id, quantidade)
+    SELECT '{periodo}', {inicio.format(data="data")}, quem_vai_id, tipo_id, SUM(quantidade)
+    FROM temp.resumo_dias
+    GROUP BY 2, 3, 4;
+    """
+    for periodo, inicio in WORKLOAD_PERIODS.items()
+] + ["DROP TABLE temp.resumo_dias;"]
+WORKLOAD_REBUILD_STATEMENTS = WORKLOAD_DAY_STATEMENTS + WORKLOAD_PERIOD_STATEMENTS
+
+# --- MIGRAÇÕES DE ESQUEMA ---
+# Cada passo é (versão, lista de comandos SQL). Os passos são aplicados em ordem
+# crescente a partir do valor de PRAGMA user_version do arquivo, cada um em uma
+# transação própria que confirma os comandos junto com a nova versão: um passo
+# interrompido é desfeito por inteiro e reexecutado do início na próxima abertura.
+# A transação é IMMEDIATE e relê user_version já com o lock de escrita, então
+# instâncias abertas ao mesmo tempo sobre um arquivo antigo aplicam cada passo uma
+# só vez (as outras esperam o lock e o pulam). Por isso nem todo comando precisa
+# ser idempotente (a migração 3 faz DROP TABLE e a 5 faz ALTER TABLE ADD COLUMN).
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # Tabela original da agenda. Arquivos criados antes das migrações já a
+        # têm (com user_version 0); IF NOT EXISTS preserva os dados deles.
+        """
+        CREATE TABLE IF NOT EXISTS compromissos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            hora TEXT NOT NULL,
+            nome_cliente TEXT NOT NULL,
+            tipo_visita TEXT NOT NULL,
+            local_visita TEXT NOT NULL,
+            endereco TEXT,
+            quem_vai TEXT,
+            observacoes TEXT
+        );
+        """,
+        # Atende "WHERE data = ? ORDER BY hora" e as listagens futuras/passadas
+        # ("ORDER BY data, hora") direto pelo índice, sem etapa de ordenação.
+        # O rowid (id) já faz parte de toda entrada do índice.
+        "CREATE INDEX IF NOT EXISTS idx_compromissos_data_hora ON compromissos (data, hora);",
+    ]),
+    (2, [
+        # Índice de texto (FTS5) com conteúdo externo: o texto fica só em
+        # 'compromissos'. remove_diacritics ignora acentos ("joao" acha "João") e
+        # os índices de prefixo aceleram a busca enquanto o usuário digita.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS compromissos_fts USING fts5(
+            nome_cliente, endereco, quem_vai, observacoes,
+            content='compromissos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+        );
+        """,
+        # Relevância: o nome do cliente pesa mais que o responsável, o endereço e as observações
+        "INSERT INTO compromissos_fts (compromissos_fts, rank) VALUES ('rank', 'bm25(10.0, 3.0, 5.0, 1.0)');",
+        """
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_ai AFTER INSERT ON compromissos BEGIN
+            INSERT INTO compromissos_fts (rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES (new.id, new.nome_cliente, new.endereco, new.quem_vai, new.observacoes);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_ad AFTER DELETE ON compromissos BEGIN
+            INSERT INTO compromissos_fts (compromissos_fts, rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES ('delete', old.id, old.nome_cliente, old.endereco, old.quem_vai, old.observacoes);
+        END;
+        """,
+        # Mudanças só de data/hora/tipo não tocam o índice de texto
+        """
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_au
+        AFTER UPDATE OF nome_cliente, endereco, quem_vai, observacoes ON compromissos BEGIN
+            INSERT INTO compromissos_fts (compromissos_fts, rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES ('delete', old.id, old.nome_cliente, old.endereco, old.quem_vai, old.observacoes);
+            INSERT INTO compromissos_fts (rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES (new.id, new.nome_cliente, new.endereco, new.quem_vai, new.observacoes);
+        END;
+        """,
+        # Indexa as linhas que já existiam antes da migração
+        "INSERT INTO compromissos_fts (compromissos_fts) VALUES ('rebuild');",
+    ]),
+    (3, [
+        # Tipo, local e responsável saem de cada linha para tabelas de domínio
+        # referenciadas por inteiros. A tabela passa a ser compromissos_base e
+        # 'compromissos' vira uma view com as colunas de antes: as consultas
+        # continuam iguais e versões antigas do programa (ou um editor de SQLite)
+        # ainda gravam nela pelos gatilhos INSTEAD OF. O passo inteiro roda em
+        # uma transação, então uma interrupção não deixa o esquema pela metade.
+        "CREATE TABLE IF NOT EXISTS tipos_visita (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);",
+        "CREATE TABLE IF NOT EXISTS locais_visita (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);",
+        # 'chave' é fold_key(nome): grafias diferentes da mesma pessoa viram um só responsável
+        "CREATE TABLE IF NOT EXISTS responsaveis (id INTEGER PRIMARY KEY, nome TEXT NOT NULL, chave TEXT NOT NULL UNIQUE);",
+        "INSERT OR IGNORE INTO tipos_visita (nome) VALUES " + ", ".join(f"('{nome}')" for nome in TIPOS_VISITA) + ";",
+        "INSERT OR IGNORE INTO locais_visita (nome) VALUES " + ", ".join(f"('{nome}')" for nome in LOCAIS_VISITA) + ";",
+        "INSERT OR IGNORE INTO tipos_visita (nome) SELECT DISTINCT tipo_visita FROM compromissos;",
+        "INSERT OR IGNORE INTO locais_visita (nome) SELECT DISTINCT local_visita FROM compromissos;",
+        # Chave de cada grafia distinta (calculada uma vez por grafia, não por linha)
+        """
+        CREATE TEMP TABLE IF NOT EXISTS migracao_responsaveis (
+            grafia TEXT PRIMARY KEY, chave TEXT NOT NULL, usos INTEGER NOT NULL
+        );
+        """,
+        f"""
+        INSERT OR REPLACE INTO temp.migracao_responsaveis (grafia, chave, usos)
+        SELECT quem_vai, {_sql_fold("quem_vai")}, COUNT(*) FROM compromissos
+        WHERE quem_vai IS NOT NULL
+        GROUP BY quem_vai;
+        """,
+        # A grafia mais usada de cada responsável é a que fica
+        """
+        INSERT OR IGNORE INTO responsaveis (nome, chave)
+        SELECT trim(grafia, ' '), chave FROM temp.migracao_responsaveis
+        WHERE chave <> ''
+        ORDER BY usos DESC;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS compromissos_base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            hora TEXT NOT NULL,
+            nome_cliente TEXT NOT NULL,
+            tipo_id INTEGER NOT NULL REFERENCES tipos_visita (id),
+            local_id INTEGER NOT NULL REFERENCES locais_visita (id),
+            endereco TEXT,
+            quem_vai_id INTEGER REFERENCES responsaveis (id),
+            observacoes TEXT
+        );
+        """,
+        """
+        INSERT INTO compromissos_base (id, data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes)
+        SELECT c.id, c.data, c.hora, c.nome_cliente, t.id, l.id, c.endereco, r.id, c.observacoes
+        FROM compromissos AS c
+        JOIN tipos_visita AS t ON t.nome = c.tipo_visita
+        JOIN locais_visita AS l ON l.nome = c.local_visita
+        LEFT JOIN temp.migracao_responsaveis AS g ON g.grafia = c.quem_vai
+        LEFT JOIN responsaveis AS r ON r.chave = g.chave
+        ORDER BY c.id;
+        """,
+        "DROP TABLE IF EXISTS temp.migracao_responsaveis;",
+        # Preserva o contador do AUTOINCREMENT (ids de compromissos excluídos não voltam)
+        """
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'compromissos_base', seq FROM sqlite_sequence
+        WHERE name = 'compromissos' AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'compromissos_base');
+        """,
+        """
+        UPDATE sqlite_sequence
+        SET seq = max(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'compromissos'))
+        WHERE name = 'compromissos_base' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'compromissos');
+        """,
+        # Leva junto o índice de data/hora e os gatilhos do FTS da tabela antiga
+        "DROP TABLE compromissos;",
+        "CREATE INDEX IF NOT EXISTS idx_compromissos_data_hora ON compromissos_base (data, hora);",
+        # Agrupamentos por responsável leem só este índice
+        "CREATE INDEX IF NOT EXISTS idx_compromissos_quem_vai ON compromissos_base (quem_vai_id);",
+        *_sql_compromissos_view(),
+        # O FTS continua com conteúdo externo em 'compromissos' (agora a view). As
+        # grafias unificadas dos responsáveis geram os mesmos termos (o tokenizador
+        # já ignora caixa e acentos), então o índice existente continua válido.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_ai AFTER INSERT ON compromissos_base BEGIN
+            INSERT INTO compromissos_fts (rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES (new.id, new.nome_cliente, new.endereco, {_FTS_QUEM_VAI.format(row="new")}, new.observacoes);
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_ad AFTER DELETE ON compromissos_base BEGIN
+            INSERT INTO compromissos_fts (compromissos_fts, rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES ('delete', old.id, old.nome_cliente, old.endereco, {_FTS_QUEM_VAI.format(row="old")}, old.observacoes);
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS compromissos_fts_au
+        AFTER UPDATE OF nome_cliente, endereco, quem_vai_id, observacoes ON compromissos_base BEGIN
+            INSERT INTO compromissos_fts (compromissos_fts, rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES ('delete', old.id, old.nome_cliente, old.endereco, {_FTS_QUEM_VAI.format(row="old")}, old.observacoes);
+            INSERT INTO compromissos_fts (rowid, nome_cliente, endereco, quem_vai, observacoes)
+            VALUES (new.id, new.nome_cliente, new.endereco, {_FTS_QUEM_VAI.format(row="new")}, new.observacoes);
+        END;
+        """,
+    ]),
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS resumo_carga (
+            periodo TEXT NOT NULL,
+            inicio TEXT NOT NULL,
+            quem_vai_id INTEGER NOT NULL,
+            tipo_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            PRIMARY KEY (periodo, inicio, quem_vai_id, tipo_id)
+        ) WITHOUT ROWID;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS resumo_carga_ai AFTER INSERT ON compromissos_base BEGIN{_sql_workload_delta("new", 1)}
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS resumo_carga_ad AFTER DELETE ON compromissos_base BEGIN{_sql_workload_delta("old", -1)}
+        END;
+        """,
+        # O DataManager regrava todas as colunas; só mexe no resumo se o período, o responsável ou o tipo mudou
+        f"""
+        CREATE TRIGGER IF NOT EXISTS resumo_carga_au
+        AFTER UPDATE OF data, quem_vai_id, tipo_id ON compromissos_base
+        WHEN old.data IS NOT new.data OR old.quem_vai_id IS NOT new.quem_vai_id OR old.tipo_id IS NOT new.tipo_id
+        BEGIN{_sql_workload_delta("old", -1)}{_sql_workload_delta("new", 1)}
+        END;
+        """,
+        *WORKLOAD_REBUILD_STATEMENTS,
+    ]),
+    (5, [
+        # Término opcional (HH:MM; NULL = não informado) para detectar conflitos de horário
+        "ALTER TABLE compromissos_base ADD COLUMN hora_fim TEXT;",
+        # Intervalos de um responsável em um dia, já na ordem de início: a checagem
+        # de conflitos lê só as entradas desse responsável/dia, sem tocar a tabela.
+        # Também atende os agrupamentos por responsável (prefixo quem_vai_id),
+        # por isso substitui o índice só de quem_vai_id.
+        "DROP INDEX IF EXISTS idx_compromissos_quem_vai;",
+        "CREATE INDEX IF NOT EXISTS idx_compromissos_responsavel_dia ON compromissos_base (quem_vai_id, data, hora, hora_fim);",
+        # Recria a view com a nova coluna (os gatilhos INSTEAD OF saem junto com ela)
+        "DROP VIEW IF EXISTS compromissos;",
+        *_sql_compromissos_view(optional_columns=("hora_fim",)),
+    ]),
+    (6, [
+        # Séries de compromissos (ver RECORRÊNCIAS): a regra e o compromisso-modelo,
+        # com as colunas na ordem de compromissos_base. 'ultima' é a data da última
+        # ocorrência (NULL = sem fim), calculada ao gravar, para filtrar as séries
+        # de um intervalo sem expandi-las.
+        """
+        CREATE TABLE IF NOT EXISTS recorrencias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            frequencia TEXT NOT NULL,
+            intervalo INTEGER NOT NULL DEFAULT 1,
+            fim TEXT,
+            ocorrencias INTEGER,
+            ultima TEXT,
+            inicio TEXT NOT NULL,
+            hora TEXT NOT NULL,
+            nome_cliente TEXT NOT NULL,
+            tipo_id INTEGER NOT NULL REFERENCES tipos_visita (id),
+            local_id INTEGER NOT NULL REFERENCES locais_visita (id),
+            endereco TEXT,
+            quem_vai_id INTEGER REFERENCES responsaveis (id),
+            observacoes TEXT,
+            hora_fim TEXT
+        );
+        """,
+        # Datas que a série deixou de gerar (ocorrência excluída ou editada à parte)
+        """
+        CREATE TABLE IF NOT EXISTS recorrencia_excecoes (
+            recorrencia_id INTEGER NOT NULL REFERENCES recorrencias (id),
+            data TEXT NOT NULL,
+            PRIMARY KEY (recorrencia_id, data)
+        ) WITHOUT ROWID;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS recorrencias_ad AFTER DELETE ON recorrencias BEGIN
+            DELETE FROM recorrencia_excecoes WHERE recorrencia_id = old.id;
+        END;
+        """,
+    ]),
+    (7, [
+        # Data de corte do arquivamento (ver ARQUIVAMENTO): só compromissos com
+        # data anterior a 'limite' podem estar no arquivo. Sem linha, nada foi
+        # arquivado e as consultas nunca abrem o arquivo.
+        """
+        CREATE TABLE IF NOT EXISTS arquivamento (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            limite TEXT NOT NULL
+        );
+        """,
+    ]),
+]
+
+# --- ARQUIVAMENTO ---
+# O arquivo tem a mesma compromissos_base (ids preservados; os de tipo, local
+# e responsável continuam apontando para as tabelas de domínio do agenda.db) e
+# um FTS5 próprio, com o texto junto (o conteúdo externo do FTS precisa estar
+# no mesmo arquivo). Ele é anexado (ATTACH ... AS arquivo) só quando uma
+# consulta alcança datas anteriores ao limite; as views temporárias abaixo
+# juntam as duas partes para as leituras do histórico. O resumo de carga
+# (resumo_carga) continua contando os compromissos arquivados.
+ARCHIVE_SCHEMA = "arquivo"
+
+ARCHIVE_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS arquivo.compromissos_base (
+        id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL,
+        hora TEXT NOT NULL,
+        nome_cliente TEXT NOT NULL,
+        tipo_id INTEGER NOT NULL,
+        local_id INTEGER NOT NULL,
+        endereco TEXT,
+        quem_vai_id INTEGER,
+        observacoes TEXT,
+        hora_fim TEXT
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS arquivo.idx_arquivo_data_hora ON compromissos_base (data, hora);",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS arquivo.compromissos_fts USING fts5(
+        nome_cliente, endereco, quem_vai, observacoes,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    );
+    """,
+    # Ids do lote em arquivamento
+    "CREATE TEMP TABLE IF NOT EXISTS arquivar (id INTEGER PRIMARY KEY);",
+    """
+    CREATE TEMP VIEW IF NOT EXISTS compromissos_arquivados AS
+    SELECT c.id, c.data, c.hora, c.nome_cliente, t.nome AS tipo_visita, l.nome AS local_visita,
+           c.endereco, COALESCE(r.nome, '') AS quem_vai, c.observacoes, COALESCE(c.hora_fim, '') AS hora_fim
+    FROM arquivo.compromissos_base AS c
+    LEFT JOIN main.tipos_visita AS t ON t.id = c.tipo_id
+    LEFT JOIN main.locais_visita AS l ON l.id = c.local_id
+    LEFT JOIN main.responsaveis AS r ON r.id = c.quem_vai_id;
+    """,
+    """
+    CREATE TEMP VIEW IF NOT EXISTS historico AS
+    SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+    FROM main.compromissos
+    UNION ALL
+    SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+    FROM temp.compromissos_arquivados;
+    """,
+]
+
+_BASE_COLUMNS = "id, data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes, hora_fim"
+
+# Um lote do arquivamento: copia as linhas de temp.arquivar para o arquivo
+# (substituindo as que já estão lá, de um lote interrompido), devolve ao
+# resumo a contagem que o DELETE vai descontar e as remove do agenda.db (os
+# gatilhos tiram também do FTS principal).
+ARCHIVE_BATCH_STATEMENTS = [
+    "DELETE FROM arquivo.compromissos_fts WHERE rowid IN temp.arquivar;",
+    """
+    INSERT INTO arquivo.compromissos_fts (rowid, nome_cliente, endereco, quem_vai, observacoes)
+    SELECT c.id, c.nome_cliente, c.endereco, COALESCE(r.nome, ''), c.observacoes
+    FROM main.compromissos_base AS c
+    LEFT JOIN main.responsaveis AS r ON r.id = c.quem_vai_id
+    WHERE c.id IN temp.arquivar;
+    """,
+    f"""
+    INSERT OR REPLACE INTO arquivo.compromissos_base ({_BASE_COLUMNS})
+    SELECT {_BASE_COLUMNS} FROM main.compromissos_base WHERE id IN temp.arquivar;
+    """,
+    *_sql_workload_adjust("main.compromissos_base WHERE id IN temp.arquivar", 1),
+    "DELETE FROM main.compromissos_base WHERE id IN temp.arquivar;",
+]
+
+# Linhas que ficaram nos dois arquivos (lote interrompido em WAL): a do
+# agenda.db é a que vale, pois o commit dele é o que não chegou a acontecer.
+ARCHIVE_CLEANUP_STATEMENTS = [
+    """
+    DELETE FROM arquivo.compromissos_fts
+    WHERE rowid IN (SELECT id FROM arquivo.compromissos_base WHERE id IN (SELECT id FROM main.compromissos_base));
+    """,
+    "DELETE FROM arquivo.compromissos_base WHERE id IN (SELECT id FROM main.compromissos_base);",
+]
+
+# Devolve ao agenda.db um compromisso arquivado (:id) que vai ser alterado ou
+# excluído. O gatilho do INSERT soma de novo ao resumo um compromisso que ele
+# já contava, por isso ARCHIVE_RESTORE_ADJUST desconta (só se a linha entrou).
+ARCHIVE_RESTORE_STATEMENT = f"""
+    INSERT OR IGNORE INTO main.compromissos_base ({_BASE_COLUMNS})
+    SELECT {_BASE_COLUMNS} FROM arquivo.compromissos_base WHERE id = :id;
+"""
+ARCHIVE_RESTORE_ADJUST = _sql_workload_adjust("arquivo.compromissos_base WHERE id = :id", -1)
+ARCHIVE_REMOVE_STATEMENTS = [
+    "DELETE FROM arquivo.compromissos_fts WHERE rowid = :id;",
+    "DELETE FROM arquivo.compromissos_base WHERE id = :id;",
+]
+
+# Quantos resultados mais recentes são ordenados por relevância na busca;
+# além disso a busca continua em ordem do mais novo para o mais antigo, para
+# que termos muito comuns (ex.: o nome de um técnico) não custem um bm25 por linha.
+SEARCH_RANK_WINDOW = 1000
+
+_SEARCH_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_search_query(text):
+    """ Converte o texto digitado em uma consulta FTS5 que exige todos os termos.
+
+    As palavras já completas são buscadas exatamente; só a última (a que está
+    sendo digitada) vale como prefixo, o que evita expandir prefixos comuns.
+    Retorna "" se não houver termos pesquisáveis.
+    """
+    tokens = _SEARCH_TOKEN_RE.findall(text)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    if not text[-1:].isspace():
+        terms[-1] += "*"
+    return " ".join(terms)
+
 
 class DataManager:
-    def __init__(self, db_name='agenda.db'):
+    def __init__(self, db_name='agenda.db', journal_mode=None, busy_timeout_ms=None, max_retries=DEFAULT_MAX_RETRIES,
+                 day_cache_size=DEFAULT_DAY_CACHE_SIZE, archive_path=None, read_only=False):
+        """ `read_only` abre o agenda.db (e o arquivo) só para leitura, sem criar nem migrar nada.
+
+        Usado pelas conexões de leitura da API HTTP (agenda_api.py): o banco
+        precisa existir e já estar na versão de esquema atual, e as escritas
+        levantam DataManagerError.
+        """
         # Determinar o diretório base do aplicativo
         if getattr(sys, 'frozen', False):
             base_dir = os.path.dirname(sys.executable)
@@ -19,108 +862,1108 @@ class DataManager:
         # Definir o caminho completo do banco de dados
         db_path = os.path.join(data_folder, db_name)
         
-        # Conectar ao banco de dados
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = db_path
+        # Arquivo do histórico antigo (ver ARQUIVAMENTO); anexado só quando necessário
+        root, extension = os.path.splitext(db_path)
+        self.archive_path = archive_path or f"{root}{ARCHIVE_SUFFIX}{extension}"
+        self._archive_attached = False
+        self.read_only = read_only
+        self.journal_mode = (journal_mode or DEFAULT_JOURNAL_MODE).upper()
+        self.busy_timeout_ms = DEFAULT_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+        self.max_retries = max_retries
+
+        # Conectar ao banco de dados. IMMEDIATE reserva o lock de escrita já no
+        # BEGIN implícito, evitando o impasse leitura->escrita entre instâncias.
+        if read_only:
+            if not os.path.exists(db_path):
+                raise DataManagerError(f"Banco de dados não encontrado: {db_path}")
+            # Sem check_same_thread: quem usa a conexão em uma thread de um pool
+            # (agenda_api.py) pode fechá-la de outra depois que o pool termina
+            self.conn = sqlite3.connect(
+                _read_only_uri(db_path), uri=True, timeout=self.busy_timeout_ms / 1000, check_same_thread=False
+            )
+        else:
+            self.conn = sqlite3.connect(
+                db_path, timeout=self.busy_timeout_ms / 1000, isolation_level="IMMEDIATE"
+            )
         self.cursor = self.conn.cursor()
+        # Consultas de compromissos: as linhas já saem como Appointment
+        self.appointment_cursor = self.conn.cursor()
+        self.appointment_cursor.row_factory = Appointment.from_row
+        self.conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+        self._set_journal_mode()
+
+        # Cache de densidade por mês: {"AAAA-MM": {data: (quantidade, tipo predominante)}}
+        self._month_density_cache = {}
+
+        # Cache LRU das listas do dia: {data: tupla de Appointment}, o mais recente no fim
+        self.day_cache_size = day_cache_size
+        self._day_cache = OrderedDict()
+        self.day_cache_hits = 0
+        self.day_cache_misses = 0
         
-        self._create_table()
-
-    def _create_table(self):
-        """ Cria a tabela 'compromissos' com todos os campos necessários. """
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS compromissos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT NOT NULL,
-                hora TEXT NOT NULL,
-                nome_cliente TEXT NOT NULL,          
-                tipo_visita TEXT NOT NULL,          
-                local_visita TEXT NOT NULL,          
-                endereco TEXT,                      
-                quem_vai TEXT,                      
-                observacoes TEXT                     
-            );
-        """)
-        self.conn.commit()
+        if read_only:
+            self._check_schema_version()
+        else:
+            self._run_migrations()
+        self._load_lookups()
+        self._lookups_changed = False  # _to_base_rows cadastrou valores novos na transação atual
+        # Última versão dos dados vista (ver MUDANÇAS DE OUTRAS INSTÂNCIAS)
+        self._data_version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def _set_journal_mode(self):
+        """ Aplica o modo de journal configurado (WAL fica gravado no arquivo) e registra o modo efetivo. """
+        if self.journal_mode and not self.read_only:
+            if self.journal_mode not in JOURNAL_MODES:
+                raise ValueError(f"Modo de journal inválido: {self.journal_mode}")
+            mode = self.conn.execute(f"PRAGMA journal_mode = {self.journal_mode};").fetchone()[0]
+        else:
+            mode = self.conn.execute("PRAGMA journal_mode;").fetchone()[0]
+        if mode.upper() == "WAL":
+            # Em WAL, NORMAL já é seguro contra corrupção e evita um fsync por commit
+            self.conn.execute("PRAGMA synchronous = NORMAL;")
+        self.journal_mode = mode.upper()
+
+    def _write(self, query, params=(), many=False):
+        """ Executa uma escrita e confirma, repetindo com backoff se o banco estiver ocupado.
+
+        Com `many=True`, `params` é uma sequência de linhas gravadas com
+        executemany em uma única transação. Retorna o cursor da escrita. Erros
+        (inclusive lock persistente após `max_retries` tentativas) são
+        levantados como DataManagerError.
+        """
+        if many:
+            return self._run_write(lambda: self.conn.executemany(query, params))
+        return self._run_write(lambda: self.conn.execute(query, params))
+
+    def _run_write(self, operation):
+        """ Executa `operation()` em uma transação e confirma, com as novas tentativas descritas em _write. """
+        for attempt in range(self.max_retries + 1):
+            self._lookups_changed = False
+            try:
+                result = operation()
+                self.conn.commit()
+                if self._lookups_changed:
+                    # Só depois do commit: um rollback não deixa ids inexistentes no cache
+                    self._load_lookups()
+                return result
+            except sqlite3.OperationalError as e:
+                self.conn.rollback()
+                if not _is_busy_error(e) or attempt == self.max_retries:
+                    raise DataManagerError(f"Banco de dados indisponível: {e}") from e
+                _sleep_before_retry(attempt)
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                raise DataManagerError(f"Erro no banco de dados: {e}") from e
+
+    def get_schema_version(self):
+        """ Retorna a versão de esquema gravada no arquivo (PRAGMA user_version). """
+        return self.conn.execute("PRAGMA user_version;").fetchone()[0]
+
+    def _check_schema_version(self):
+        """ Conexão só de leitura: exige o esquema atual, já que ela não pode migrar o arquivo. """
+        version = self.get_schema_version()
+        if version != SCHEMA_MIGRATIONS[-1][0]:
+            raise DataManagerError(
+                f"O banco está na versão de esquema {version}; abra a agenda uma vez para atualizá-lo."
+            )
+
+    def _run_migrations(self):
+        """ Aplica, em ordem, as migrações ainda não registradas em user_version. """
+        if self.get_schema_version() >= SCHEMA_MIGRATIONS[-1][0]:
+            return
+        for version, statements in SCHEMA_MIGRATIONS:
+            self._run_migration(version, statements)
+
+    def _run_migration(self, version, statements):
+        """ Aplica um passo em uma transação IMMEDIATE, se ele ainda não foi aplicado.
+
+        Várias instâncias podem abrir o mesmo arquivo antigo ao mesmo tempo: a
+        versão é relida já com o lock de escrita, então só a primeira aplica o
+        passo e as outras o pulam. SQLITE_BUSY é repetido como em _run_write.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.conn.execute("BEGIN IMMEDIATE;")
+                try:
+                    if self.get_schema_version() >= version:
+                        self.conn.rollback()
+                        return
+                    for statement in statements:
+                        self.conn.execute(statement)
+                    self.conn.execute(f"PRAGMA user_version = {int(version)};")
+                    self.conn.commit()
+                    return
+                except Exception:
+                    self.conn.rollback()
+                    raise
+            except sqlite3.OperationalError as e:
+                if not _is_busy_error(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise DataManagerError(f"Banco de dados indisponível: {e}") from e
+                _sleep_before_retry(attempt)
     
-    def add_compromisso(self, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes):
-        """ Adiciona um novo agendamento com todos os detalhes. """
-        try:
-            self.cursor.execute("""
-                INSERT INTO compromissos (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
-            """, (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes))
-            self.conn.commit()
-            return self.cursor.lastrowid
-        except Exception as e:
-            print(f"Erro ao adicionar compromisso: {e}")
-            return None
+    # --- TABELAS DE DOMÍNIO (TIPO, LOCAL E RESPONSÁVEL) ---
+
+    def _load_lookups(self):
+        """ Lê os ids das tabelas de domínio (poucas linhas; ids nunca mudam nem são reaproveitados). """
+        self._tipo_ids = dict(self.conn.execute("SELECT nome, id FROM tipos_visita;"))
+        self._local_ids = dict(self.conn.execute("SELECT nome, id FROM locais_visita;"))
+        self._responsavel_ids = dict(self.conn.execute("SELECT chave, id FROM responsaveis;"))
+
+    def _to_base_rows(self, rows):
+        """ Converte linhas na ordem de COMPROMISSO_FIELDS para as colunas de compromissos_base.
+
+        Chamado dentro da operação de _run_write: tipos, locais e responsáveis
+        ainda desconhecidos são cadastrados na mesma transação da linha
+        (INSERT OR IGNORE: outra instância pode ter cadastrado o mesmo valor)
+        e o cache de ids só é recarregado depois do commit. hora_fim pode
+        faltar (linhas de 8 campos) e "" é gravado como NULL.
+        """
+        keys = {}
+        for row in rows:
+            if row[6] not in keys:
+                keys[row[6]] = fold_key(row[6])
+
+        new_tipos = {row[3] for row in rows} - self._tipo_ids.keys()
+        new_locais = {row[4] for row in rows} - self._local_ids.keys()
+        new_responsaveis = {}
+        for quem_vai, key in keys.items():
+            if key and key not in self._responsavel_ids:
+                new_responsaveis.setdefault(key, quem_vai.strip(" "))
+
+        tipo_ids, local_ids, responsavel_ids = self._tipo_ids, self._local_ids, self._responsavel_ids
+        if new_tipos:
+            self.conn.executemany("INSERT OR IGNORE INTO tipos_visita (nome) VALUES (?);", [(nome,) for nome in new_tipos])
+            tipo_ids = dict(self.conn.execute("SELECT nome, id FROM tipos_visita;"))
+        if new_locais:
+            self.conn.executemany("INSERT OR IGNORE INTO locais_visita (nome) VALUES (?);", [(nome,) for nome in new_locais])
+            local_ids = dict(self.conn.execute("SELECT nome, id FROM locais_visita;"))
+        if new_responsaveis:
+            self.conn.executemany("INSERT OR IGNORE INTO responsaveis (nome, chave) VALUES (?, ?);",
+                                  [(nome, key) for key, nome in new_responsaveis.items()])
+            responsavel_ids = dict(self.conn.execute("SELECT chave, id FROM responsaveis;"))
+        if new_tipos or new_locais or new_responsaveis:
+            self._lookups_changed = True
+
+        return [
+            (row[0], row[1], row[2], tipo_ids[row[3]], local_ids[row[4]], row[5],
+             responsavel_ids.get(keys[row[6]]), row[7], (row[8] if len(row) > 8 else None) or None)
+            for row in rows
+        ]
+
+    def get_lookup_values(self):
+        """ Opções das listas do AddEventDialog: {"tipo_visita": [...], "local_visita": [...], "quem_vai": [...]}. """
+        return {
+            "tipo_visita": [nome for (nome,) in self.conn.execute("SELECT nome FROM tipos_visita ORDER BY id;")],
+            "local_visita": [nome for (nome,) in self.conn.execute("SELECT nome FROM locais_visita ORDER BY id;")],
+            "quem_vai": [nome for (nome,) in self.conn.execute("SELECT nome FROM responsaveis ORDER BY nome COLLATE NOCASE;")],
+        }
+
+    def count_by_responsavel(self, start=None, end=None):
+        """ [(responsável, quantidade)] do mais ao menos ocupado, opcionalmente só de `start` a `end`.
+
+        Agrupa pelo id do responsável (sem intervalo, lê só o índice
+        idx_compromissos_responsavel_dia); compromissos sem responsável vêm como "".
+        """
+        where, params = "", ()
+        if start is not None and end is not None:
+            where, params = "WHERE data BETWEEN ? AND ?", (start, end)
+        return self.conn.execute(f"""
+            SELECT COALESCE(r.nome, ''), g.quantidade
+            FROM (SELECT quem_vai_id, COUNT(*) AS quantidade FROM compromissos_base {where} GROUP BY quem_vai_id) AS g
+            LEFT JOIN responsaveis AS r ON r.id = g.quem_vai_id
+            ORDER BY g.quantidade DESC, r.nome;
+        """, params).fetchall()
+
+    # --- RESUMO DE CARGA (RELATÓRIOS) ---
+
+    def get_workload_report(self, periodo, start=None, end=None):
+        """ [(início do período, responsável, tipo_visita, quantidade)] do resumo de carga.
+
+        `periodo` é "semana" ou "mes" (chaves de WORKLOAD_PERIODS). `start` e
+        `end` (AAAA-MM-DD, opcionais) limitam aos períodos que os contêm. Lê
+        só resumo_carga, nunca a tabela de compromissos; linhas sem
+        responsável vêm com "".
+        """
+        if periodo not in WORKLOAD_PERIODS:
+            raise ValueError(f"Período inválido: {periodo}")
+        where, params = "WHERE g.periodo = :periodo", {"periodo": periodo, "start": start, "end": end}
+        if start is not None:
+            where += f" AND g.inicio >= {WORKLOAD_PERIODS[periodo].format(data=':start')}"
+        if end is not None:
+            where += " AND g.inicio <= :end"
+        return self.conn.execute(f"""
+            SELECT g.inicio, COALESCE(r.nome, ''), t.nome, g.quantidade
+            FROM resumo_carga AS g
+            LEFT JOIN responsaveis AS r ON r.id = g.quem_vai_id
+            LEFT JOIN tipos_visita AS t ON t.id = g.tipo_id
+            {where}
+            ORDER BY g.inicio, r.nome COLLATE NOCASE, g.tipo_id;
+        """, params).fetchall()
+
+    def rebuild_workload_summary(self):
+        """ Recalcula resumo_carga a partir de todos os compromissos, em uma transação.
+
+        Os gatilhos já mantêm o resumo em dia; serve para corrigir um arquivo
+        alterado sem eles (ex.: restauração parcial). Retorna a quantidade de
+        linhas do resumo. Os compromissos arquivados também são contados.
+        """
+        statements = WORKLOAD_DAY_STATEMENTS
+        if self._uses_archive():
+            # Uma linha presente nos dois arquivos (lote interrompido) conta uma vez só
+            statements = statements + ["""
+                INSERT INTO temp.resumo_dias (data, quem_vai_id, tipo_id, quantidade)
+                SELECT data, COALESCE(quem_vai_id, 0), tipo_id, COUNT(*)
+                FROM arquivo.compromissos_base NOT INDEXED
+                WHERE id NOT IN (SELECT id FROM main.compromissos_base)
+                GROUP BY data, quem_vai_id, tipo_id;
+            """]
+        statements = statements + WORKLOAD_PERIOD_STATEMENTS
+        self._run_write(lambda: [self.conn.execute(statement) for statement in statements])
+        return self.conn.execute("SELECT COUNT(*) FROM resumo_carga;").fetchone()[0]
+
+    # --- ESCRITAS ---
+    # Gravam direto em compromissos_base: pela view (gatilhos INSTEAD OF) o
+    # sqlite3 não informa o id inserido nem a quantidade de linhas alteradas.
+    # As escritas de um compromisso retornam a linha afetada (Appointment),
+    # lida na mesma transação, para a interface atualizar só esse item.
+
+    def add_compromisso(self, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes,
+                        hora_fim=""):
+        """ Adiciona um novo agendamento e retorna o Appointment gravado, já com o id (DataManagerError em caso de falha). """
+        def add():
+            (row,) = self._to_base_rows([(data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                                          observacoes, hora_fim)])
+            new_id = self.conn.execute("""
+                INSERT INTO compromissos_base (data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes, hora_fim)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, row).lastrowid
+            return self._fetch_row(new_id)
+
+        appointment = self._run_write(add)
+        self._invalidate_dates(data)
+        return appointment
+
+    def add_compromissos_batch(self, rows):
+        """ Insere várias linhas (na ordem de COMPROMISSO_FIELDS) em uma única transação.
+
+        Retorna a quantidade inserida. Usado pela importação em massa, que
+        evita um commit (e um fsync) por linha.
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return 0
+        self._run_write(lambda: self.conn.executemany("""
+            INSERT INTO compromissos_base (data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes, hora_fim)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """, self._to_base_rows(rows)))
+        self._invalidate_dates(*{row[0] for row in rows})
+        return len(rows)
+
+    def iter_all_compromissos(self, batch_size=PAGE_SIZE):
+        """ Gera todos os compromissos (id + COMPROMISSO_FIELDS), inclusive os arquivados, ordenados por data e hora. """
+        return self._iter_rows(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {self._history_source()}
+            ORDER BY data ASC, hora ASC, id ASC;
+        """, (), batch_size)
 
     def get_compromissos_by_date(self, data):
-        """ Retorna todos os compromissos para a data, incluindo os novos campos. """
-        self.cursor.execute("""
-            SELECT id, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes 
-            FROM compromissos 
+        """ Retorna a lista de Appointment da data, ordenada por hora.
+
+        O resultado passa pelo cache LRU de dias; as escritas deste
+        DataManager descartam as datas que alteram, e uma escrita de outra
+        instância descarta o cache inteiro.
+        """
+        self._sync_data_version()
+        rows = self._day_cache.get(data)
+        if rows is not None:
+            self.day_cache_hits += 1
+            self._day_cache.move_to_end(data)
+            return list(rows)
+
+        self.day_cache_misses += 1
+        rows = self._query_day(data)
+        self._store_day(data, rows)
+        return list(rows)
+
+    def prefetch_dates(self, *dates):
+        """ Carrega no cache os dias ainda ausentes (ex.: vizinhos do dia selecionado). """
+        for data in dates:
+            if data not in self._day_cache:
+                self._store_day(data, self._query_day(data))
+
+    def prefetch_neighbors(self, data, days=1):
+        """ Pré-carrega os `days` dias antes e depois de `data` (AAAA-MM-DD). """
+        center = date.fromisoformat(data)
+        self.prefetch_dates(*(
+            (center + timedelta(days=offset)).isoformat()
+            for offset in range(-days, days + 1) if offset
+        ))
+
+    def get_day_cache_stats(self):
+        """ Contadores do cache de dias: acertos, faltas, ocupação e capacidade. """
+        return {
+            "hits": self.day_cache_hits,
+            "misses": self.day_cache_misses,
+            "size": len(self._day_cache),
+            "capacity": self.day_cache_size,
+        }
+
+    def _query_day(self, data):
+        self.appointment_cursor.execute(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {self._history_source(data)}
             WHERE data = ?
             ORDER BY hora ASC;
         """, (data,))
-        return self.cursor.fetchall()
+        rows = self.appointment_cursor.fetchall()
+        occurrences = list(self._iter_occurrences(data, data))
+        if occurrences:
+            rows = heapq.merge(rows, occurrences, key=attrgetter("hora"))
+        return tuple(rows)
+
+    def _store_day(self, data, rows):
+        if self.day_cache_size <= 0:
+            return
+        self._day_cache[data] = rows
+        self._day_cache.move_to_end(data)
+        while len(self._day_cache) > self.day_cache_size:
+            self._day_cache.popitem(last=False)
     
     def delete_compromisso(self, compromisso_id):
-        """ Remove um compromisso do banco de dados pelo seu ID. """
-        try:
-            self.cursor.execute("""
-                DELETE FROM compromissos WHERE id = ?;
-            """, (compromisso_id,))
-            self.conn.commit()
-            return True
-        except Exception as e:
-            print(f"Erro ao excluir compromisso: {e}")
-            return False
+        """ Remove um compromisso pelo ID. Retorna o Appointment excluído, ou None se ele não existia mais. """
+        if self._get_data_for_id(compromisso_id) is None:
+            self._restore_archived(compromisso_id)
+
+        def delete():
+            appointment = self._fetch_row(compromisso_id)
+            if appointment is not None:
+                self.conn.execute("DELETE FROM compromissos_base WHERE id = ?;", (compromisso_id,))
+            return appointment
+
+        appointment = self._run_write(delete)
+        if appointment is not None:
+            self._invalidate_dates(appointment.data)
+        return appointment
     
     def get_compromisso_by_id(self, compromisso_id):
-        """ Retorna todos os detalhes de um compromisso pelo seu ID. """
-        self.cursor.execute("""
-            SELECT data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes 
-            FROM compromissos 
+        """ Retorna o Appointment com o ID informado (procurado também no arquivo), ou None se ele não existir. """
+        row = self._fetch_row(compromisso_id)
+        if row is None and self._uses_archive():
+            row = self._fetch_row(compromisso_id, "temp.compromissos_arquivados")
+        return row
+
+    def _fetch_row(self, compromisso_id, source="compromissos"):
+        """ Appointment com o id em `source` (por padrão, só o agenda.db: serve dentro das transações de escrita). """
+        self.appointment_cursor.execute(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {source}
             WHERE id = ?;
         """, (compromisso_id,))
-        return self.cursor.fetchone()
+        return self.appointment_cursor.fetchone()
 
-    def update_compromisso(self, compromisso_id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes):
-        """ Atualiza um compromisso existente no banco de dados. """
-        try:
-            self.cursor.execute("""
-                UPDATE compromissos
-                SET data=?, hora=?, nome_cliente=?, tipo_visita=?, local_visita=?, endereco=?, quem_vai=?, observacoes=?
+    def update_compromisso(self, compromisso_id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes,
+                           hora_fim=""):
+        """ Atualiza um compromisso existente (um arquivado volta antes ao agenda.db).
+
+        Retorna o Appointment atualizado, ou None se ele não existia mais.
+        """
+        old_data = self._get_data_for_id(compromisso_id) or self._restore_archived(compromisso_id)
+
+        def update():
+            (row,) = self._to_base_rows([(data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                                          observacoes, hora_fim)])
+            cursor = self.conn.execute("""
+                UPDATE compromissos_base
+                SET data=?, hora=?, nome_cliente=?, tipo_id=?, local_id=?, endereco=?, quem_vai_id=?, observacoes=?, hora_fim=?
                 WHERE id=?;
-            """, (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, compromisso_id))
-            self.conn.commit()
-            return True
-        except Exception as e:
-            print(f"Erro ao atualizar compromisso: {e}")
-            return False
+            """, row + (compromisso_id,))
+            return self._fetch_row(compromisso_id) if cursor.rowcount else None
+
+        appointment = self._run_write(update)
+        # Uma mudança de data afeta o dia antigo e o novo
+        self._invalidate_dates(old_data, data)
+        return appointment
+
+    # Listagens completas (get_future/past_appointments, iter_*, exportação CSV)
+    # trazem só os compromissos gravados: uma série sem fim não tem "todas" as
+    # ocorrências. As páginas da consulta e os intervalos incluem as séries.
 
     def get_future_appointments(self):
         """ Retorna todos os compromissos com data estritamente MAIOR que a data atual. """
         today_str = date.today().strftime("%Y-%m-%d")
-        self.cursor.execute("""
-            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes 
+        self.appointment_cursor.execute("""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
             FROM compromissos 
             WHERE data > ?
             ORDER BY data ASC, hora ASC;
         """, (today_str,))
-        return self.cursor.fetchall()
+        return self.appointment_cursor.fetchall()
 
     def get_past_appointments(self):
-        """ Retorna todos os compromissos com data MENOR ou IGUAL à data atual. """
+        """ Retorna todos os compromissos com data MENOR ou IGUAL à data atual, inclusive os arquivados. """
         today_str = date.today().strftime("%Y-%m-%d")
-        self.cursor.execute("""
-            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes 
-            FROM compromissos 
+        self.appointment_cursor.execute(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {self._history_source()}
             WHERE data <= ?
             ORDER BY data DESC, hora DESC;
         """, (today_str,))
-        return self.cursor.fetchall()
+        return self.appointment_cursor.fetchall()
+
+    # --- DENSIDADE MENSAL (DESTAQUES DO CALENDÁRIO) ---
+
+    def get_month_density(self, year, month):
+        """ Retorna {data: (quantidade, tipo_visita predominante)} dos dias do mês com compromissos.
+
+        O mês inteiro é resolvido em uma única consulta agrupada e guardado em
+        cache até que uma escrita altere algum dia desse mês.
+        """
+        month_key = f"{int(year):04d}-{int(month):02d}"
+        self._sync_data_version()
+        density = self._month_density_cache.get(month_key)
+        if density is not None:
+            return density
+
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        self.cursor.execute(f"""
+            SELECT data, tipo_visita, COUNT(*)
+            FROM {self._history_source(f"{month_key}-01")}
+            WHERE data >= ? AND data < ?
+            GROUP BY data, tipo_visita;
+        """, (f"{month_key}-01", f"{int(next_year):04d}-{int(next_month):02d}-01"))
+
+        counts = self.cursor.fetchall()
+        occurrence_counts = {}
+        # Ocorrências das séries: só as datas, sem montar um Appointment por ocorrência
+        month_start, month_end = f"{month_key}-01", f"{month_key}-{calendar.monthrange(int(year), int(month))[1]:02d}"
+        for rule, template, exceptions in self._series_between(month_start, month_end):
+            for data in rule.iter_dates(template.data, month_start, month_end):
+                if data not in exceptions:
+                    occurrence_counts[data, template.tipo_visita] = occurrence_counts.get((data, template.tipo_visita), 0) + 1
+        if occurrence_counts:
+            for data, tipo_visita, quantity in counts:
+                occurrence_counts[data, tipo_visita] = occurrence_counts.get((data, tipo_visita), 0) + quantity
+            counts = [(data, tipo_visita, quantity) for (data, tipo_visita), quantity in occurrence_counts.items()]
+
+        density = {}
+        top_count_by_day = {}
+        for data, tipo_visita, quantidade in counts:
+            total, dominant = density.get(data, (0, None))
+            if quantidade > top_count_by_day.get(data, 0):
+                top_count_by_day[data] = quantidade
+                dominant = tipo_visita
+            density[data] = (total + quantidade, dominant)
+
+        self._month_density_cache[month_key] = density
+        return density
+
+    def _get_data_for_id(self, compromisso_id):
+        """ Data atual (AAAA-MM-DD) de um compromisso, ou None se ele não existir. """
+        row = self.conn.execute("SELECT data FROM compromissos_base WHERE id = ?;", (compromisso_id,)).fetchone()
+        return row[0] if row else None
+
+    def _invalidate_dates(self, *dates):
+        """ Descarta dos caches apenas as entradas que dependem das datas alteradas. """
+        for data in dates:
+            if data:
+                self._day_cache.pop(data, None)
+                self._month_density_cache.pop(data[:7], None)
+
+    # --- PAGINAÇÃO POR CHAVE (data, hora, id) ---
+
+    def _iter_rows(self, query, params, batch_size):
+        """ Percorre o resultado (Appointment) em lotes com fetchmany, sem carregar tudo na memória. """
+        # Cursor próprio para não interferir nos cursores compartilhados da instância
+        cursor = self.conn.cursor()
+        cursor.row_factory = Appointment.from_row
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def get_future_appointments_page(self, after=None, limit=PAGE_SIZE):
+        """ Retorna até `limit` compromissos futuros posteriores à chave `after`.
+
+        `after` é a tupla (data, hora, id) do último item já exibido; None
+        retorna a primeira página. O formato das linhas é o mesmo de
+        get_future_appointments.
+        """
+        if after is None:
+            # Chave maior que qualquer horário de hoje: a primeira página começa amanhã
+            after = (date.today().strftime("%Y-%m-%d"), "\uffff", _MAX_ROWID)
+        after_data, after_hora, after_id = after
+
+        # "data >= ?" delimita o início da faixa no índice; a comparação de
+        # tuplas desempata dentro do dia da chave.
+        self.appointment_cursor.execute("""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM compromissos 
+            WHERE data >= ? AND (data, hora, id) > (?, ?, ?)
+            ORDER BY data ASC, hora ASC, id ASC
+            LIMIT ?;
+        """, (after_data, after_data, after_hora, after_id, limit))
+        rows = self.appointment_cursor.fetchmany(limit)
+        occurrences = (row for row in self._iter_occurrences(start=after_data) if row.page_key > after)
+        return list(islice(heapq.merge(rows, occurrences, key=attrgetter("page_key")), limit))
+
+    def get_past_appointments_page(self, before=None, limit=PAGE_SIZE):
+        """ Retorna até `limit` compromissos passados anteriores à chave `before`.
+
+        `before` é a tupla (data, hora, id) do último item já exibido; None
+        retorna a primeira página (a mais recente). O formato das linhas é o
+        mesmo de get_past_appointments.
+        """
+        if before is None:
+            # Chave maior que qualquer horário de hoje: o dia atual entra inteiro
+            before = (date.today().strftime("%Y-%m-%d"), "\uffff", 0)
+        before_data, before_hora, before_id = before
+
+        query = """
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {source}
+            WHERE data <= ? AND (data, hora, id) < (?, ?, ?)
+            ORDER BY data DESC, hora DESC, id DESC
+            LIMIT ?;
+        """
+        params = (before_data, before_data, before_hora, before_id, limit)
+        self.appointment_cursor.execute(query.format(source="compromissos"), params)
+        rows = self.appointment_cursor.fetchmany(limit)
+        # O arquivo só é lido quando a página alcança datas anteriores ao limite
+        limite = self._archive_limit()
+        if limite is not None and (len(rows) < limit or rows[-1].data < limite) and self._attach_archive():
+            self.appointment_cursor.execute(query.format(source="temp.compromissos_arquivados"), params)
+            archived = self.appointment_cursor.fetchmany(limit)
+            rows = list(islice(heapq.merge(rows, archived, key=attrgetter("page_key"), reverse=True), limit))
+        occurrences = (row for row in self._iter_occurrences(end=before_data, reverse=True) if row.page_key < before)
+        return list(islice(heapq.merge(rows, occurrences, key=attrgetter("page_key"), reverse=True), limit))
+
+    def iter_future_appointments(self, batch_size=PAGE_SIZE):
+        """ Gera os compromissos futuros em ordem, lendo `batch_size` linhas por vez. """
+        today_str = date.today().strftime("%Y-%m-%d")
+        return self._iter_rows("""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM compromissos 
+            WHERE data > ?
+            ORDER BY data ASC, hora ASC, id ASC;
+        """, (today_str,), batch_size)
+
+    def iter_past_appointments(self, batch_size=PAGE_SIZE):
+        """ Gera os compromissos passados (mais recentes primeiro, inclusive os arquivados), lendo `batch_size` linhas por vez. """
+        today_str = date.today().strftime("%Y-%m-%d")
+        return self._iter_rows(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {self._history_source()}
+            WHERE data <= ?
+            ORDER BY data DESC, hora DESC, id DESC;
+        """, (today_str,), batch_size)
+
+    # --- INTERVALOS DE DATAS (VISÕES DE SEMANA E MÊS) ---
+
+    def get_compromissos_between(self, start, end, batch_size=PAGE_SIZE):
+        """ Gera os compromissos de `start` a `end` (AAAA-MM-DD, inclusive) ordenados por data e hora.
+
+        As linhas (Appointment) são lidas em lotes de `batch_size`, em uma
+        única consulta pelo índice de data/hora, e intercaladas com as
+        ocorrências das séries no intervalo.
+        """
+        rows = self._iter_rows(f"""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM {self._history_source(start)}
+            WHERE data BETWEEN ? AND ?
+            ORDER BY data ASC, hora ASC, id ASC;
+        """, (start, end), batch_size)
+        return heapq.merge(rows, self._iter_occurrences(start, end), key=attrgetter("page_key"))
+
+    def get_agenda_days(self, start, end):
+        """ Retorna [(data, (Appointment...))] dos dias de `start` a `end` que têm compromissos.
+
+        Agrupa o fluxo de get_compromissos_between em uma única passagem.
+        """
+        return [
+            (data, tuple(rows))
+            for data, rows in groupby(self.get_compromissos_between(start, end), key=attrgetter("data"))
+        ]
+
+    # --- CONFLITOS DE HORÁRIO (MESMO RESPONSÁVEL NO MESMO DIA) ---
+    # Dois compromissos conflitam se começam no mesmo horário ou se um começa
+    # antes do término do outro (terminar às 10:00 e começar às 10:00 não
+    # conflita). Sem hora_fim, o compromisso ocupa só o horário de início.
+    # Compromissos sem responsável nunca conflitam.
+
+    def find_conflicts(self, data, hora, hora_fim, quem_vai, exclude_id=None, exclude_recorrencia_id=None):
+        """ Compromissos (Appointment) de `quem_vai` em `data` que se sobrepõem ao intervalo hora-hora_fim.
+
+        `exclude_id` ignora o próprio compromisso ao editar e
+        `exclude_recorrencia_id`, a própria série. A consulta lê só as
+        entradas de idx_compromissos_responsavel_dia desse responsável e dia
+        que começam até o término pedido; as ocorrências de séries do dia
+        são conferidas depois, já expandidas.
+        """
+        key = fold_key(quem_vai)
+        if not key:
+            return []
+        fim = max(hora, hora_fim or hora)
+        self.appointment_cursor.execute("""
+            SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+            FROM compromissos
+            WHERE id IN (
+                SELECT c.id FROM compromissos_base AS c
+                WHERE c.quem_vai_id = (SELECT id FROM responsaveis WHERE chave = :chave)
+                  AND c.data = :data AND c.hora <= :fim
+                  AND (c.hora = :hora OR (c.hora < :fim AND max(c.hora, COALESCE(c.hora_fim, c.hora)) > :hora))
+                  AND c.id IS NOT :exclude_id
+            )
+            ORDER BY hora ASC, id ASC;
+        """, {"chave": key, "data": data, "hora": hora, "fim": fim, "exclude_id": exclude_id})
+        conflicts = self.appointment_cursor.fetchall()
+        occurrences = [
+            row for row in self._iter_occurrences(data, data)
+            if row.recorrencia_id != exclude_recorrencia_id and fold_key(row.quem_vai) == key
+            and _hours_overlap(row, hora, fim)
+        ]
+        if occurrences:
+            conflicts = sorted(conflicts + occurrences, key=attrgetter("hora"))
+        return conflicts
+
+    def find_conflicts_between(self, start, end, limit=None):
+        """ Pares (Appointment, Appointment) em conflito de `start` a `end` (AAAA-MM-DD), por data e hora.
+
+        Para cada compromisso com responsável, busca no índice de
+        responsável/dia só os que começam junto com ele ou antes do seu
+        término, em vez de comparar todos os pares de cada dia. `limit`
+        limita a quantidade de pares (os primeiros por data e hora). Só
+        compara compromissos gravados; as ocorrências de séries entram
+        apenas na verificação ao salvar (find_conflicts).
+        """
+        # Percorre o índice responsável a responsável (as duas leituras ficam no
+        # índice, sem tocar a tabela). CROSS JOIN fixa a ordem e o "+" impede o
+        # SQLite de trocar a igualdade de data do segundo acesso pelo intervalo
+        # inteiro (que o tornaria quadrático).
+        pairs = self.conn.execute("""
+            SELECT a.id, b.id
+            FROM responsaveis AS r
+            CROSS JOIN compromissos_base AS a
+            CROSS JOIN compromissos_base AS b
+              ON b.quem_vai_id = +a.quem_vai_id AND b.data = +a.data
+             AND b.hora >= a.hora AND b.hora <= max(a.hora, COALESCE(a.hora_fim, a.hora))
+             AND (b.hora > a.hora OR b.id > a.id)
+             AND (b.hora = a.hora OR b.hora < max(a.hora, COALESCE(a.hora_fim, a.hora)))
+            WHERE a.quem_vai_id = r.id AND a.data BETWEEN ? AND ?
+            ORDER BY a.data, a.hora, a.id, b.hora, b.id
+            LIMIT ?;
+        """, (start, end, -1 if limit is None else limit)).fetchall()
+
+        rows = self._get_by_ids({row_id for pair in pairs for row_id in pair})
+        return [(rows[a], rows[b]) for a, b in pairs if a in rows and b in rows]
+
+    def _get_by_ids(self, ids):
+        """ {id: Appointment} dos ids informados, lidos em blocos (limite de parâmetros do SQLite). """
+        ids = list(ids)
+        rows = {}
+        for offset in range(0, len(ids), IDS_PER_QUERY):
+            chunk = ids[offset:offset + IDS_PER_QUERY]
+            self.appointment_cursor.execute(f"""
+                SELECT id, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes, hora_fim
+                FROM compromissos
+                WHERE id IN ({", ".join("?" * len(chunk))});
+            """, chunk)
+            rows.update((row.id, row) for row in self.appointment_cursor.fetchall())
+        return rows
+
+    # --- RECORRÊNCIAS (SÉRIES EXPANDIDAS SÓ NO INTERVALO CONSULTADO) ---
+
+    def _select_series(self, where="", params=()):
+        """ [(RecurrenceRule, Appointment-modelo)] das séries que atendem `where` (modelo: data = início da série). """
+        rows = self.conn.execute(f"""
+            SELECT s.frequencia, s.intervalo, s.fim, s.ocorrencias,
+                   s.inicio, s.hora, s.nome_cliente, t.nome, l.nome, s.endereco, COALESCE(r.nome, ''), s.observacoes,
+                   COALESCE(s.hora_fim, ''), s.id
+            FROM recorrencias AS s
+            LEFT JOIN tipos_visita AS t ON t.id = s.tipo_id
+            LEFT JOIN locais_visita AS l ON l.id = s.local_id
+            LEFT JOIN responsaveis AS r ON r.id = s.quem_vai_id
+            {where};
+        """, params).fetchall()
+        return [(RecurrenceRule(*row[:4]), Appointment(None, *row[4:])) for row in rows]
+
+    def _iter_occurrences(self, start=None, end=None, reverse=False):
+        """ Ocorrências das séries de `start` a `end` (AAAA-MM-DD, inclusive; None = sem limite), na ordem de page_key.
+
+        Só as séries que podem ter ocorrências no intervalo são lidas e cada
+        uma é expandida sob demanda, a partir da primeira data do intervalo:
+        quem para de consumir (página cheia) não paga pelas seguintes.
+        """
+        return heapq.merge(*(
+            _expand_series(rule, template, exceptions, start, end, reverse)
+            for rule, template, exceptions in self._series_between(start, end)
+        ), key=attrgetter("page_key"), reverse=reverse)
+
+    def _series_between(self, start=None, end=None):
+        """ [(RecurrenceRule, Appointment-modelo, datas excluídas)] das séries que podem ter ocorrências de `start` a `end`. """
+        conditions, params = [], {"start": start, "end": end}
+        if start is not None:
+            conditions.append("(s.ultima IS NULL OR s.ultima >= :start)")
+        if end is not None:
+            conditions.append("s.inicio <= :end")
+        series = self._select_series("WHERE " + " AND ".join(conditions) if conditions else "", params)
+        if not series:
+            return []
+
+        exceptions = {}
+        for serie_id, data in self.conn.execute("""
+            SELECT recorrencia_id, data FROM recorrencia_excecoes WHERE data BETWEEN ? AND ?;
+        """, (start or "", end or "\uffff")):
+            exceptions.setdefault(serie_id, set()).add(data)
+        return [(rule, template, exceptions.get(template.recorrencia_id, ())) for rule, template in series]
+
+    def get_recorrencia(self, serie_id):
+        """ (RecurrenceRule, Appointment-modelo) da série, ou None se ela não existir. """
+        series = self._select_series("WHERE s.id = ?", (serie_id,))
+        return series[0] if series else None
+
+    def add_recorrencia(self, rule, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes,
+                        hora_fim=""):
+        """ Cria uma série que começa em `data` e se repete segundo `rule` (RecurrenceRule). Retorna o id da série. """
+        def add():
+            (row,) = self._to_base_rows([(data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                                          observacoes, hora_fim)])
+            return self.conn.execute("""
+                INSERT INTO recorrencias (frequencia, intervalo, fim, ocorrencias, ultima,
+                                          inicio, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes, hora_fim)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, rule.as_row(data) + row)
+
+        cursor = self._run_write(add)
+        self._invalidate_series()
+        return cursor.lastrowid
+
+    def update_recorrencia(self, serie_id, rule, data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                           observacoes, hora_fim=""):
+        """ Altera a série inteira (regra e campos). As ocorrências já separadas ou excluídas continuam fora dela.
+
+        Retorna False se a série não existia mais.
+        """
+        def update():
+            (row,) = self._to_base_rows([(data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                                          observacoes, hora_fim)])
+            return self.conn.execute("""
+                UPDATE recorrencias
+                SET frequencia=?, intervalo=?, fim=?, ocorrencias=?, ultima=?,
+                    inicio=?, hora=?, nome_cliente=?, tipo_id=?, local_id=?, endereco=?, quem_vai_id=?, observacoes=?, hora_fim=?
+                WHERE id=?;
+            """, rule.as_row(data) + row + (serie_id,))
+
+        cursor = self._run_write(update)
+        self._invalidate_series()
+        return cursor.rowcount > 0
+
+    def delete_recorrencia(self, serie_id):
+        """ Exclui a série inteira (as exceções saem junto, pelo gatilho). Retorna False se ela não existia mais. """
+        cursor = self._write("DELETE FROM recorrencias WHERE id = ?;", (serie_id,))
+        self._invalidate_series()
+        return cursor.rowcount > 0
+
+    def skip_ocorrencia(self, serie_id, data):
+        """ Exclui só a ocorrência de `data`. Retorna False se a série não existia ou a data já estava excluída. """
+        cursor = self._write("""
+            INSERT OR IGNORE INTO recorrencia_excecoes (recorrencia_id, data)
+            SELECT id, ? FROM recorrencias WHERE id = ?;
+        """, (data, serie_id))
+        self._invalidate_dates(data)
+        return cursor.rowcount > 0
+
+    def detach_ocorrencia(self, serie_id, data_ocorrencia, data, hora, nome_cliente, tipo_visita, local_visita, endereco,
+                          quem_vai, observacoes, hora_fim=""):
+        """ Edita só a ocorrência de `data_ocorrencia`: ela sai da série e vira um compromisso comum com os novos campos.
+
+        As duas gravações são uma transação. Retorna o novo compromisso
+        (Appointment), ou None se a ocorrência não existia mais.
+        """
+        def detach():
+            cursor = self.conn.execute("""
+                INSERT OR IGNORE INTO recorrencia_excecoes (recorrencia_id, data)
+                SELECT id, ? FROM recorrencias WHERE id = ?;
+            """, (data_ocorrencia, serie_id))
+            if cursor.rowcount == 0:
+                return None
+            (row,) = self._to_base_rows([(data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai,
+                                          observacoes, hora_fim)])
+            new_id = self.conn.execute("""
+                INSERT INTO compromissos_base (data, hora, nome_cliente, tipo_id, local_id, endereco, quem_vai_id, observacoes, hora_fim)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, row).lastrowid
+            return self._fetch_row(new_id)
+
+        appointment = self._run_write(detach)
+        self._invalidate_dates(data_ocorrencia, data)
+        return appointment
+
+    def _invalidate_series(self):
+        """ Uma série alcança qualquer dia: descarta os caches de dias e de meses inteiros. """
+        self._day_cache.clear()
+        self._month_density_cache.clear()
+
+    # --- MUDANÇAS DE OUTRAS INSTÂNCIAS ---
+    # PRAGMA data_version muda quando outra conexão confirma uma escrita no
+    # agenda.db; as escritas desta conexão não o alteram (elas já descartam o
+    # que mudou). A leitura não toca em nenhuma tabela, então pode ser feita a
+    # cada poucos segundos. Arquivamento e restauração alteram também o
+    # agenda.db, então a versão dele basta.
+
+    def get_data_version(self):
+        """ Versão dos dados vista por esta conexão: muda só quando outra instância grava no banco.
+
+        Quem exibe dados compara com o valor anterior para saber se precisa
+        consultá-los de novo. Ao mudar, os caches de dias e meses são descartados.
+        """
+        return self._sync_data_version()
+
+    def _sync_data_version(self):
+        """ Descarta os caches se outra instância gravou desde a última verificação; retorna a versão. """
+        version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            # A escrita pode ter alcançado qualquer dia
+            self._invalidate_series()
+        return version
+
+    # --- ARQUIVAMENTO (HISTÓRICO ANTIGO EM OUTRO ARQUIVO) ---
+    # As consultas de datas a partir do limite (o dia, as páginas recentes, a
+    # semana atual) leem só o agenda.db; as que alcançam datas anteriores leem
+    # a view temp.historico, que junta as duas partes. Conflitos de horário e
+    # count_by_responsavel consideram só o agenda.db.
+
+    def _archive_limit(self):
+        """ Data de corte do arquivamento (AAAA-MM-DD), ou None se nada foi arquivado. """
+        row = self.conn.execute("SELECT limite FROM arquivamento WHERE id = 1;").fetchone()
+        return row[0] if row else None
+
+    def _attach_archive(self, create=False):
+        """ Anexa o arquivo (schema 'arquivo') e cria as views temporárias, uma vez por conexão.
+
+        Retorna False se o arquivo não existe e `create` é False. ATTACH não
+        pode rodar dentro de uma transação: as leituras e escritas do
+        DataManager o chamam antes de abri-la.
+        """
+        if self._archive_attached:
+            return True
+        if not create and not os.path.exists(self.archive_path):
+            return False
+        try:
+            if self.read_only:
+                self.conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA};", (_read_only_uri(self.archive_path),))
+            else:
+                self.conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA};", (self.archive_path,))
+                # Mesmo journal do agenda.db. Em WAL o commit não é atômico entre os
+                # dois arquivos: um lote interrompido pode deixar linhas nos dois, e
+                # o próximo arquivamento desfaz a duplicata (ARCHIVE_CLEANUP_STATEMENTS).
+                self.conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = {self.journal_mode};")
+                if self.journal_mode == "WAL":
+                    self.conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.synchronous = NORMAL;")
+            for statement in ARCHIVE_STATEMENTS:
+                self.conn.execute(statement)
+        except sqlite3.Error as e:
+            if self.conn.execute("SELECT 1 FROM pragma_database_list WHERE name = ?;", (ARCHIVE_SCHEMA,)).fetchone():
+                self.conn.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA};")
+            raise DataManagerError(f"Não foi possível abrir o arquivo de compromissos antigos: {e}") from e
+        self._archive_attached = True
+        return True
+
+    def _uses_archive(self, start=None):
+        """ Indica se uma leitura a partir de `start` (None = desde o início) precisa do arquivo, anexando-o se preciso. """
+        limite = self._archive_limit()
+        return limite is not None and (start is None or start < limite) and self._attach_archive()
+
+    def _history_source(self, start=None):
+        """ Tabela (view) das leituras a partir de `start`: só o agenda.db ou o histórico completo. """
+        return "temp.historico" if self._uses_archive(start) else "compromissos"
+
+    def archive_older_than(self, days=DEFAULT_ARCHIVE_AGE_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+        """ Move para o arquivo os compromissos com mais de `days` dias, em lotes de `batch_size`.
+
+        Cada lote é uma transação própria (outras instâncias podem gravar
+        entre um e outro); o limite é gravado antes, então as consultas já
+        procuram no arquivo durante o processo. Retorna a quantidade movida.
+        As séries (recorrências) ficam no agenda.db.
+        """
+        if days < 0:
+            raise ValueError(f"Idade inválida: {days}")
+        limite = (date.today() - timedelta(days=days)).isoformat()
+        self._attach_archive(create=True)
+
+        def start():
+            for statement in ARCHIVE_CLEANUP_STATEMENTS:
+                self.conn.execute(statement)
+            # O limite nunca recua: o que já foi arquivado continua coberto
+            self.conn.execute("""
+                INSERT INTO arquivamento (id, limite) VALUES (1, ?)
+                ON CONFLICT (id) DO UPDATE SET limite = max(limite, excluded.limite);
+            """, (limite,))
+
+        self._run_write(start)
+
+        def archive_batch():
+            self.conn.execute("DELETE FROM temp.arquivar;")
+            moved = self.conn.execute("""
+                INSERT INTO temp.arquivar (id)
+                SELECT id FROM main.compromissos_base WHERE data < ? ORDER BY data, hora LIMIT ?;
+            """, (limite, batch_size)).rowcount
+            for statement in ARCHIVE_BATCH_STATEMENTS:
+                self.conn.execute(statement)
+            return moved
+
+        total = 0
+        while True:
+            moved = self._run_write(archive_batch)
+            total += moved
+            if moved < batch_size:
+                break
+        # As linhas continuam visíveis iguais (pelo histórico): os caches seguem válidos
+        return total
+
+    def _restore_archived(self, compromisso_id):
+        """ Devolve ao agenda.db um compromisso arquivado, em uma transação. Retorna sua data, ou None se ele não está no arquivo. """
+        if not self._uses_archive():
+            return None
+
+        def restore():
+            params = {"id": compromisso_id}
+            row = self.conn.execute("SELECT data FROM arquivo.compromissos_base WHERE id = :id;", params).fetchone()
+            if row is None:
+                return None
+            if self.conn.execute(ARCHIVE_RESTORE_STATEMENT, params).rowcount:
+                for statement in ARCHIVE_RESTORE_ADJUST:
+                    self.conn.execute(statement, params)
+            for statement in ARCHIVE_REMOVE_STATEMENTS:
+                self.conn.execute(statement, params)
+            return row[0]
+
+        return self._run_write(restore)
+
+    def vacuum(self):
+        """ Compacta o agenda.db (e o arquivo, se existir) e retorna o novo tamanho do agenda.db em bytes.
+
+        Depois de arquivar, o FTS principal guarda uma marca de exclusão por
+        linha que saiu: 'optimize' junta os segmentos antes do VACUUM, que
+        então devolve o espaço ao disco.
+        """
+        schemas = ["main"] + ([ARCHIVE_SCHEMA] if self._attach_archive() else [])
+        for schema in schemas:
+            self._run_write(lambda: self.conn.execute(f"""
+                INSERT INTO {schema}.compromissos_fts (compromissos_fts) VALUES ('optimize');
+            """))
+            self._run_write(lambda: self.conn.execute(f"VACUUM {schema};"))
+        if self.journal_mode == "WAL":
+            self.conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE);")
+        return os.path.getsize(self.db_path)
+
+    def get_stats(self):
+        """ Números gerais do banco e do arquivo, para manutenção (agenda_cli.py stats).
+
+        Contagens e primeira/última data vêm de compromissos_base (e da tabela
+        do arquivo, se ele existir); as ocorrências de séries não são contadas.
+        """
+        quantidade, first, last = self.conn.execute("SELECT COUNT(*), MIN(data), MAX(data) FROM main.compromissos_base;").fetchone()
+        stats = {
+            "db_path": self.db_path,
+            "db_size_bytes": os.path.getsize(self.db_path),
+            "schema_version": self.get_schema_version(),
+            "journal_mode": self.journal_mode,
+            "appointments": quantidade,
+            "first_date": first,
+            "last_date": last,
+            "series": self.conn.execute("SELECT COUNT(*) FROM recorrencias;").fetchone()[0],
+            "archive_path": None,
+            "archive_size_bytes": 0,
+            "archive_limit": self._archive_limit(),
+            "archived_appointments": 0,
+        }
+        if self._uses_archive():
+            quantidade, first = self.conn.execute(
+                f"SELECT COUNT(*), MIN(data) FROM {ARCHIVE_SCHEMA}.compromissos_base;"
+            ).fetchone()
+            stats.update(archive_path=self.archive_path, archive_size_bytes=os.path.getsize(self.archive_path),
+                         archived_appointments=quantidade, first_date=min(filter(None, (first, stats["first_date"])), default=None))
+        return stats
+
+    # --- BUSCA TEXTUAL (FTS5) ---
+
+    def search(self, text, limit=PAGE_SIZE, offset=0):
+        """ Busca em cliente, endereço, responsável e observações, ignorando acentos.
+
+        Retorna até `limit` linhas no formato de get_future_appointments. As
+        SEARCH_RANK_WINDOW ocorrências mais recentes vêm primeiro, da mais
+        relevante para a menos; as demais seguem da mais nova para a mais
+        antiga e, por fim, vêm as arquivadas. `offset` pula as linhas já
+        exibidas.
+        """
+        match_query = build_search_query(text)
+        if not match_query:
+            return []
+
+        rows = []
+        if offset < SEARCH_RANK_WINDOW:
+            # Pontua só a janela de ocorrências recentes, não todas
+            rows = self._search_hits("""
+                SELECT rowid, score FROM (
+                    SELECT rowid, rank AS score FROM compromissos_fts
+                    WHERE compromissos_fts MATCH ?
+                    ORDER BY rowid DESC
+                    LIMIT ?
+                )
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            """, (match_query, SEARCH_RANK_WINDOW, limit, offset))
+
+        if len(rows) < limit and offset + len(rows) >= SEARCH_RANK_WINDOW:
+            rows += self._search_hits("""
+                SELECT rowid, -rowid AS score FROM compromissos_fts
+                WHERE compromissos_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ? OFFSET ?
+            """, (match_query, limit - len(rows), offset + len(rows)))
+
+        # Acabaram os resultados do agenda.db: continua no arquivo, do mais novo para o mais antigo
+        if len(rows) < limit and self._uses_archive():
+            if rows:
+                hot_count = offset + len(rows)
+            else:
+                hot_count = self.conn.execute("""
+                    SELECT COUNT(*) FROM compromissos_fts WHERE compromissos_fts MATCH ?;
+                """, (match_query,)).fetchone()[0]
+            rows += self._search_hits("""
+                SELECT rowid, -rowid AS score FROM arquivo.compromissos_fts
+                WHERE compromissos_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ? OFFSET ?
+            """, (match_query, limit - len(rows), max(0, offset + len(rows) - hot_count)),
+                source="temp.compromissos_arquivados")
+        return rows
+
+    def _search_hits(self, hits_query, params, source="compromissos"):
+        """ Lê de `source` (a view principal ou a dos arquivados) as linhas dos rowids (rowid, score) de `hits_query`. """
+        self.appointment_cursor.execute(f"""
+            SELECT c.id, c.data, c.hora, c.nome_cliente, c.tipo_visita, c.local_visita, c.endereco, c.quem_vai, c.observacoes,
+                   c.hora_fim
+            FROM ({hits_query}) AS hits
+            JOIN {source} AS c ON c.id = hits.rowid
+            ORDER BY hits.score;
+        """, params)
+        return self.appointment_cursor.fetchall()
+
+    @staticmethod
+    def page_key(row):
+        """ Extrai a chave de paginação (data, hora, id) de um Appointment. """
+        return row.page_key
 
     def close(self):
         self.conn.close()
\ No newline at end of file
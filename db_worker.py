@@ -0,0 +1,141 @@
+from itertools import count
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from database import DataManager
+
+
+class DbRequest:
+    """ Pedido ao worker: método do DataManager, argumentos e canal opcional.
+
+    `method` é o nome de um método do DataManager ou uma função que recebe
+    o DataManager da thread como primeiro argumento (ex.: csv_io.import_csv).
+
+    Pedidos do mesmo canal se substituem: só a resposta do mais recente é
+    entregue (ex.: cliques rápidos no calendário).
+    """
+    __slots__ = ("request_id", "method", "args", "channel", "callback", "error_callback")
+
+    def __init__(self, request_id, method, args, channel=None, callback=None, error_callback=None):
+        self.request_id = request_id
+        self.method = method
+        self.args = args
+        self.channel = channel
+        self.callback = callback
+        self.error_callback = error_callback
+
+# --- WORKER (VIVE NA THREAD DO BANCO) ---
+
+class DatabaseWorker(QObject):
+    finished = pyqtSignal(int, object)  # Emite (request_id, resultado)
+    failed = pyqtSignal(int, str)       # Emite (request_id, mensagem de erro)
+
+    def __init__(self, db_name, latest_by_channel, data_manager_options=None):
+        super().__init__()
+        self.db_name = db_name
+        self.data_manager_options = data_manager_options or {}
+        self._latest_by_channel = latest_by_channel
+        self._data_manager = None
+
+    @pyqtSlot(object)
+    def handle_request(self, request):
+        """ Executa o pedido no DataManager da thread e emite o resultado. """
+        # Pedido já substituído por outro mais novo do mesmo canal: nem executa
+        if request.channel is not None and self._latest_by_channel.get(request.channel) != request.request_id:
+            return
+
+        try:
+            # A conexão é criada (e migrada) aqui, na thread que vai usá-la
+            if self._data_manager is None:
+                self._data_manager = DataManager(self.db_name, **self.data_manager_options)
+            if callable(request.method):
+                result = request.method(self._data_manager, *request.args)
+            else:
+                result = getattr(self._data_manager, request.method)(*request.args)
+        except Exception as e:
+            self.failed.emit(request.request_id, str(e))
+            return
+
+        self.finished.emit(request.request_id, result)
+
+    @pyqtSlot()
+    def close(self):
+        if self._data_manager is not None:
+            self._data_manager.close()
+            self._data_manager = None
+
+# --- FACHADA ASSÍNCRONA USADA PELA INTERFACE ---
+
+class AsyncDataManager(QObject):
+    """ Executa os métodos do DataManager em uma QThread dedicada.
+
+    `submit` retorna imediatamente; o resultado chega no callback, já na
+    thread da interface. O DataManager continua disponível diretamente como
+    fachada síncrona para scripts.
+    """
+    _request_submitted = pyqtSignal(object)
+    _close_requested = pyqtSignal()
+
+    def __init__(self, db_name='agenda.db', parent=None, **data_manager_options):
+        """ `data_manager_options` são repassados ao DataManager (ex.: day_cache_size). """
+        super().__init__(parent)
+        self._ids = count(1)
+        self._pending = {}
+        self._latest_by_channel = {}
+
+        self._thread = QThread()
+        self._worker = DatabaseWorker(db_name, self._latest_by_channel, data_manager_options)
+        self._worker.moveToThread(self._thread)
+
+        # Conexões entre threads diferentes são enfileiradas automaticamente
+        self._request_submitted.connect(self._worker.handle_request)
+        self._close_requested.connect(self._worker.close)
+        self._worker.finished.connect(self._on_finished)
+        self._worker.failed.connect(self._on_failed)
+
+        self._thread.start()
+
+    def submit(self, method, *args, callback=None, error_callback=None, channel=None):
+        """ Agenda `DataManager.<method>(*args)` (ou `method(data_manager, *args)`) e retorna o id do pedido. """
+        request_id = next(self._ids)
+        request = DbRequest(request_id, method, args, channel, callback, error_callback)
+        self._pending[request_id] = request
+        if channel is not None:
+            # O pedido anterior do canal deixa de ser aguardado
+            self._pending.pop(self._latest_by_channel.get(channel), None)
+            self._latest_by_channel[channel] = request_id
+        self._request_submitted.emit(request)
+        return request_id
+
+    def is_pending(self, channel):
+        """ Indica se o pedido mais recente do canal ainda não respondeu. """
+        return self._latest_by_channel.get(channel) in self._pending
+
+    def _take_current(self, request_id):
+        """ Remove o pedido da fila; retorna None se ele ficou obsoleto. """
+        request = self._pending.pop(request_id, None)
+        if request is None:
+            return None
+        if request.channel is not None and self._latest_by_channel.get(request.channel) != request_id:
+            return None
+        return request
+
+    def _on_finished(self, request_id, result):
+        request = self._take_current(request_id)
+        if request is not None and request.callback is not None:
+            request.callback(result)
+
+    def _on_failed(self, request_id, message):
+        request = self._take_current(request_id)
+        if request is None:
+            return
+        if request.error_callback is not None:
+            request.error_callback(message)
+        else:
+            print(f"Erro no banco de dados ({request.method}): {message}")
+
+    def close(self):
+        """ Fecha a conexão na thread do banco e encerra a thread. """
+        self._close_requested.emit()
+        self._thread.quit()
+        self._thread.wait()
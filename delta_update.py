@@ -0,0 +1,272 @@
+""" Atualizações por diferença binária (delta) entre dois executáveis.
+
+O executável do PyInstaller guarda cada módulo comprimido separadamente,
+então uma versão nova repete quase todos os bytes da anterior, só que em
+outras posições. O delta divide os dois arquivos em blocos definidos pelo
+conteúdo (gear hash: os cortes acompanham os bytes, não a posição) e grava
+COPY(posição, tamanho) para os blocos que já existem no executável antigo e
+INSERT(bytes) para o resto, tudo comprimido com lzma.
+
+Formato: MAGIC, tamanho do cabeçalho (4 bytes), cabeçalho JSON (hashes e
+tamanhos de origem e destino) e o fluxo lzma de operações.
+
+Uso (gera o delta e os .sha256 a publicar na release):
+    python delta_update.py make dist/1.1/AgendaDataServis.exe dist/AgendaDataServis.exe --from 1.1 --to 1.2
+    python delta_update.py apply AgendaDataServis.exe AgendaDataServis_1.1_to_1.2.delta novo.exe
+"""
+import argparse
+import hashlib
+import json
+import lzma
+import os
+import random
+import struct
+import sys
+import time
+
+
+MAGIC = b"ADSDELTA1\n"
+DELTA_SUFFIX = ".delta"
+
+# Blocos com ~8 KB em média, entre 2 KB e 64 KB
+CHUNK_MIN = 2 * 1024
+CHUNK_MAX = 64 * 1024
+CHUNK_MASK = (1 << 13) - 1
+
+_MASK64 = (1 << 64) - 1
+# Tabela fixa: geradores e aplicadores precisam cortar os blocos do mesmo jeito
+_gear_rng = random.Random(20240)
+_GEAR = [_gear_rng.getrandbits(64) for _ in range(256)]
+del _gear_rng
+
+_OP_COPY = b"C"
+_OP_INSERT = b"I"
+_COPY_STRUCT = struct.Struct("<QI")
+_LEN_STRUCT = struct.Struct("<I")
+IO_CHUNK_SIZE = 1024 * 1024
+
+
+class DeltaError(Exception):
+    """ Delta inválido, feito para outro executável ou com resultado que não confere. """
+
+
+def delta_asset_name(from_version, to_version, base_name="AgendaDataServis"):
+    """ Nome do asset publicado na release para atualizar de `from_version` para `to_version`. """
+    return f"{base_name}_{from_version}_to_{to_version}{DELTA_SUFFIX}"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(IO_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_chunks(data):
+    """ Gera (início, fim) dos blocos definidos pelo conteúdo. """
+    gear = _GEAR
+    size = len(data)
+    start = 0
+    while start < size:
+        end = min(start + CHUNK_MAX, size)
+        i = start + CHUNK_MIN
+        if i >= end:
+            yield start, end
+            return
+        h = 0
+        while i < end:
+            h = ((h << 1) + gear[data[i]]) & _MASK64
+            i += 1
+            if not h & CHUNK_MASK:
+                break
+        yield start, i
+        start = i
+
+
+def _chunk_index(data):
+    """ {hash do bloco: posição} do executável antigo. """
+    index = {}
+    for start, end in iter_chunks(data):
+        index.setdefault(hashlib.blake2b(data[start:end], digest_size=16).digest(), start)
+    return index
+
+
+def make_delta(source_path, target_path, delta_path):
+    """ Gera o delta de `source_path` para `target_path` e retorna estatísticas em um dicionário. """
+    started = time.perf_counter()
+    with open(source_path, "rb") as f:
+        source = f.read()
+    with open(target_path, "rb") as f:
+        target = f.read()
+
+    index = _chunk_index(source)
+    header = {
+        "source_sha256": hashlib.sha256(source).hexdigest(),
+        "source_size": len(source),
+        "target_sha256": hashlib.sha256(target).hexdigest(),
+        "target_size": len(target),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    copied = inserted = 0
+    with open(delta_path, "wb") as out:
+        out.write(MAGIC + _LEN_STRUCT.pack(len(header_bytes)) + header_bytes)
+        with lzma.open(out, "wb", preset=9 | lzma.PRESET_EXTREME) as ops:
+            copy_start = copy_length = 0
+            pending_insert = []
+
+            def flush_copy():
+                if copy_length:
+                    ops.write(_OP_COPY + _COPY_STRUCT.pack(copy_start, copy_length))
+
+            def flush_insert():
+                if pending_insert:
+                    data = b"".join(pending_insert)
+                    ops.write(_OP_INSERT + _LEN_STRUCT.pack(len(data)) + data)
+                    pending_insert.clear()
+
+            for start, end in iter_chunks(target):
+                block = target[start:end]
+                offset = index.get(hashlib.blake2b(block, digest_size=16).digest())
+                if offset is not None and source[offset:offset + len(block)] == block:
+                    flush_insert()
+                    if copy_length and copy_start + copy_length == offset:
+                        copy_length += len(block)  # Blocos contíguos viram um único COPY
+                    else:
+                        flush_copy()
+                        copy_start, copy_length = offset, len(block)
+                    copied += len(block)
+                else:
+                    flush_copy()
+                    copy_length = 0
+                    pending_insert.append(block)
+                    inserted += len(block)
+            flush_copy()
+            flush_insert()
+
+    return {
+        "delta_path": delta_path,
+        "delta_size": os.path.getsize(delta_path),
+        "target_size": len(target),
+        "copied_bytes": copied,
+        "inserted_bytes": inserted,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def read_header(delta_file):
+    if delta_file.read(len(MAGIC)) != MAGIC:
+        raise DeltaError("arquivo não é um delta da agenda")
+    (length,) = _LEN_STRUCT.unpack(delta_file.read(_LEN_STRUCT.size))
+    return json.loads(delta_file.read(length).decode("utf-8"))
+
+
+def apply_delta(source_path, delta_path, output_path, expected_sha256=None):
+    """ Reconstrói o executável novo em `output_path` e confere o SHA-256.
+
+    `expected_sha256` (o publicado na release) tem prioridade sobre o hash
+    gravado no delta. Levanta DeltaError se o executável de origem não for o
+    esperado pelo delta ou se o resultado não conferir; nesse caso
+    `output_path` é removido.
+    """
+    try:
+        delta_file = open(delta_path, "rb")
+    except OSError as e:
+        raise DeltaError(f"não foi possível abrir o delta: {e}") from e
+    with delta_file:
+        try:
+            header = read_header(delta_file)
+            expected = (expected_sha256 or header["target_sha256"]).lower()
+            source_size, source_sha256 = header["source_size"], header["source_sha256"]
+        except (struct.error, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise DeltaError(f"cabeçalho do delta inválido: {e}") from e
+        try:
+            source_matches = (os.path.getsize(source_path) == source_size
+                              and file_sha256(source_path) == source_sha256)
+        except OSError as e:
+            raise DeltaError(f"não foi possível ler o executável instalado: {e}") from e
+        if not source_matches:
+            raise DeltaError("o executável instalado não é a versão de origem do delta")
+
+        digest = hashlib.sha256()
+        try:
+            with open(source_path, "rb") as source, open(output_path, "wb") as out, \
+                    lzma.open(delta_file, "rb") as ops:
+                while True:
+                    op = ops.read(1)
+                    if not op:
+                        break
+                    if op == _OP_COPY:
+                        offset, length = _COPY_STRUCT.unpack(ops.read(_COPY_STRUCT.size))
+                        source.seek(offset)
+                        while length:
+                            data = source.read(min(length, IO_CHUNK_SIZE))
+                            if not data:
+                                raise DeltaError("cópia além do fim do executável de origem")
+                            out.write(data)
+                            digest.update(data)
+                            length -= len(data)
+                    elif op == _OP_INSERT:
+                        (length,) = _LEN_STRUCT.unpack(ops.read(_LEN_STRUCT.size))
+                        data = ops.read(length)
+                        if len(data) != length:
+                            raise DeltaError("delta truncado")
+                        out.write(data)
+                        digest.update(data)
+                    else:
+                        raise DeltaError("operação desconhecida no delta")
+            if digest.hexdigest() != expected:
+                raise DeltaError("o executável reconstruído não confere com o SHA-256 publicado")
+        except (DeltaError, lzma.LZMAError, struct.error, OSError) as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            if isinstance(e, DeltaError):
+                raise
+            raise DeltaError(f"falha ao aplicar o delta: {e}") from e
+    return output_path
+
+
+def _write_sha256_file(path):
+    """ Grava "<arquivo>.sha256" no formato do sha256sum, como o download espera. """
+    with open(path + ".sha256", "w", encoding="ascii") as f:
+        f.write(f"{file_sha256(path)}  {os.path.basename(path)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    make = commands.add_parser("make", help="gera o delta entre dois builds")
+    make.add_argument("old_exe")
+    make.add_argument("new_exe")
+    make.add_argument("--from", dest="from_version", required=True, help="versão do build antigo (ex.: 1.1)")
+    make.add_argument("--to", dest="to_version", required=True, help="versão do build novo (ex.: 1.2)")
+    make.add_argument("--output-dir", default=None, help="pasta de saída (padrão: a do build novo)")
+
+    apply = commands.add_parser("apply", help="aplica um delta (teste manual)")
+    apply.add_argument("old_exe")
+    apply.add_argument("delta")
+    apply.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "make":
+        output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.new_exe))
+        base_name = os.path.splitext(os.path.basename(args.new_exe))[0]
+        delta_path = os.path.join(output_dir, delta_asset_name(args.from_version, args.to_version, base_name))
+        stats = make_delta(args.old_exe, args.new_exe, delta_path)
+        _write_sha256_file(delta_path)
+        _write_sha256_file(args.new_exe)
+        stats["ratio"] = round(stats["delta_size"] / stats["target_size"], 4) if stats["target_size"] else None
+        print(json.dumps(stats, indent=2))
+    else:
+        try:
+            apply_delta(args.old_exe, args.delta, args.output)
+        except DeltaError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{args.output} reconstruído e conferido")
+
+
+if __name__ == "__main__":
+    main()
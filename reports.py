@@ -0,0 +1,225 @@
+""" Relatórios de carga: compromissos por responsável, semana/mês e tipo de visita.
+
+Importado só quando o usuário abre os relatórios. Os números vêm de
+DataManager.get_workload_report, que lê o resumo mantido pelos gatilhos do
+banco (resumo_carga), e não da tabela de compromissos: o diálogo abre na
+hora seja qual for o tamanho do histórico. Trocar o responsável filtra as
+linhas já recebidas, sem nova consulta.
+"""
+from PyQt5.QtCore import QDate, Qt
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QComboBox, QDateEdit, QDialog, QHBoxLayout, QHeaderView, QLabel,
+    QMessageBox, QPushButton, QTabWidget, QTableWidget, QTableWidgetItem, QVBoxLayout
+)
+
+from database import TIPOS_VISITA
+
+
+# (chave de WORKLOAD_PERIODS, rótulo)
+PERIODS = (("semana", "Semanal"), ("mes", "Mensal"))
+# Intervalo inicial: os últimos meses até o fim do mês atual
+DEFAULT_MONTHS_BACK = 11
+
+ALL_RESPONSAVEIS = "Todos os responsáveis"
+NO_RESPONSAVEL = "(sem responsável)"
+TOTAL_LABEL = "Total"
+
+
+def period_label(periodo, inicio):
+    """ Texto de um período a partir da data de início gravada no resumo (AAAA-MM-DD). """
+    start = QDate.fromString(inicio, "yyyy-MM-dd")
+    if not start.isValid():
+        return inicio
+    if periodo == "semana":
+        return f"{start.toString('dd/MM')} a {start.addDays(6).toString('dd/MM/yyyy')}"
+    return start.toString("MMMM 'de' yyyy")
+
+
+def pivot(rows, key):
+    """ Soma as linhas (início, responsável, tipo, quantidade) por `key(linha)` e por tipo.
+
+    Retorna {chave: {tipo: quantidade}}, com as chaves na ordem em que
+    aparecem em `rows`.
+    """
+    table = {}
+    for row in rows:
+        counts = table.setdefault(key(row), {})
+        counts[row[2]] = counts.get(row[2], 0) + row[3]
+    return table
+
+
+class ReportsDialog(QDialog):
+    def __init__(self, db_manager, lookup_values=None, parent=None):
+        """ Diálogo de relatórios. `lookup_values` (get_lookup_values) dá a ordem das colunas de tipo. """
+        super().__init__(parent)
+        self.setWindowTitle("Relatórios de Carga")
+        self.resize(820, 560)
+
+        self.db_manager = db_manager
+        self.tipos = list((lookup_values or {}).get("tipo_visita") or TIPOS_VISITA)
+        self.rows = []          # Última resposta de get_workload_report
+        self._periodo = None    # Período da resposta em self.rows
+
+        main_layout = QVBoxLayout(self)
+
+        # 1. FILTROS (PERÍODO, INTERVALO E RESPONSÁVEL)
+        filters_layout = QHBoxLayout()
+
+        self.period_combo = QComboBox()
+        for periodo, label in PERIODS:
+            self.period_combo.addItem(label, periodo)
+        self.period_combo.setCurrentIndex(1)
+
+        today = QDate.currentDate()
+        self.start_edit = QDateEdit(QDate(today.year(), today.month(), 1).addMonths(-DEFAULT_MONTHS_BACK))
+        self.end_edit = QDateEdit(QDate(today.year(), today.month(), today.daysInMonth()))
+        for edit in (self.start_edit, self.end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("dd/MM/yyyy")
+
+        self.responsavel_combo = QComboBox()
+        self.responsavel_combo.addItem(ALL_RESPONSAVEIS, None)
+        for nome in (lookup_values or {}).get("quem_vai", []):
+            self.responsavel_combo.addItem(nome, nome)
+        self.responsavel_combo.addItem(NO_RESPONSAVEL, "")
+
+        self.rebuild_button = QPushButton("Recalcular")
+        self.rebuild_button.setToolTip("Recalcula o resumo a partir de todos os compromissos.")
+
+        filters_layout.addWidget(QLabel("Período:"))
+        filters_layout.addWidget(self.period_combo)
+        filters_layout.addWidget(QLabel("De:"))
+        filters_layout.addWidget(self.start_edit)
+        filters_layout.addWidget(QLabel("Até:"))
+        filters_layout.addWidget(self.end_edit)
+        filters_layout.addWidget(self.responsavel_combo, 1)
+        filters_layout.addWidget(self.rebuild_button)
+        main_layout.addLayout(filters_layout)
+
+        # 2. TABELAS (UMA POR QUEBRA)
+        self.tabs = QTabWidget()
+        self.by_period_table = self._new_table()
+        self.by_responsavel_table = self._new_table()
+        self.by_tipo_table = self._new_table()
+        self.tabs.addTab(self.by_period_table, "Por período")
+        self.tabs.addTab(self.by_responsavel_table, "Por responsável")
+        self.tabs.addTab(self.by_tipo_table, "Por tipo")
+        main_layout.addWidget(self.tabs)
+
+        self.status_label = QLabel()
+        main_layout.addWidget(self.status_label)
+
+        self.period_combo.currentIndexChanged.connect(self._load_report)
+        self.start_edit.dateChanged.connect(self._load_report)
+        self.end_edit.dateChanged.connect(self._load_report)
+        self.responsavel_combo.currentIndexChanged.connect(self._fill_tables)
+        self.rebuild_button.clicked.connect(self._rebuild_summary)
+
+        self.rebuild_button.setStyleSheet("background-color: #00838f; color: white; padding: 6px 12px; border-radius: 8px;")
+
+        self._load_report()
+
+    def _new_table(self):
+        table = QTableWidget(0, 0)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setAlternatingRowColors(True)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    # --- CONSULTA ---
+
+    def _load_report(self):
+        """ Pede ao banco o resumo do período e do intervalo escolhidos. """
+        start = self.start_edit.date().toString("yyyy-MM-dd")
+        end = self.end_edit.date().toString("yyyy-MM-dd")
+        periodo = self.period_combo.currentData()
+        self.status_label.setText("Carregando...")
+        # Filtros trocados antes da resposta descartam o pedido anterior (mesmo canal)
+        self.db_manager.submit(
+            'get_workload_report', periodo, start, end, channel='reports',
+            callback=lambda rows: self._show_report(periodo, rows), error_callback=self._show_error,
+        )
+
+    def _show_report(self, periodo, rows):
+        self._periodo = periodo
+        self.rows = rows
+        self._fill_tables()
+
+    def _show_error(self, message):
+        print(f"Erro ao carregar relatório: {message}")
+        self.status_label.setText("Erro ao carregar o relatório.")
+
+    def _rebuild_summary(self):
+        self.rebuild_button.setEnabled(False)
+        self.status_label.setText("Recalculando o resumo...")
+        # Sem canal: uma troca de filtro no meio não pode cancelar o recálculo
+        self.db_manager.submit(
+            'rebuild_workload_summary', callback=self._on_rebuild_finished, error_callback=self._on_rebuild_failed,
+        )
+
+    def _on_rebuild_finished(self, summary_rows):
+        self.rebuild_button.setEnabled(True)
+        self._load_report()
+
+    def _on_rebuild_failed(self, message):
+        self.rebuild_button.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Erro", f"Não foi possível recalcular o resumo:\n{message}")
+
+    # --- TABELAS ---
+
+    def _fill_tables(self):
+        """ Monta as três quebras a partir das linhas recebidas e do responsável escolhido. """
+        responsavel = self.responsavel_combo.currentData()
+        rows = self.rows if responsavel is None else [row for row in self.rows if row[1] == responsavel]
+
+        # Tipos cadastrados na ordem das listas, depois os que só existem no histórico
+        tipos = self.tipos + sorted({row[2] for row in rows} - set(self.tipos))
+
+        by_period = pivot(rows, lambda row: row[0])
+        self._fill_pivot(self.by_period_table, "Período", tipos,
+                         [(period_label(self._periodo, inicio), counts) for inicio, counts in by_period.items()])
+
+        by_responsavel = pivot(rows, lambda row: row[1])
+        self._fill_pivot(self.by_responsavel_table, "Responsável", tipos, sorted(
+            ((nome or NO_RESPONSAVEL, counts) for nome, counts in by_responsavel.items()),
+            key=lambda item: -sum(item[1].values()),
+        ))
+
+        by_tipo = pivot(rows, lambda row: row[2])
+        total = sum(row[3] for row in rows)
+        tipo_rows = []
+        for tipo in tipos:
+            count = sum(by_tipo.get(tipo, {}).values())
+            if count:
+                tipo_rows.append([tipo, count, f"{100 * count / total:.1f}"])
+        self._fill_rows(self.by_tipo_table, ["Tipo de visita", "Quantidade", "%"], tipo_rows)
+
+        if rows:
+            self.status_label.setText(f"{total} compromisso(s) em {len(by_period)} período(s).")
+        else:
+            self.status_label.setText("Nenhum compromisso no intervalo escolhido.")
+
+    def _fill_pivot(self, table, title, tipos, items):
+        """ Uma linha por (rótulo, {tipo: quantidade}), uma coluna por tipo, mais a coluna e a linha de total. """
+        rows = [[label] + [counts.get(tipo, 0) for tipo in tipos] + [sum(counts.values())] for label, counts in items]
+        if rows:
+            rows.append([TOTAL_LABEL] + [sum(column) for column in zip(*(row[1:] for row in rows))])
+        self._fill_rows(table, [title] + tipos + [TOTAL_LABEL], rows)
+
+    def _fill_rows(self, table, headers, rows):
+        table.setUpdatesEnabled(False)
+        table.clearContents()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setRowCount(len(rows))
+        for row_index, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row_index, column, item)
+        table.setUpdatesEnabled(True)
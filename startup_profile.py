@@ -0,0 +1,68 @@
+""" Medição do tempo de inicialização por fase (`--profile-startup`).
+
+Este módulo é o primeiro importado por agenda.py e não depende do Qt, para
+que o tempo dos próprios imports entre na conta. Sem a opção na linha de
+comando, `mark` não faz nada.
+"""
+import os
+import sys
+import time
+
+
+PROFILE_FLAG = "--profile-startup"
+# Arquivo usado quando não há console (executável do PyInstaller com console=False)
+PROFILE_FILENAME = "startup_profile.txt"
+
+
+class StartupProfiler:
+    """ Guarda marcas (fase, instante) e imprime o tempo de cada fase e o acumulado. """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.marks = []  # [(fase, segundos desde o início)]
+        self.reported = False
+
+    def mark(self, phase):
+        """ Registra o fim de uma fase. """
+        if self.enabled:
+            self.marks.append((phase, time.perf_counter() - self.started))
+
+    def elapsed(self, phase):
+        """ Segundos desde o início até a marca `phase` (None se ela não existir). """
+        for name, at in self.marks:
+            if name == phase:
+                return at
+        return None
+
+    def as_dict(self):
+        """ Marcas em milissegundos, na ordem em que ocorreram. """
+        return {
+            "started_at": self.started_wall,
+            "phases_ms": [(name, round(at * 1000, 2)) for name, at in self.marks],
+        }
+
+    def format_report(self):
+        lines = [f"{'Fase':<32}{'Fase (ms)':>12}{'Total (ms)':>12}"]
+        previous = 0.0
+        for name, at in self.marks:
+            lines.append(f"{name:<32}{(at - previous) * 1000:>12.1f}{at * 1000:>12.1f}")
+            previous = at
+        return "\n".join(lines)
+
+    def report(self):
+        """ Imprime o relatório uma única vez (no stderr ou, sem console, em um arquivo). """
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        text = self.format_report()
+        if sys.stderr is not None:
+            print(text, file=sys.stderr, flush=True)
+        else:
+            base_dir = os.path.dirname(os.path.abspath(sys.executable if getattr(sys, 'frozen', False) else sys.argv[0]))
+            with open(os.path.join(base_dir, PROFILE_FILENAME), "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+
+profiler = StartupProfiler(PROFILE_FLAG in sys.argv)
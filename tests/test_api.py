@@ -0,0 +1,138 @@
+""" API HTTP/JSON (agenda_api.ApiServer) contra um agenda.db temporário.
+
+O servidor roda em uma thread (start_in_thread, porta escolhida pelo
+sistema) e os pedidos saem por http.client. Cobre o formato das respostas,
+a paginação, os erros e o ETag: 304 para um If-None-Match com a versão
+atual e 200 com um ETag novo depois de uma escrita de outra conexão.
+"""
+import http.client
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agenda_api import ApiServer
+from database import COMPROMISSO_FIELDS, DataManager
+
+
+DAY = "2030-06-03"
+APPOINTMENT_KEYS = {"id", "recorrencia_id", *COMPROMISSO_FIELDS}
+
+
+class ApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "agenda.db")
+        self.data_manager = DataManager(self.db_path, day_cache_size=0)
+        self.first = self._add(DAY, "09:00", "Padaria Central")
+        self.second = self._add(DAY, "10:00", "Mercado Central", hora_fim="11:00")
+        self.third = self._add("2030-06-05", "08:00", "Farmácia")
+        self.server = ApiServer(self.db_path, port=0, readers=2)
+        self.server.start_in_thread()
+        self.connection = http.client.HTTPConnection(self.server.host, self.server.port, timeout=10)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.stop()
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, data, hora, nome, hora_fim=""):
+        return self.data_manager.add_compromisso(data, hora, nome, "Outro", "Escritório", "", "Ana", "obs", hora_fim)
+
+    def _get(self, path, method="GET", **headers):
+        """ Faz o pedido na conexão keep-alive; retorna (status, cabeçalhos, JSON ou None). """
+        self.connection.request(method, path, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        return response.status, response, json.loads(body) if body else None
+
+    def test_day_shape(self):
+        status, response, body = self._get(f"/day/{DAY}")
+        self.assertEqual(status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "application/json; charset=utf-8")
+        self.assertTrue(response.getheader("ETag"))
+        self.assertEqual(body["date"], DAY)
+        self.assertEqual([row["id"] for row in body["rows"]], [self.first.id, self.second.id])
+        self.assertEqual(set(body["rows"][1]), APPOINTMENT_KEYS)
+        self.assertEqual((body["rows"][1]["nome_cliente"], body["rows"][1]["hora_fim"], body["rows"][1]["recorrencia_id"]),
+                         ("Mercado Central", "11:00", None))
+
+    def test_range_and_search(self):
+        status, _, body = self._get(f"/range?start={DAY}&end=2030-06-30")
+        self.assertEqual((status, body["start"], body["end"]), (200, DAY, "2030-06-30"))
+        self.assertEqual([row["data"] for row in body["rows"]], [DAY, DAY, "2030-06-05"])
+
+        status, _, body = self._get("/search?q=central&limit=1")
+        self.assertEqual((status, len(body["rows"]), body["next"]), (200, 1, 1))
+        _, _, body = self._get("/search?q=central&limit=1&offset=1")
+        self.assertEqual((len(body["rows"]), body["next"]), (1, 2))
+        _, _, body = self._get("/search?q=central&limit=1&offset=2")
+        self.assertEqual(body, {"rows": [], "next": None})
+
+    def test_future_pages_follow_next(self):
+        today = date.today()
+        ids = [self._add((today + timedelta(days=1)).isoformat(), "09:00", f"Cliente {index}").id for index in range(3)]
+        seen, path = [], "/future?limit=2"
+        while True:
+            status, _, body = self._get(path)
+            self.assertEqual(status, 200)
+            seen += [row["id"] for row in body["rows"]]
+            if body["next"] is None:
+                break
+            path = f"/future?limit=2&after={body['next']}"
+        self.assertEqual(seen, ids + [self.first.id, self.second.id, self.third.id])
+
+    def test_matching_etag_answers_304(self):
+        _, response, _ = self._get(f"/day/{DAY}")
+        etag = response.getheader("ETag")
+        status, response, body = self._get(f"/day/{DAY}", **{"If-None-Match": etag})
+        self.assertEqual((status, body, response.getheader("ETag")), (304, None, etag))
+        # Lista de candidatos e ETag fraco também valem; qualquer endpoint usa a mesma versão
+        status, _, _ = self._get("/search?q=central", **{"If-None-Match": f'"outro", W/{etag}'})
+        self.assertEqual(status, 304)
+        self.assertEqual(self._get(f"/day/{DAY}", **{"If-None-Match": '"outro"'})[0], 200)
+        self.assertEqual(self.server.not_modified, 2)
+
+    def test_write_changes_the_etag(self):
+        _, response, _ = self._get(f"/day/{DAY}")
+        etag = response.getheader("ETag")
+        added = self._add(DAY, "12:00", "Novo")
+
+        status, response, body = self._get(f"/day/{DAY}", **{"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        new_etag = response.getheader("ETag")
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(body["rows"][-1]["id"], added.id)
+        self.assertEqual(self._get(f"/day/{DAY}", **{"If-None-Match": new_etag})[0], 304)
+
+    def test_head_has_no_body(self):
+        status, response, body = self._get(f"/day/{DAY}", method="HEAD")
+        self.assertEqual((status, body), (200, None))
+        self.assertGreater(int(response.getheader("Content-Length")), 0)
+
+    def test_errors(self):
+        cases = {
+            "/nada": 404,
+            "/day/2030-02-30": 400,
+            f"/range?start={DAY}": 400,
+            "/range?start=2030-01-01&end=2031-06-01": 400,
+            "/search?q=": 400,
+            "/future?limit=0": 400,
+            "/past?before=ontem": 400,
+        }
+        for path, expected in cases.items():
+            with self.subTest(path):
+                status, _, body = self._get(path)
+                self.assertEqual(status, expected)
+                self.assertIn("error", body)
+        status, response, _ = self._get(f"/day/{DAY}", method="DELETE")
+        self.assertEqual((status, response.getheader("Allow")), (405, "GET, HEAD"))
+
+
+if __name__ == "__main__":
+    unittest.main()
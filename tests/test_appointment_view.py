@@ -0,0 +1,202 @@
+""" Atualização pontual dos modelos de lista (appointment_view), sem view nem tela.
+
+replace_row aplica uma escrita trocando, movendo, inserindo ou removendo
+só o item afetado, e merge_rows leva a lista ao resultado de uma nova
+consulta (escrita de outra instância) mexendo só no que mudou. Os testes
+conferem a ordem resultante e os sinais emitidos (dataChanged, rowsInserted,
+rowsRemoved, rowsMoved), que são o que mantém a seleção e a rolagem da view. A recarga completa (modelReset) só
+acontece na troca entre a lista vazia (item de aviso) e a primeira linha.
+"""
+import importlib.util
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Appointment
+
+HAS_QT = importlib.util.find_spec("PyQt5") is not None
+if HAS_QT:
+    from PyQt5.QtCore import QCoreApplication
+    from appointment_view import AgendaRangeModel, AppointmentListModel, DayHeader
+
+DAY = "2030-06-03"
+NEXT_DAY = "2030-06-04"
+# QCoreApplication dos testes (criada uma vez e mantida viva entre eles)
+_qt_app = None
+
+
+def appointment(id, hora, data=DAY, nome=None, recorrencia_id=None):
+    return Appointment(id, data, hora, nome or f"Cliente {id}", "Outro", "Escritório", recorrencia_id=recorrencia_id)
+
+
+class ModelTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        global _qt_app
+        if QCoreApplication.instance() is None:
+            _qt_app = QCoreApplication([])
+
+    def _record(self, model):
+        """ Registra os sinais de mudança do modelo como tuplas (sinal, primeira linha, última/destino). """
+        self.signals = []
+        model.dataChanged.connect(lambda first, last, *roles: self.signals.append(("changed", first.row(), last.row())))
+        model.rowsInserted.connect(lambda parent, first, last: self.signals.append(("inserted", first, last)))
+        model.rowsRemoved.connect(lambda parent, first, last: self.signals.append(("removed", first, last)))
+        model.rowsMoved.connect(lambda parent, start, end, destination, row: self.signals.append(("moved", start, row)))
+        model.modelReset.connect(lambda: self.signals.append(("reset",)))
+
+    def _ids(self, model):
+        return [row.id for row in model.rows]
+
+
+@unittest.skipUnless(HAS_QT, "requer PyQt5")
+class AppointmentListReplaceRowTestCase(ModelTestCase):
+    def setUp(self):
+        self.model = AppointmentListModel("Nenhum compromisso")
+        self.rows = [appointment(1, "08:00"), appointment(2, "09:00"), appointment(3, "10:00")]
+        self.model.set_rows(self.rows)
+        self._record(self.model)
+
+    def test_edit_in_place(self):
+        edited = appointment(2, "09:00", nome="Renomeado")
+        self.model.replace_row(self.rows[1], edited)
+        self.assertEqual(self._ids(self.model), [1, 2, 3])
+        self.assertIs(self.model.rows[1], edited)
+        self.assertEqual(self.signals, [("changed", 1, 1)])
+        self.assertEqual((self.model.reset_count, self.model.patch_count), (1, 1))
+
+    def test_new_time_moves_the_row(self):
+        self.model.replace_row(self.rows[0], appointment(1, "11:00"))
+        self.assertEqual(self._ids(self.model), [2, 3, 1])
+        # Destino do rowsMoved contado com a linha ainda no lugar antigo
+        self.assertEqual(self.signals, [("moved", 0, 3), ("changed", 2, 2)])
+
+        self.model.replace_row(self.model.rows[2], appointment(1, "07:00"))
+        self.assertEqual(self._ids(self.model), [1, 2, 3])
+        self.assertEqual(self.signals[2:], [("moved", 2, 0), ("changed", 0, 0)])
+
+    def test_insert_keeps_the_order(self):
+        self.model.replace_row(None, appointment(4, "09:30"))
+        # Mesmo horário: entra depois dos que já estão lá (ordem por id)
+        self.model.replace_row(None, appointment(5, "09:30"))
+        self.assertEqual(self._ids(self.model), [1, 2, 4, 5, 3])
+        self.assertEqual(self.signals, [("inserted", 2, 2), ("inserted", 3, 3)])
+
+    def test_remove_and_missing_rows(self):
+        self.model.replace_row(self.rows[1], None)
+        self.assertEqual(self._ids(self.model), [1, 3])
+        self.assertEqual(self.signals, [("removed", 1, 1)])
+        # Linha que a lista não exibe: nada muda
+        self.model.replace_row(appointment(9, "12:00"), None)
+        self.assertEqual(self.signals, [("removed", 1, 1)])
+
+    def test_placeholder_swaps_with_a_reset(self):
+        self.model.set_rows([])
+        self.assertEqual(self.model.rowCount(), 1)
+        self.assertIsNone(self.model.row_at(self.model.index(0)))
+        self.signals.clear()
+
+        self.model.replace_row(None, appointment(4, "09:00"))
+        self.assertEqual((self.signals, self.model.rowCount()), ([("reset",)], 1))
+        self.model.replace_row(self.model.rows[0], None)
+        self.assertEqual((self.signals, self.model.rowCount()), ([("reset",), ("reset",)], 1))
+        self.assertEqual(self.model.data(self.model.index(0)), "Nenhum compromisso")
+
+    def test_series_occurrence_is_identified_by_series_and_date(self):
+        occurrence = appointment(None, "09:30", recorrencia_id=7)
+        self.model.replace_row(None, occurrence)
+        self.signals.clear()
+        self.model.replace_row(appointment(None, "09:30", recorrencia_id=7), appointment(None, "07:30", recorrencia_id=7))
+        self.assertEqual([row.hora for row in self.model.rows], ["07:30", "08:00", "09:00", "10:00"])
+        self.assertEqual(self.signals, [("moved", 2, 0), ("changed", 0, 0)])
+
+
+@unittest.skipUnless(HAS_QT, "requer PyQt5")
+class AgendaRangeReplaceRowTestCase(ModelTestCase):
+    def setUp(self):
+        self.model = AgendaRangeModel("Nenhum compromisso")
+        self.first = appointment(1, "08:00")
+        self.second = appointment(2, "09:00")
+        self.model.add_days(DAY, "2030-06-09", [(DAY, (self.first, self.second))])
+        self.model.show_range(DAY, "2030-06-09")
+        self._record(self.model)
+
+    def _items(self):
+        return [("dia", item.data, item.title[-3:]) if isinstance(item, DayHeader) else item.id for item in self.model.rows]
+
+    def test_edit_moves_between_days_and_updates_headers(self):
+        self.assertEqual(self._items(), [("dia", DAY, "(2)"), 1, 2])
+        self.model.replace_row(self.first, appointment(1, "08:00", data=NEXT_DAY))
+        self.assertEqual(self._items(), [("dia", DAY, "(1)"), 2, ("dia", NEXT_DAY, "(1)"), 1])
+        # Cabeçalho novo, linha movida para baixo dele e, em qualquer ordem, a contagem dos dois dias
+        self.assertEqual(self.signals[:3], [("inserted", 3, 3), ("moved", 1, 4), ("changed", 3, 3)])
+        self.assertEqual(sorted(self.signals[3:]), [("changed", 0, 0), ("changed", 2, 2)])
+        self.assertEqual(self.model.reset_count, 1)
+
+    def test_removing_the_last_row_of_a_day_removes_its_header(self):
+        self.model.replace_row(None, appointment(3, "10:00", data=NEXT_DAY))
+        self.signals.clear()
+        self.model.replace_row(self.model.rows[-1], None)
+        self.assertEqual(self._items(), [("dia", DAY, "(2)"), 1, 2])
+        self.assertEqual(self.signals, [("removed", 4, 4), ("removed", 3, 3)])
+        self.assertEqual(self.model.missing_ranges(DAY, "2030-06-09"), [])
+
+    def test_rows_outside_the_visible_range_update_only_the_stored_days(self):
+        self.model.add_days("2030-06-10", "2030-06-16", [])
+        self.model.replace_row(None, appointment(3, "10:00", data="2030-06-12"))
+        self.assertEqual(self._items(), [("dia", DAY, "(2)"), 1, 2])
+        self.assertEqual(self.signals, [])
+        self.model.show_range("2030-06-10", "2030-06-16")
+        self.assertEqual(self._items(), [("dia", "2030-06-12", "(1)"), 3])
+
+
+@unittest.skipUnless(HAS_QT, "requer PyQt5")
+class MergeRowsTestCase(ModelTestCase):
+    def setUp(self):
+        self.model = AppointmentListModel("Nenhum compromisso")
+        self.rows = [appointment(index, f"{8 + index:02d}:00") for index in range(1, 5)]
+        self.model.set_rows(self.rows, has_more=True)
+        self._record(self.model)
+
+    def test_same_rows_change_nothing(self):
+        copies = [appointment(row.id, row.hora) for row in self.rows]
+        self.assertEqual(self.model.merge_rows(copies), 0)
+        self.assertEqual(self.signals, [])
+        self.assertIs(self.model.rows[0], self.rows[0])
+
+    def test_only_changed_rows_are_touched(self):
+        fresh = [self.rows[0], appointment(2, "09:00", nome="Renomeado"), appointment(5, "10:30"), self.rows[3]]
+        self.assertEqual(self.model.merge_rows(fresh), 3)
+        self.assertEqual(self._ids(self.model), [1, 2, 5, 4])
+        self.assertEqual(self.model.rows[1].nome_cliente, "Renomeado")
+        self.assertEqual(self.signals, [("removed", 2, 2), ("changed", 1, 1), ("inserted", 2, 2)])
+        self.assertEqual((self.model.reset_count, self.model.patch_count), (1, 3))
+
+    def test_order_of_the_new_query_is_kept(self):
+        # Ordem da consulta (ex.: relevância na busca), não a de data/hora
+        fresh = [self.rows[2], self.rows[0], self.rows[3], self.rows[1]]
+        self.assertEqual(self.model.merge_rows(fresh), 2)
+        self.assertEqual(self._ids(self.model), [3, 1, 4, 2])
+        self.assertEqual(self.signals, [("moved", 2, 0), ("changed", 0, 0), ("moved", 3, 2), ("changed", 2, 2)])
+
+    def test_has_more_is_updated_only_when_given(self):
+        self.assertTrue(self.model.canFetchMore())
+        self.model.merge_rows(self.rows)
+        self.assertTrue(self.model.canFetchMore())
+        self.model.merge_rows(self.rows, has_more=False)
+        self.assertFalse(self.model.canFetchMore())
+
+    def test_emptying_and_refilling_swap_the_placeholder(self):
+        self.assertEqual(self.model.merge_rows([]), 4)
+        self.assertEqual((self.model.rows, self.model.rowCount()), ([], 1))
+        self.assertEqual(self.signals, [("removed", 3, 3), ("removed", 2, 2), ("removed", 1, 1), ("reset",)])
+        self.signals.clear()
+        self.assertEqual(self.model.merge_rows(self.rows[:2]), 2)
+        self.assertEqual(self._ids(self.model), [1, 2])
+        self.assertEqual(self.signals, [("reset",), ("inserted", 1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+""" Arquivamento do histórico antigo em um segundo arquivo (agenda_arquivo.db).
+
+Os compromissos arquivados saem do agenda.db, mas continuam nas leituras
+por data, nas páginas de passados e na busca (views temp.historico e
+temp.compromissos_arquivados); editar um deles o devolve ao agenda.db.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager
+
+
+FIELDS = ("Treinamento", "Escritório", "Rua das Flores", "Ana", "")
+
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "agenda.db")
+        self.data_manager = DataManager(self.db_path, day_cache_size=0)
+        self.old_day = (date.today() - timedelta(days=400)).isoformat()
+        self.recent_day = (date.today() - timedelta(days=10)).isoformat()
+        self.old = self.data_manager.add_compromisso(self.old_day, "09:00", "Cliente Antigo", *FIELDS)
+        self.older = self.data_manager.add_compromisso(self.old_day, "08:00", "Outro Antigo", *FIELDS)
+        self.recent = self.data_manager.add_compromisso(self.recent_day, "10:00", "Cliente Recente", *FIELDS)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _ids_in(self, schema):
+        rows = self.data_manager.conn.execute(f"SELECT id FROM {schema}.compromissos_base ORDER BY id;").fetchall()
+        return [row[0] for row in rows]
+
+    def test_archive_moves_only_old_rows_in_batches(self):
+        self.assertEqual(self.data_manager.archive_older_than(days=365, batch_size=1), 2)
+        self.assertEqual(self._ids_in("main"), [self.recent.id])
+        self.assertEqual(self._ids_in("arquivo"), [self.old.id, self.older.id])
+        self.assertTrue(os.path.exists(self.data_manager.archive_path))
+        # Nada mais a mover
+        self.assertEqual(self.data_manager.archive_older_than(days=365), 0)
+
+    def test_archived_rows_are_still_read(self):
+        self.data_manager.archive_older_than(days=365)
+
+        self.assertEqual([row.id for row in self.data_manager.get_compromissos_by_date(self.old_day)],
+                         [self.older.id, self.old.id])
+        self.assertEqual(self.data_manager.get_compromisso_by_id(self.old.id), self.old)
+        self.assertEqual([row.id for row in self.data_manager.get_past_appointments_page()],
+                         [self.recent.id, self.old.id, self.older.id])
+        self.assertEqual([row.id for row in self.data_manager.get_compromissos_between(self.old_day, self.recent_day)],
+                         [self.older.id, self.old.id, self.recent.id])
+        historico = self.data_manager.conn.execute("SELECT COUNT(*) FROM temp.historico;").fetchone()[0]
+        arquivados = self.data_manager.conn.execute("SELECT COUNT(*) FROM temp.compromissos_arquivados;").fetchone()[0]
+        self.assertEqual((historico, arquivados), (3, 2))
+
+    def test_search_continues_into_the_archive(self):
+        self.data_manager.archive_older_than(days=365)
+
+        self.assertEqual([row.id for row in self.data_manager.search("antigo")], [self.older.id, self.old.id])
+        # O agenda.db vem antes do arquivo, e o offset continua de um para o outro
+        self.assertEqual([row.id for row in self.data_manager.search("cliente")], [self.recent.id, self.old.id])
+        self.assertEqual([row.id for row in self.data_manager.search("cliente", limit=1, offset=1)], [self.old.id])
+
+    def test_archive_is_visible_to_another_instance(self):
+        self.data_manager.archive_older_than(days=365)
+        other = DataManager(self.db_path, day_cache_size=0)
+        try:
+            self.assertEqual([row.id for row in other.get_compromissos_by_date(self.old_day)],
+                             [self.older.id, self.old.id])
+        finally:
+            other.close()
+
+    def test_updating_an_archived_row_restores_it(self):
+        self.data_manager.archive_older_than(days=365)
+
+        updated = self.data_manager.update_compromisso(self.old.id, self.old_day, "11:00", "Cliente Editado", *FIELDS)
+        self.assertEqual((updated.id, updated.hora, updated.nome_cliente), (self.old.id, "11:00", "Cliente Editado"))
+        self.assertEqual(self._ids_in("main"), [self.old.id, self.recent.id])
+        self.assertEqual(self._ids_in("arquivo"), [self.older.id])
+        self.assertEqual([(row.id, row.hora) for row in self.data_manager.get_compromissos_by_date(self.old_day)],
+                         [(self.older.id, "08:00"), (self.old.id, "11:00")])
+        self.assertEqual([row.id for row in self.data_manager.search("editado")], [self.old.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+""" Cache LRU de dias (get_compromissos_by_date) e cache de densidade mensal.
+
+Cada leitura do dia conta um acerto (day_cache_hits) ou uma falta
+(day_cache_misses); as escritas deste DataManager descartam só as datas (e
+os meses) que alteram, e a escrita de outra instância descarta tudo.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager, RecurrenceRule
+
+
+DAY = "2030-04-08"
+OTHER_DAY = "2030-04-09"
+
+
+class DayCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "agenda.db")
+        self.data_manager = DataManager(self.db_path, day_cache_size=8)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, data=DAY, hora="09:00", nome="Cliente"):
+        return self.data_manager.add_compromisso(data, hora, nome, "Outro", "Escritório", "", "Ana", "")
+
+    def _names(self, data):
+        return [row.nome_cliente for row in self.data_manager.get_compromissos_by_date(data)]
+
+    def _counters(self):
+        return self.data_manager.day_cache_hits, self.data_manager.day_cache_misses
+
+    def test_repeated_reads_hit_the_cache(self):
+        self._add(nome="A")
+        self.assertEqual(self._names(DAY), ["A"])
+        self.assertEqual(self._counters(), (0, 1))
+        self.assertEqual(self._names(DAY), ["A"])
+        self.assertEqual(self._names(DAY), ["A"])
+        self.assertEqual(self._counters(), (2, 1))
+        # Dia vazio também fica em cache
+        self.assertEqual(self._names(OTHER_DAY), [])
+        self.assertEqual(self._names(OTHER_DAY), [])
+        self.assertEqual(self.data_manager.get_day_cache_stats(), {"hits": 3, "misses": 2, "size": 2, "capacity": 8})
+
+    def test_moving_an_appointment_invalidates_both_days(self):
+        moved = self._add(hora="09:00", nome="Movido")
+        self._add(hora="10:00", nome="Fica")
+        self.assertEqual(self._names(DAY), ["Movido", "Fica"])
+        self.assertEqual(self._names(OTHER_DAY), [])
+        self._names("2030-04-10")
+        self.assertEqual(self._counters(), (0, 3))
+
+        self.data_manager.update_compromisso(moved.id, OTHER_DAY, "08:00", "Movido", "Outro", "Escritório", "", "Ana", "")
+        self.assertEqual(self._names(DAY), ["Fica"])
+        self.assertEqual(self._names(OTHER_DAY), ["Movido"])
+        self.assertEqual(self._counters(), (0, 5))
+        # O dia que a edição não tocou continua em cache
+        self._names("2030-04-10")
+        self.assertEqual(self._counters(), (1, 5))
+
+    def test_add_and_delete_invalidate_the_day(self):
+        self.assertEqual(self._names(DAY), [])
+        appointment = self._add(nome="Novo")
+        self.assertEqual(self._names(DAY), ["Novo"])
+        self.assertEqual(self._counters(), (0, 2))
+        self.data_manager.delete_compromisso(appointment.id)
+        self.assertEqual(self._names(DAY), [])
+        self.assertEqual(self._counters(), (0, 3))
+
+    def test_least_recently_used_day_is_evicted(self):
+        self.data_manager.day_cache_size = 2
+        self._names(DAY)
+        self._names(OTHER_DAY)
+        self._names(DAY)  # OTHER_DAY passa a ser o menos usado
+        self._names("2030-04-10")
+        self.assertEqual(list(self.data_manager._day_cache), [DAY, "2030-04-10"])
+        self._names(OTHER_DAY)
+        self.assertEqual(self._counters(), (1, 4))
+
+    def test_write_from_another_instance_clears_the_cache(self):
+        self._names(DAY)
+        self._names(OTHER_DAY)
+        other = DataManager(self.db_path, day_cache_size=0)
+        try:
+            other.add_compromisso(OTHER_DAY, "09:00", "De fora", "Outro", "Escritório", "", "Bruno", "")
+        finally:
+            other.close()
+        self.assertEqual(self._names(DAY), [])
+        self.assertEqual(self._names(OTHER_DAY), ["De fora"])
+        self.assertEqual(self._counters(), (0, 4))
+
+    def test_disabled_cache_counts_only_misses(self):
+        self.data_manager.close()
+        self.data_manager = DataManager(self.db_path, day_cache_size=0)
+        self._names(DAY)
+        self._names(DAY)
+        self.assertEqual(self._counters(), (0, 2))
+        self.assertEqual(self.data_manager.get_day_cache_stats()["size"], 0)
+
+
+class MonthDensityCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, data, tipo_visita="Outro", hora="09:00"):
+        return self.data_manager.add_compromisso(data, hora, "Cliente", tipo_visita, "Escritório", "", "Ana", "")
+
+    def _queries(self, call):
+        """ Executa `call()` e retorna quantas consultas agrupadas de densidade ele fez. """
+        statements = []
+        self.data_manager.conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            self.data_manager.conn.set_trace_callback(None)
+        return sum("GROUP BY data, tipo_visita" in statement for statement in statements)
+
+    def test_counts_and_dominant_type(self):
+        self._add("2030-04-08", "Treinamento")
+        self._add("2030-04-08", "Outro", "10:00")
+        self._add("2030-04-08", "Outro", "11:00")
+        self._add("2030-04-30", "Treinamento")
+        self._add("2030-05-01", "Outro")  # Outro mês
+        self._add("2030-03-31", "Outro")
+        self.assertEqual(self.data_manager.get_month_density(2030, 4),
+                         {"2030-04-08": (3, "Outro"), "2030-04-30": (1, "Treinamento")})
+        self.assertEqual(self.data_manager.get_month_density(2030, 12), {})
+
+    def test_series_occurrences_are_counted(self):
+        self.data_manager.add_recorrencia(RecurrenceRule("semanal", ocorrencias=3), "2030-04-22", "09:00", "Treino",
+                                          "Treinamento", "Escritório", "", "Ana", "")
+        self._add("2030-04-29", "Outro", "10:00")
+        self._add("2030-04-29", "Outro", "11:00")
+        self.assertEqual(self.data_manager.get_month_density(2030, 4),
+                         {"2030-04-22": (1, "Treinamento"), "2030-04-29": (3, "Outro")})
+        self.assertEqual(self.data_manager.get_month_density(2030, 5), {"2030-05-06": (1, "Treinamento")})
+
+    def test_month_is_cached_until_a_write_in_it(self):
+        self._add("2030-04-08")
+        self.assertEqual(self._queries(lambda: self.data_manager.get_month_density(2030, 4)), 1)
+        self.assertEqual(self._queries(lambda: self.data_manager.get_month_density(2030, 5)), 1)
+        self.assertEqual(self._queries(lambda: self.data_manager.get_month_density(2030, 4)), 0)
+        self.assertEqual(set(self.data_manager._month_density_cache), {"2030-04", "2030-05"})
+
+        # Escrita em um dia de abril: só abril é consultado de novo
+        self._add("2030-04-20")
+        self.assertNotIn("2030-04", self.data_manager._month_density_cache)
+        self.assertEqual(self._queries(lambda: self.data_manager.get_month_density(2030, 5)), 0)
+        self.assertEqual(self._queries(lambda: self.data_manager.get_month_density(2030, 4)), 1)
+        self.assertEqual(self.data_manager.get_month_density(2030, 4),
+                         {"2030-04-08": (1, "Outro"), "2030-04-20": (1, "Outro")})
+
+    def test_moving_an_appointment_invalidates_both_months(self):
+        moved = self._add("2030-04-30")
+        self.data_manager.get_month_density(2030, 4)
+        self.data_manager.get_month_density(2030, 5)
+        self.data_manager.update_compromisso(moved.id, "2030-05-02", "09:00", "Cliente", "Outro", "Escritório", "", "Ana", "")
+        self.assertEqual(self.data_manager.get_month_density(2030, 4), {})
+        self.assertEqual(self.data_manager.get_month_density(2030, 5), {"2030-05-02": (1, "Outro")})
+        self.data_manager.delete_compromisso(moved.id)
+        self.assertEqual(self.data_manager.get_month_density(2030, 5), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
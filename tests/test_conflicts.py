@@ -0,0 +1,98 @@
+""" Conflitos de horário (find_conflicts e find_conflicts_between).
+
+Dois compromissos do mesmo responsável no mesmo dia conflitam se começam
+juntos ou se um começa antes do término do outro; terminar às 10:00 e
+começar às 10:00 não conflita, e sem hora_fim o compromisso ocupa só o
+horário de início.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager, RecurrenceRule
+
+
+DAY = "2030-03-04"
+
+
+class ConflictsTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, hora, hora_fim="", quem_vai="Ana", data=DAY, nome="Cliente"):
+        return self.data_manager.add_compromisso(data, hora, nome, "Outro", "Escritório", "", quem_vai, "", hora_fim).id
+
+    def _conflicts(self, hora, hora_fim="", quem_vai="Ana", **kwargs):
+        return [row.id for row in self.data_manager.find_conflicts(DAY, hora, hora_fim, quem_vai, **kwargs)]
+
+    def test_overlap_edges(self):
+        meeting = self._add("09:00", "10:00")
+        self.assertEqual(self._conflicts("09:00"), [meeting])
+        self.assertEqual(self._conflicts("09:30"), [meeting])
+        self.assertEqual(self._conflicts("08:00", "09:30"), [meeting])
+        self.assertEqual(self._conflicts("08:30", "11:00"), [meeting])
+        # Encostar no início ou no término não conflita
+        self.assertEqual(self._conflicts("10:00"), [])
+        self.assertEqual(self._conflicts("10:00", "11:00"), [])
+        self.assertEqual(self._conflicts("08:00", "09:00"), [])
+
+    def test_appointment_without_end_occupies_only_its_start(self):
+        visit = self._add("14:00")
+        self.assertEqual(self._conflicts("14:00"), [visit])
+        self.assertEqual(self._conflicts("13:00", "14:01"), [visit])
+        self.assertEqual(self._conflicts("13:00", "14:00"), [])
+        self.assertEqual(self._conflicts("14:01"), [])
+
+    def test_only_the_same_technician_and_day_conflict(self):
+        visit = self._add("09:00", "10:00", quem_vai="João")
+        self._add("09:00", "10:00", quem_vai="Bruno")
+        self._add("09:00", "10:00", quem_vai="João", data="2030-03-05")
+        # Caixa, acentos e espaços não distinguem responsáveis
+        self.assertEqual(self._conflicts("09:30", quem_vai=" JOAO "), [visit])
+        self.assertEqual(self._conflicts("09:30", quem_vai="Carla"), [])
+
+    def test_appointments_without_technician_never_conflict(self):
+        self._add("09:00", "10:00", quem_vai="")
+        self._add("09:00", "10:00", quem_vai="")
+        self.assertEqual(self._conflicts("09:00", quem_vai=""), [])
+        self.assertEqual(self.data_manager.find_conflicts_between(DAY, DAY), [])
+
+    def test_editing_excludes_the_appointment_itself(self):
+        visit = self._add("09:00", "10:00")
+        other = self._add("09:45")
+        self.assertEqual(self._conflicts("09:00", "10:00", exclude_id=visit), [other])
+
+    def test_series_occurrences_conflict_unless_excluded(self):
+        serie_id = self.data_manager.add_recorrencia(RecurrenceRule("diaria"), "2030-03-01", "09:00", "Treino", "Treinamento",
+                                                     "Escritório", "", "ana", "", "09:30")
+        visit = self._add("09:15")
+        [occurrence] = self.data_manager.find_conflicts(DAY, "09:00", "", "Ana", exclude_id=visit)
+        self.assertEqual((occurrence.id, occurrence.recorrencia_id, occurrence.data), (None, serie_id, DAY))
+        self.assertEqual(self._conflicts("09:00", "09:30", exclude_recorrencia_id=serie_id), [visit])
+
+    def test_between_returns_ordered_pairs(self):
+        first = self._add("09:00", "11:00")
+        second = self._add("09:30", "10:00")
+        third = self._add("10:30")
+        self._add("11:00")  # Começa no término do primeiro
+        same_start = self._add("08:00", quem_vai="Bruno", data="2030-03-05")
+        same_start_too = self._add("08:00", quem_vai="bruno", data="2030-03-05")
+        self._add("08:00", quem_vai="Bruno", data="2030-03-10")  # Fora do intervalo
+
+        pairs = self.data_manager.find_conflicts_between("2030-03-01", "2030-03-05")
+        self.assertEqual([(a.id, b.id) for a, b in pairs],
+                         [(first, second), (first, third), (same_start, same_start_too)])
+        limited = self.data_manager.find_conflicts_between("2030-03-01", "2030-03-05", limit=1)
+        self.assertEqual([(a.id, b.id) for a, b in limited], [(first, second)])
+
+
+if __name__ == "__main__":
+    unittest.main()
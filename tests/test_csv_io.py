@@ -0,0 +1,113 @@
+""" Validação das linhas do CSV (validate_row) e importação/exportação em lotes (csv_io). """
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_io import EXPORT_FIELDS, export_csv, import_csv, validate_row
+from database import DataManager
+
+
+TIPOS = frozenset({"Treinamento", "Outro"})
+LOCAIS = frozenset({"Escritório", "No Cliente"})
+
+
+def record(**fields):
+    values = {"data": "2030-05-06", "hora": "09:00", "nome_cliente": "Cliente", "tipo_visita": "Outro",
+              "local_visita": "Escritório", "endereco": "", "quem_vai": "Ana", "observacoes": "", "hora_fim": ""}
+    values.update(fields)
+    return values
+
+
+class ValidateRowTestCase(unittest.TestCase):
+    def test_valid_row_is_normalized(self):
+        row = validate_row(record(data="06/05/2030", hora="9:05", hora_fim="9:30", nome_cliente="  Cliente  ",
+                                  quem_vai=" Ana ", observacoes=" obs "), TIPOS, LOCAIS)
+        self.assertEqual(row, ("2030-05-06", "09:05", "Cliente", "Outro", "Escritório", "", "Ana", "obs", "09:30"))
+
+    def test_address_is_kept_only_for_client_visits(self):
+        self.assertEqual(validate_row(record(endereco="Rua A"), TIPOS, LOCAIS)[5], "")
+        self.assertEqual(validate_row(record(local_visita="No Cliente", endereco=" Rua A "), TIPOS, LOCAIS)[5], "Rua A")
+
+    def test_missing_optional_columns_are_empty(self):
+        row = validate_row({"data": "2030-05-06", "hora": "09:00", "nome_cliente": "Cliente", "tipo_visita": "Outro",
+                            "local_visita": "Escritório"}, TIPOS, LOCAIS)
+        self.assertEqual(row[5:], ("", "", "", ""))
+
+    def test_invalid_rows_are_rejected(self):
+        invalid = {
+            "data inválida": record(data="2030-02-30"),
+            "formato de data": record(data="06-05-2030"),
+            "hora": record(hora="24:00"),
+            "hora de término": record(hora_fim="9h"),
+            "término antes do início": record(hora_fim="08:59"),
+            "término igual ao início": record(hora_fim="09:00"),
+            "cliente vazio": record(nome_cliente="   "),
+            "tipo": record(tipo_visita="Almoço"),
+            "local": record(local_visita="Casa"),
+        }
+        for name, values in invalid.items():
+            with self.subTest(name), self.assertRaises(ValueError):
+                validate_row(values, TIPOS, LOCAIS)
+
+
+class ImportExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+        self.csv_path = os.path.join(self._dir.name, "compromissos.csv")
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _write_csv(self, records, fieldnames=EXPORT_FIELDS[1:]):
+        with open(self.csv_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+
+    def test_import_writes_one_transaction_per_batch(self):
+        records = [record(hora=f"{8 + index % 10:02d}:00", nome_cliente=f"Cliente {index}") for index in range(7)]
+        records.insert(3, record(hora="25:00"))
+        self._write_csv(records)
+        progress = []
+
+        with mock.patch.object(self.data_manager, "add_compromissos_batch",
+                               wraps=self.data_manager.add_compromissos_batch) as add_batch:
+            report = import_csv(self.data_manager, self.csv_path, batch_size=3, progress_callback=progress.append)
+
+        self.assertEqual([len(call.args[0]) for call in add_batch.call_args_list], [3, 3, 1])
+        self.assertEqual((report.imported, report.rejected), (7, 1))
+        self.assertEqual([line for line, _ in report.errors], [5])  # Cabeçalho na linha 1
+        self.assertEqual(progress, [4, 8])
+        self.assertEqual(len(self.data_manager.get_compromissos_by_date("2030-05-06")), 7)
+
+    def test_missing_required_columns_reject_the_file(self):
+        self._write_csv([record()], fieldnames=("data", "hora", "nome_cliente"))
+        report = import_csv(self.data_manager, self.csv_path)
+        self.assertEqual((report.imported, report.rejected), (0, 1))
+        self.assertIn("tipo_visita, local_visita", report.errors[0][1])
+
+    def test_export_then_import_round_trips(self):
+        first = self.data_manager.add_compromisso("2030-05-07", "10:00", "Cliente B", "Treinamento", "No Cliente",
+                                                  "Rua B", "Ana", "obs", "11:00")
+        second = self.data_manager.add_compromisso("2030-05-06", "09:00", "Cliente A", "Outro", "Escritório", "", "", "")
+        self.assertEqual(export_csv(self.data_manager, self.csv_path, batch_size=1), 2)
+        with open(self.csv_path, newline="", encoding="utf-8") as csv_file:
+            exported = list(csv.reader(csv_file))
+        self.assertEqual(exported[0], list(EXPORT_FIELDS))
+        self.assertEqual([row[0] for row in exported[1:]], [str(second.id), str(first.id)])
+
+        report = import_csv(self.data_manager, self.csv_path)
+        self.assertEqual((report.imported, report.rejected), (2, 0))
+        copies = [row for row in self.data_manager.iter_all_compromissos() if row.id not in (first.id, second.id)]
+        self.assertEqual([row.fields() for row in copies], [second.fields(), first.fields()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+""" Paginação por chave (data, hora, id) das listas de futuros e passados.
+
+Vários compromissos no mesmo dia e horário só se distinguem pelo id (nas
+ocorrências de série, -recorrencia_id): percorrer as páginas a partir da
+chave do último item não pode pular nem repetir nenhum deles, inclusive
+quando a página junta o agenda.db, o arquivo e as séries.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager, RecurrenceRule
+
+
+TIES = 5
+
+
+class KeysetPagingTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _day(self, offset):
+        return (date.today() + timedelta(days=offset)).isoformat()
+
+    def _add_ties(self, data, hora="09:00", count=TIES):
+        for index in range(count):
+            self.data_manager.add_compromisso(data, hora, f"Cliente {index}", "Outro", "Escritório", "", "Ana", "")
+
+    def _pages(self, get_page, limit):
+        """ Percorre todas as páginas com `limit` itens; retorna as chaves na ordem em que apareceram. """
+        keys, last = [], None
+        while True:
+            page = get_page(last, limit)
+            self.assertLessEqual(len(page), limit)
+            if not page:
+                return keys
+            keys += [row.page_key for row in page]
+            last = page[-1].page_key
+
+    def _assert_pages(self, get_page, expected):
+        for limit in (1, 2, 3, TIES, 100):
+            with self.subTest(limit=limit):
+                keys = self._pages(get_page, limit)
+                self.assertEqual(len(keys), len(set(keys)), "chave repetida entre as páginas")
+                self.assertEqual(keys, expected)
+
+    def test_future_pages_with_tied_date_and_time(self):
+        self._add_ties(self._day(1))
+        self._add_ties(self._day(1), "10:00", 2)
+        self._add_ties(self._day(2))
+        self._add_ties(self._day(0))  # Hoje não é futuro
+        self.data_manager.add_recorrencia(RecurrenceRule("diaria", ocorrencias=3), self._day(1), "09:00", "Série",
+                                          "Outro", "Escritório", "", "Ana", "")
+        expected = sorted(row.page_key for row in self.data_manager.get_compromissos_between(self._day(1), self._day(9)))
+        self.assertEqual(len(expected), 2 * TIES + 2 + 3)
+        self._assert_pages(self.data_manager.get_future_appointments_page, expected)
+
+    def test_past_pages_with_tied_date_and_time(self):
+        self._add_ties(self._day(0))
+        self._add_ties(self._day(-1))
+        self._add_ties(self._day(-1), "08:00", 2)
+        self._add_ties(self._day(-400))
+        self._add_ties(self._day(1))  # Amanhã não é passado
+        expected = sorted((row.page_key for row in self.data_manager.get_compromissos_between(self._day(-400), self._day(0))),
+                          reverse=True)
+        self.assertEqual(len(expected), 3 * TIES + 2)
+        self._assert_pages(self.data_manager.get_past_appointments_page, expected)
+
+    def test_past_pages_across_the_archive(self):
+        self._add_ties(self._day(-400))
+        self._add_ties(self._day(-401))
+        self.data_manager.archive_older_than(days=365, batch_size=3)
+        self._add_ties(self._day(-2))
+        # Criados depois do arquivamento: ids maiores no mesmo horário dos arquivados
+        self._add_ties(self._day(-400), count=2)
+        expected = sorted((row.page_key for row in self.data_manager.get_compromissos_between(self._day(-500), self._day(0))),
+                          reverse=True)
+        self.assertEqual(len(expected), 3 * TIES + 2)
+        self._assert_pages(self.data_manager.get_past_appointments_page, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+""" Datas das séries (RecurrenceRule) e ocorrências intercaladas nas leituras do DataManager.
+
+As ocorrências não são gravadas: o dia, as páginas de futuros e passados
+e as exceções ("só esta ocorrência") dependem só da n-ésima data da regra,
+então estes testes conferem as datas e as chaves de paginação geradas.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager, RecurrenceRule
+
+
+FIELDS = ("Cliente", "Treinamento", "Escritório", "", "Ana", "")
+
+
+class RecurrenceRuleTestCase(unittest.TestCase):
+    def test_date_at_computes_the_nth_date_directly(self):
+        inicio = date(2030, 1, 7)
+        self.assertEqual(RecurrenceRule("diaria", 3).date_at(inicio, 10), date(2030, 2, 6))
+        self.assertEqual(RecurrenceRule("semanal", 2).date_at(inicio, 3), date(2030, 2, 18))
+        self.assertEqual(RecurrenceRule("mensal", 5).date_at(inicio, 3), date(2031, 4, 7))
+
+    def test_monthly_series_clamps_to_the_last_day_of_shorter_months(self):
+        rule = RecurrenceRule("mensal", ocorrencias=5)
+        self.assertEqual(list(rule.iter_dates("2031-01-31")),
+                         ["2031-01-31", "2031-02-28", "2031-03-31", "2031-04-30", "2031-05-31"])
+        # O dia 31 não se perde depois de um mês mais curto
+        self.assertEqual(list(RecurrenceRule("mensal", fim="2032-03-31").iter_dates("2032-01-31", start="2032-02-01")),
+                         ["2032-02-29", "2032-03-31"])
+
+    def test_monthly_start_inside_the_month_skips_an_earlier_day(self):
+        rule = RecurrenceRule("mensal")
+        self.assertEqual(list(islice(rule.iter_dates("2030-01-15", start="2030-03-20"), 2)),
+                         ["2030-04-15", "2030-05-15"])
+
+    def test_end_date_and_occurrence_count_limit_the_series(self):
+        self.assertEqual(RecurrenceRule("semanal", ocorrencias=4).last_date("2030-01-07"), "2030-01-28")
+        self.assertEqual(RecurrenceRule("semanal", fim="2030-01-27").last_date("2030-01-07"), "2030-01-21")
+        self.assertEqual(RecurrenceRule("semanal", fim="2030-01-27", ocorrencias=2).last_date("2030-01-07"), "2030-01-14")
+        self.assertEqual(list(RecurrenceRule("diaria", 2, fim="2030-01-06").iter_dates("2030-01-01")),
+                         ["2030-01-01", "2030-01-03", "2030-01-05"])
+
+    def test_endless_series_starts_at_the_requested_date(self):
+        rule = RecurrenceRule("semanal")
+        self.assertIsNone(rule.last_date("2000-01-03"))
+        self.assertEqual(list(islice(rule.iter_dates("2000-01-03", start="2030-01-01"), 3)),
+                         ["2030-01-07", "2030-01-14", "2030-01-21"])
+        self.assertEqual(list(rule.iter_dates("2000-01-03", start="2030-01-01", end="2030-01-14")),
+                         ["2030-01-07", "2030-01-14"])
+
+    def test_reverse_iteration_needs_an_end(self):
+        rule = RecurrenceRule("semanal")
+        self.assertEqual(list(rule.iter_dates("2030-01-07", start="2030-01-10", end="2030-02-01", reverse=True)),
+                         ["2030-01-28", "2030-01-21", "2030-01-14"])
+        with self.assertRaises(ValueError):
+            list(rule.iter_dates("2030-01-07", reverse=True))
+
+    def test_invalid_rules_are_rejected(self):
+        for args in (("anual",), ("semanal", 0), ("mensal", 1, None, 0)):
+            with self.assertRaises(ValueError):
+                RecurrenceRule(*args)
+
+
+class RecurrenceQueriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add_series(self, rule, inicio, hora="09:00"):
+        return self.data_manager.add_recorrencia(rule, inicio.isoformat(), hora, *FIELDS)
+
+    def _add(self, day, hora, nome="Avulso"):
+        return self.data_manager.add_compromisso(day.isoformat(), hora, nome, *FIELDS[1:]).id
+
+    def test_day_query_merges_occurrences_by_hour_and_skips_exceptions(self):
+        inicio = date(2030, 1, 7)
+        serie_id = self._add_series(RecurrenceRule("semanal", ocorrencias=3), inicio)
+        first_id = self._add(inicio + timedelta(days=7), "08:00")
+        last_id = self._add(inicio + timedelta(days=7), "10:00")
+
+        rows = self.data_manager.get_compromissos_by_date("2030-01-14")
+        self.assertEqual([(row.id, row.hora, row.recorrencia_id) for row in rows],
+                         [(first_id, "08:00", None), (None, "09:00", serie_id), (last_id, "10:00", None)])
+        self.assertEqual(self.data_manager.get_compromissos_by_date("2030-01-28"), [])  # Depois da 3ª ocorrência
+
+        self.assertTrue(self.data_manager.skip_ocorrencia(serie_id, "2030-01-14"))
+        self.assertFalse(self.data_manager.skip_ocorrencia(serie_id, "2030-01-14"))
+        self.assertEqual([row.id for row in self.data_manager.get_compromissos_by_date("2030-01-14")],
+                         [first_id, last_id])
+        self.assertEqual([row.data for row in self.data_manager.get_compromissos_between("2030-01-01", "2030-01-31")],
+                         ["2030-01-07", "2030-01-14", "2030-01-14", "2030-01-21"])
+
+    def test_detached_occurrence_becomes_a_regular_appointment(self):
+        serie_id = self._add_series(RecurrenceRule("diaria", ocorrencias=3), date(2030, 1, 1))
+        detached = self.data_manager.detach_ocorrencia(serie_id, "2030-01-02", "2030-01-02", "15:00", "Outro cliente",
+                                                       *FIELDS[1:])
+        [row] = self.data_manager.get_compromissos_by_date("2030-01-02")
+        self.assertEqual((row.id, row.hora, row.nome_cliente, row.recorrencia_id),
+                         (detached.id, "15:00", "Outro cliente", None))
+        # A mesma ocorrência não é separada duas vezes
+        self.assertIsNone(self.data_manager.detach_ocorrencia(serie_id, "2030-01-02", "2030-01-02", "16:00", *FIELDS))
+
+    def test_future_pages_interleave_an_endless_series(self):
+        monday = date.today() + timedelta(days=7 - date.today().weekday())
+        serie_id = self._add_series(RecurrenceRule("semanal"), monday - timedelta(days=7 * 52), "09:00")
+        tuesday_id = self._add(monday + timedelta(days=1), "08:00")
+
+        first = self.data_manager.get_future_appointments_page(limit=2)
+        self.assertEqual([row.page_key for row in first], [
+            (monday.isoformat(), "09:00", -serie_id),
+            ((monday + timedelta(days=1)).isoformat(), "08:00", tuesday_id),
+        ])
+        second = self.data_manager.get_future_appointments_page(first[-1].page_key, limit=2)
+        self.assertEqual([row.page_key for row in second], [
+            ((monday + timedelta(days=7)).isoformat(), "09:00", -serie_id),
+            ((monday + timedelta(days=14)).isoformat(), "09:00", -serie_id),
+        ])
+
+    def test_past_pages_walk_the_series_backwards(self):
+        monday = date.today() - timedelta(days=date.today().weekday() + 7)
+        serie_id = self._add_series(RecurrenceRule("semanal", ocorrencias=5), monday - timedelta(days=7 * 4))
+        sunday_id = self._add(monday - timedelta(days=1), "18:00")
+        self.data_manager.skip_ocorrencia(serie_id, (monday - timedelta(days=7)).isoformat())
+
+        first = self.data_manager.get_past_appointments_page(limit=3)
+        self.assertEqual([row.page_key for row in first], [
+            (monday.isoformat(), "09:00", -serie_id),
+            ((monday - timedelta(days=1)).isoformat(), "18:00", sunday_id),
+            ((monday - timedelta(days=14)).isoformat(), "09:00", -serie_id),
+        ])
+        second = self.data_manager.get_past_appointments_page(first[-1].page_key, limit=3)
+        self.assertEqual([row.data for row in second],
+                         [(monday - timedelta(days=7 * weeks)).isoformat() for weeks in (3, 4)])
+
+    def test_deleted_series_disappears_from_reads(self):
+        serie_id = self._add_series(RecurrenceRule("diaria"), date(2030, 1, 1))
+        self.assertEqual(len(self.data_manager.get_compromissos_by_date("2030-06-01")), 1)
+        self.assertTrue(self.data_manager.delete_recorrencia(serie_id))
+        self.assertEqual(self.data_manager.get_compromissos_by_date("2030-06-01"), [])
+        self.assertIsNone(self.data_manager.get_recorrencia(serie_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+""" Planos de consulta das leituras por data e migração de um banco na versão inicial.
+
+As migrações trocam o esquema sob as consultas (a tabela vira a view
+'compromissos' sobre compromissos_base, entram colunas e tabelas novas);
+estes testes garantem que o dia e as páginas de futuros e passados
+continuam resolvidos pelo índice de data/hora, sem etapa de ordenação.
+"""
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SCHEMA_MIGRATIONS, DataManager, DataManagerError
+
+
+# Esquema do agenda.db antes das migrações (user_version 0)
+BASELINE_SCHEMA = """
+    CREATE TABLE compromissos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data TEXT NOT NULL,
+        hora TEXT NOT NULL,
+        nome_cliente TEXT NOT NULL,
+        tipo_visita TEXT NOT NULL,
+        local_visita TEXT NOT NULL,
+        endereco TEXT,
+        quem_vai TEXT,
+        observacoes TEXT
+    );
+"""
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Abre (e migra) o banco do argv em um processo separado
+OPEN_DATABASE_SCRIPT = "import sys; from database import DataManager; DataManager(sys.argv[1]).close()"
+CONCURRENT_OPENS = 4
+
+INDEX_SEARCH_RE = re.compile(r"SEARCH \w+ USING (COVERING )?INDEX idx_compromissos_data_hora ")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+class SchemaTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "agenda.db")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _create_baseline(self, rows=1):
+        """ Cria um agenda.db da versão inicial (user_version 0) com `rows` compromissos. """
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany("""
+            INSERT INTO compromissos (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes)
+            VALUES (?, '09:00', ?, 'Custom', 'Escritório', '', 'Ana', 'obs');
+        """, [(f"2030-01-{index % 28 + 1:02d}", f"Cliente {index}") for index in range(rows)])
+        conn.commit()
+        conn.close()
+
+    def _query_plans(self, data_manager, call):
+        """ Planos (EXPLAIN QUERY PLAN) das leituras de compromissos feitas por `call()`. """
+        statements = []
+        data_manager.conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            data_manager.conn.set_trace_callback(None)
+        plans = []
+        for statement in statements:
+            if statement.lstrip().startswith("SELECT id, data, hora, nome_cliente"):
+                rows = data_manager.conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall()
+                plans.append((statement, [row[-1] for row in rows]))
+        self.assertTrue(plans, "nenhuma leitura de compromissos foi executada")
+        return plans
+
+    def _assert_uses_date_index(self, data_manager, call):
+        for statement, plan in self._query_plans(data_manager, call):
+            details = "\n".join(plan)
+            self.assertTrue(any(INDEX_SEARCH_RE.search(step) for step in plan),
+                            f"a consulta não usa idx_compromissos_data_hora:\n{statement}\n{details}")
+            self.assertNotIn(TEMP_SORT, details, f"a consulta ordena em uma B-tree temporária:\n{statement}")
+
+    def test_reads_by_date_use_the_date_index(self):
+        data_manager = DataManager(self.db_path, day_cache_size=0)
+        try:
+            data_manager.add_compromisso("2030-01-02", "09:00", "Cliente", "Outro", "Escritório", "", "Ana", "")
+            self._assert_uses_date_index(data_manager, lambda: data_manager.get_compromissos_by_date("2030-01-02"))
+            self._assert_uses_date_index(data_manager, lambda: data_manager.get_future_appointments_page())
+            self._assert_uses_date_index(
+                data_manager, lambda: data_manager.get_future_appointments_page(("2030-01-01", "10:00", 5)))
+            self._assert_uses_date_index(data_manager, lambda: data_manager.get_past_appointments_page())
+            self._assert_uses_date_index(
+                data_manager, lambda: data_manager.get_past_appointments_page(("2030-01-03", "10:00", 5)))
+        finally:
+            data_manager.close()
+
+    def test_baseline_database_migrates_to_latest_version(self):
+        self._create_baseline()
+
+        data_manager = DataManager(self.db_path, day_cache_size=0)
+        try:
+            self.assertEqual(data_manager.get_schema_version(), SCHEMA_MIGRATIONS[-1][0])
+            [row] = data_manager.get_compromissos_by_date("2030-01-01")
+            self.assertEqual((row.nome_cliente, row.tipo_visita, row.quem_vai), ("Cliente 0", "Custom", "Ana"))
+            self._assert_uses_date_index(data_manager, lambda: data_manager.get_compromissos_by_date("2030-01-01"))
+        finally:
+            data_manager.close()
+
+    def test_concurrent_opens_migrate_once(self):
+        self._create_baseline(rows=2000)
+        processes = [
+            subprocess.Popen([sys.executable, "-c", OPEN_DATABASE_SCRIPT, self.db_path], cwd=ROOT_DIR,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for _ in range(CONCURRENT_OPENS)
+        ]
+        for process in processes:
+            _, stderr = process.communicate(timeout=120)
+            self.assertEqual(process.returncode, 0, stderr)
+
+        data_manager = DataManager(self.db_path, day_cache_size=0)
+        try:
+            self.assertEqual(data_manager.get_schema_version(), SCHEMA_MIGRATIONS[-1][0])
+            self.assertEqual(data_manager.get_stats()["appointments"], 2000)
+        finally:
+            data_manager.close()
+
+    def test_failed_write_leaves_no_new_lookup_values(self):
+        data_manager = DataManager(self.db_path, day_cache_size=0)
+        try:
+            before = data_manager.get_lookup_values()
+            with self.assertRaises(DataManagerError):
+                # nome_cliente NOT NULL: a linha falha depois do cadastro do tipo, local e responsável
+                data_manager.add_compromisso("2030-01-02", "09:00", None, "Tipo Novo", "Local Novo", "", "Pessoa Nova", "")
+            self.assertEqual(data_manager.get_lookup_values(), before)
+            self.assertNotIn("Tipo Novo", data_manager._tipo_ids)
+
+            row = data_manager.add_compromisso("2030-01-02", "09:00", "Cliente", "Tipo Novo", "Local Novo", "",
+                                               "Pessoa Nova", "")
+            self.assertEqual((row.tipo_visita, row.local_visita, row.quem_vai), ("Tipo Novo", "Local Novo", "Pessoa Nova"))
+            self.assertIn("Tipo Novo", data_manager._tipo_ids)
+            self.assertIn("Pessoa Nova", data_manager.get_lookup_values()["quem_vai"])
+        finally:
+            data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+""" Busca textual (FTS5 com conteúdo externo na view 'compromissos').
+
+A ordem segue o bm25 configurado (cliente > responsável > endereço >
+observações) dentro da janela SEARCH_RANK_WINDOW e depois vai do mais novo
+ao mais antigo; limit/offset percorrem essa ordem sem repetir nem pular
+linhas. Os gatilhos mantêm o índice em dia nas edições e exclusões, feitas
+pelo DataManager ou direto na view.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import DataManager, build_search_query
+
+
+DAY = "2030-06-03"
+
+
+class BuildSearchQueryTestCase(unittest.TestCase):
+    def test_only_the_last_term_is_a_prefix(self):
+        self.assertEqual(build_search_query("joao sil"), '"joao" "sil"*')
+        self.assertEqual(build_search_query("joao silva "), '"joao" "silva"')
+        self.assertEqual(build_search_query(" -- "), "")
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, nome="Cliente", endereco="", quem_vai="", observacoes="", data=DAY):
+        local = "No Cliente" if endereco else "Escritório"
+        return self.data_manager.add_compromisso(data, "09:00", nome, "Outro", local, endereco, quem_vai,
+                                                 observacoes).id
+
+    def _ids(self, text, **kwargs):
+        return [row.id for row in self.data_manager.search(text, **kwargs)]
+
+    def assertIndexInSync(self):
+        # 'integrity-check' com rank 1 compara o índice com o conteúdo externo (a view)
+        self.data_manager.conn.execute(
+            "INSERT INTO compromissos_fts (compromissos_fts, rank) VALUES ('integrity-check', 1);")
+
+    def test_ranking_follows_the_column_weights(self):
+        in_notes = self._add(observacoes="Ligar para Silva")
+        in_address = self._add(endereco="Rua Silva")
+        in_technician = self._add(quem_vai="Silva")
+        in_name = self._add(nome="Silva")
+        self._add(nome="Souza")
+        self.assertEqual(self._ids("silva"), [in_name, in_technician, in_address, in_notes])
+
+    def test_accents_case_and_prefix(self):
+        joao = self._add(nome="João Ávila")
+        self.assertEqual(self._ids("JOAO avi"), [joao])
+        self.assertEqual(self._ids("joao avi "), [])  # Termo completo: sem prefixo
+        self.assertEqual(self._ids(""), [])
+
+    def test_pages_cover_the_results_once(self):
+        ids = [self._add(nome=f"Padaria {index}", observacoes="padaria" if index % 2 else "") for index in range(7)]
+        everything = self._ids("padaria", limit=100)
+        self.assertEqual(sorted(everything), ids)
+        for limit in (1, 2, 3, 7):
+            with self.subTest(limit=limit):
+                pages = [self._ids("padaria", limit=limit, offset=offset) for offset in range(0, 8, limit)]
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+                self.assertEqual([row_id for page in pages for row_id in page], everything)
+        self.assertEqual(self._ids("padaria", limit=5, offset=7), [])
+
+    def test_pages_cross_the_rank_window(self):
+        older = [self._add(nome="Padaria") for _ in range(3)]
+        in_name = self._add(nome="Padaria")
+        in_notes = self._add(observacoes="padaria")
+        in_address = self._add(endereco="Rua Padaria")
+        with mock.patch.object(database, "SEARCH_RANK_WINDOW", 3):
+            # As 3 mais novas por relevância; depois, da mais nova para a mais antiga
+            everything = [in_name, in_address, in_notes] + older[::-1]
+            self.assertEqual(self._ids("padaria", limit=100), everything)
+            for offset in range(7):
+                with self.subTest(offset=offset):
+                    self.assertEqual(self._ids("padaria", limit=2, offset=offset), everything[offset:offset + 2])
+
+    def test_index_follows_updates_and_deletes(self):
+        kept = self._add(nome="Mercado Central", quem_vai="Ana")
+        edited = self._add(nome="Mercado Velho", observacoes="entregar nota")
+        deleted = self._add(nome="Mercado Antigo")
+
+        self.data_manager.update_compromisso(edited, DAY, "09:00", "Loja Nova", "Outro", "Escritório", "", "Bruno",
+                                             "entregar boleto")
+        self.data_manager.delete_compromisso(deleted)
+        self.assertEqual(self._ids("mercado"), [kept])
+        self.assertEqual(self._ids("velho"), [])
+        self.assertEqual(self._ids("loja nova"), [edited])
+        self.assertEqual(self._ids("bruno"), [edited])
+        self.assertEqual(self._ids("nota"), [])
+        self.assertEqual(self._ids("boleto"), [edited])
+        self.assertIndexInSync()
+
+    def test_index_follows_writes_through_the_view(self):
+        kept = self._add(nome="Mercado Central")
+        edited = self._add(nome="Mercado Velho", quem_vai="Ana")
+        deleted = self._add(nome="Mercado Antigo")
+        conn = self.data_manager.conn
+        with conn:
+            conn.execute("UPDATE compromissos SET nome_cliente = 'Loja Nova', quem_vai = 'Carla' WHERE id = ?;", (edited,))
+            conn.execute("DELETE FROM compromissos WHERE id = ?;", (deleted,))
+            conn.execute("""
+                INSERT INTO compromissos (data, hora, nome_cliente, tipo_visita, local_visita, endereco, quem_vai, observacoes)
+                VALUES (?, '10:00', 'Mercado Novo', 'Outro', 'Escritório', '', 'Ana', '');
+            """, (DAY,))
+        [added] = [row_id for row_id in self._ids("mercado") if row_id != kept]
+        self.assertEqual(sorted(self._ids("mercado")), [kept, added])
+        self.assertEqual(self._ids("carla"), [edited])
+        self.assertEqual(self._ids("ana"), [added])
+        self.assertIndexInSync()
+
+
+if __name__ == "__main__":
+    unittest.main()
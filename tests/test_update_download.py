@@ -0,0 +1,166 @@
+""" Download em fluxo (UpdateDownloader) e deltas contra o servidor de releases local.
+
+Cobre a retomada por Range depois de uma queda de conexão ou de uma
+execução anterior, o servidor que ignora Range, a rejeição de um SHA-256
+divergente e o delta, reconstruído e conferido ou recusado (o que leva a
+agenda de volta ao download completo).
+"""
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.release_server import start_server
+from delta_update import DeltaError, apply_delta, delta_asset_name, make_delta
+
+HAS_QT = importlib.util.find_spec("PyQt5") is not None
+if HAS_QT:
+    from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+    import update_download
+    from update_download import DeltaPatcher, UpdateDownloader
+
+ASSET_SIZE = 2 * 1024 * 1024
+TIMEOUT_MS = 60 * 1000
+# QCoreApplication dos testes (criada uma vez e mantida viva entre eles)
+_qt_app = None
+
+
+@unittest.skipUnless(HAS_QT, "requer PyQt5")
+class UpdateDownloadTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        global _qt_app
+        if QCoreApplication.instance() is None:
+            _qt_app = QCoreApplication([])
+
+    def setUp(self):
+        patcher = mock.patch.object(update_download, "RESUME_DELAY_MS", 50)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = start_server("v9.0", asset_size=ASSET_SIZE)
+        self._dir = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self._dir.name, "AgendaDataServis_new.exe")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._dir.cleanup()
+
+    def _download(self, dest=None, expected_sha256=None, asset_index=0):
+        """ Roda o UpdateDownloader em um loop de eventos até terminar; retorna (ok, mensagem, progresso). """
+        url = self.server.release["assets"][asset_index]["browser_download_url"]
+        downloader = UpdateDownloader(url, dest or self.dest, expected_sha256)
+        outcome = {}
+        progress = []
+        loop = QEventLoop()
+        downloader.progress.connect(lambda received, total, speed: progress.append((received, total)))
+        downloader.finished.connect(lambda path: (outcome.update(ok=True, message=path), loop.quit()))
+        downloader.failed.connect(lambda message: (outcome.update(ok=False, message=message), loop.quit()))
+        QTimer.singleShot(TIMEOUT_MS, loop.quit)
+        downloader.start()
+        loop.exec_()
+        return outcome.get("ok", False), outcome.get("message", "tempo esgotado"), progress
+
+    def _assert_downloaded(self):
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.server.asset)
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+
+    def _write_part(self, content):
+        with open(self.dest + ".part", "wb") as f:
+            f.write(content)
+
+    def test_full_download_with_published_checksum(self):
+        ok, message, progress = self._download()
+        self.assertTrue(ok, message)
+        self._assert_downloaded()
+        self.assertEqual(progress[-1], (ASSET_SIZE, ASSET_SIZE))
+        self.assertEqual(self.server.downloads, [None])
+
+    def test_dropped_connection_resumes_with_range(self):
+        self.server.drop_after = 768 * 1024
+        ok, message, _ = self._download(expected_sha256=self.server.asset_sha256)
+        self.assertTrue(ok, message)
+        self._assert_downloaded()
+        self.assertEqual(len(self.server.downloads), 2, self.server.downloads)
+        # Retoma do que chegou ao disco antes da queda
+        self.assertTrue((self.server.downloads[1] or "").startswith("bytes="), self.server.downloads)
+        self.assertTrue(0 < int(self.server.downloads[1][6:-1]) <= 768 * 1024, self.server.downloads)
+
+    def test_part_left_by_a_previous_run_is_resumed(self):
+        self._write_part(self.server.asset[:1024 * 1024])
+        ok, message, progress = self._download(expected_sha256=self.server.asset_sha256)
+        self.assertTrue(ok, message)
+        self._assert_downloaded()
+        self.assertEqual(self.server.downloads, [f"bytes={1024 * 1024}-"])
+        self.assertGreater(progress[0][0], 1024 * 1024)
+
+    def test_server_without_range_restarts_from_zero(self):
+        self._write_part(b"x" * 1000)
+        self.server.ignore_range = True
+        ok, message, _ = self._download(expected_sha256=self.server.asset_sha256)
+        self.assertTrue(ok, message)
+        self._assert_downloaded()
+
+    def test_checksum_mismatch_discards_the_file(self):
+        ok, _, _ = self._download(expected_sha256="0" * 64)
+        self.assertFalse(ok)
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+
+    def test_delta_rebuilds_the_new_executable(self):
+        old_exe = os.path.join(self._dir.name, "AgendaDataServis.exe")
+        target = os.path.join(self._dir.name, "target.exe")
+        old_content = random.Random("v1.1").randbytes(ASSET_SIZE)
+        new_content = bytearray(old_content)
+        new_content[1000:1000] = random.Random("novo").randbytes(20000)  # Módulo acrescentado
+        new_content[1_000_000:1_030_000] = random.Random("alterado").randbytes(30000)  # Módulo alterado
+        with open(old_exe, "wb") as f:
+            f.write(old_content)
+        with open(target, "wb") as f:
+            f.write(new_content)
+        delta_path = os.path.join(self._dir.name, delta_asset_name("1.1", "9.0"))
+        stats = make_delta(old_exe, target, delta_path)
+        self.assertLess(stats["delta_size"], len(new_content) // 10)
+
+        self.server.set_tag("v9.0", bytes(new_content))
+        with open(delta_path, "rb") as f:
+            self.server.add_asset(os.path.basename(delta_path), f.read())
+        downloaded_delta = self.dest + ".delta"
+        ok, message, _ = self._download(downloaded_delta, asset_index=1)
+        self.assertTrue(ok, message)
+
+        apply_delta(old_exe, downloaded_delta, self.dest, self.server.asset_sha256)
+        self._assert_downloaded()
+
+        # Delta feito para outro executável: recusado sem deixar resultado
+        with self.assertRaises(DeltaError):
+            apply_delta(self.dest, downloaded_delta, self.dest + ".again", self.server.asset_sha256)
+        self.assertFalse(os.path.exists(self.dest + ".again"))
+
+    def test_delta_patcher_reports_a_missing_executable(self):
+        old_exe = os.path.join(self._dir.name, "AgendaDataServis.exe")
+        with open(old_exe, "wb") as f:
+            f.write(b"antigo" * 1000)
+        delta_path = os.path.join(self._dir.name, delta_asset_name("1.1", "9.0"))
+        make_delta(old_exe, old_exe, delta_path)
+        os.remove(old_exe)
+
+        patcher = DeltaPatcher(old_exe, delta_path, self.dest)
+        failed, finished = [], []
+        patcher.failed.connect(failed.append)
+        patcher.finished_ok.connect(finished.append)
+        patcher.run()
+        self.assertEqual(finished, [])
+        self.assertEqual(len(failed), 1)
+        self.assertFalse(os.path.exists(delta_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
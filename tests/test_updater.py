@@ -0,0 +1,105 @@
+""" Cache em disco, ETag e backoff do Updater contra o servidor de releases local.
+
+O servidor (benchmarks/release_server.py) conta as requisições: cada
+cenário confere quantas chegaram à API e o primeiro sinal emitido.
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.release_server import start_server
+
+HAS_DEPENDENCIES = all(importlib.util.find_spec(name) for name in ("PyQt5", "requests"))
+if HAS_DEPENDENCIES:
+    from updater import BACKOFF_BASE_S, ReleaseCache, Updater
+
+
+@unittest.skipUnless(HAS_DEPENDENCIES, "requer PyQt5 e requests")
+class UpdaterCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = start_server("v9.0", asset_size=1024)
+        self._dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self._dir.name, "update_cache.json")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._dir.cleanup()
+
+    def _run(self, **options):
+        """ Executa Updater.run na thread atual; retorna (sinais emitidos, requisições à API). """
+        emitted = []
+        updater = Updater(api_url=self.server.api_url, cache_path=self.cache_path, **options)
+        updater.update_available.connect(lambda version, url, *digests: emitted.append(("update_available", version)))
+        updater.update_error.connect(lambda message: emitted.append(("update_error", message)))
+        updater.verification_finished.connect(lambda ok: emitted.append(("verification_finished", ok)))
+        before = self.server.requests
+        updater.run()
+        return emitted, self.server.requests - before
+
+    def _assert_run(self, expected_requests, expected_signal, **options):
+        emitted, requests_made = self._run(**options)
+        self.assertEqual(requests_made, expected_requests, emitted)
+        self.assertTrue(emitted)
+        self.assertEqual(emitted[0][0], expected_signal, emitted)
+        return emitted
+
+    def _cache(self):
+        return ReleaseCache.load(self.cache_path)
+
+    def test_interval_uses_the_cache_and_forced_check_sends_the_etag(self):
+        self.assertEqual(self._assert_run(1, "update_available")[0], ("update_available", "9.0"))
+        self._assert_run(0, "update_available")  # Dentro do intervalo: sem rede
+        self._assert_run(1, "update_available", force=True)
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertEqual(self._cache().etag, self.server.etag)
+
+    def test_failures_back_off_exponentially(self):
+        self._assert_run(1, "update_available")
+        self.server.fail_status = 500
+        self._assert_run(1, "update_error", check_interval=0)
+        self.assertEqual(self._cache().failures, 1)
+        # Durante o backoff não há rede; a release do cache continua valendo
+        self._assert_run(0, "update_available", check_interval=0)
+
+        # Fim do backoff: recua o horário da última tentativa
+        cache = self._cache()
+        cache.attempted_at -= BACKOFF_BASE_S + 1
+        cache.save()
+        self._assert_run(1, "update_error", check_interval=0)
+        cache = self._cache()
+        self.assertEqual(cache.failures, 2)
+        self.assertEqual(cache.next_check_at(0) - cache.attempted_at, 2 * BACKOFF_BASE_S)
+
+    def test_rate_limit_waits_for_the_reset(self):
+        self.server.rate_limited = True
+        self._assert_run(1, "update_error", force=True)
+        self.assertGreater(self._cache().retry_at, time.time() + 3000)
+        self._assert_run(0, "verification_finished", check_interval=0)
+
+    def test_new_release_after_failures_resets_the_cache(self):
+        self._assert_run(1, "update_available")
+        self.server.fail_status = 500
+        self._assert_run(1, "update_error", check_interval=0)
+
+        self.server.fail_status = None
+        self.server.set_tag("v9.1")
+        self.assertEqual(self._assert_run(1, "update_available", force=True)[0], ("update_available", "9.1"))
+        self.assertEqual(self.server.not_modified, 0)
+        cache = self._cache()
+        self.assertEqual((cache.failures, cache.etag, cache.release["tag_name"]), (0, self.server.etag, "v9.1"))
+
+    def test_corrupted_cache_counts_as_empty(self):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            f.write("{corrompido")
+        self._assert_run(1, "update_available")
+
+
+if __name__ == "__main__":
+    unittest.main()
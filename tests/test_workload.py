@@ -0,0 +1,104 @@
+""" Resumo de carga (resumo_carga) mantido pelos gatilhos de compromissos_base.
+
+Depois de cada escrita (inclusão, edição, exclusão, arquivamento e
+restauração de um arquivado), o resumo mantido em dia pelos gatilhos tem de
+ser igual ao recalculado do zero por rebuild_workload_summary.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DataManager
+
+
+class WorkloadSummaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.data_manager = DataManager(os.path.join(self._dir.name, "agenda.db"), day_cache_size=0)
+        self.old_day = (date.today() - timedelta(days=400)).isoformat()
+        self.ids = [
+            self._add("2030-04-29", "Ana", "Treinamento"),  # Segunda-feira; a semana atravessa o mês
+            self._add("2030-05-01", "Ana", "Treinamento"),
+            self._add("2030-05-01", "Bruno", "Outro"),
+            self._add("2030-05-15", "", "Outro"),  # Sem responsável
+            self._add(self.old_day, "Ana", "Outro"),
+            self._add(self.old_day, "Carla", "Treinamento"),
+        ]
+
+    def tearDown(self):
+        self.data_manager.close()
+        self._dir.cleanup()
+
+    def _add(self, data, quem_vai, tipo_visita, hora="09:00"):
+        return self.data_manager.add_compromisso(data, hora, "Cliente", tipo_visita, "Escritório", "", quem_vai, "").id
+
+    def _update(self, compromisso_id, data, quem_vai, tipo_visita):
+        self.data_manager.update_compromisso(compromisso_id, data, "10:00", "Cliente", tipo_visita, "Escritório", "",
+                                             quem_vai, "")
+
+    def _summary(self):
+        return self.data_manager.conn.execute("""
+            SELECT periodo, inicio, quem_vai_id, tipo_id, quantidade
+            FROM resumo_carga
+            ORDER BY periodo, inicio, quem_vai_id, tipo_id;
+        """).fetchall()
+
+    def assertMatchesRebuild(self):
+        maintained = self._summary()
+        self.assertNotIn(0, [row[-1] for row in maintained])
+        self.data_manager.rebuild_workload_summary()
+        self.assertEqual(maintained, self._summary())
+
+    def test_insert(self):
+        self.assertMatchesRebuild()
+        report = self.data_manager.get_workload_report("semana", "2030-04-29", "2030-05-05")
+        self.assertEqual(report, [("2030-04-29", "Ana", "Treinamento", 2), ("2030-04-29", "Bruno", "Outro", 1)])
+        self.assertEqual(self.data_manager.get_workload_report("mes", "2030-05-01", "2030-05-31"),
+                         [("2030-05-01", "", "Outro", 1), ("2030-05-01", "Ana", "Treinamento", 1),
+                          ("2030-05-01", "Bruno", "Outro", 1)])
+
+    def test_update(self):
+        self._update(self.ids[0], "2030-06-10", "Ana", "Treinamento")  # Outra semana e outro mês
+        self._update(self.ids[1], "2030-05-01", "Bruno", "Treinamento")  # Outro responsável
+        self._update(self.ids[2], "2030-05-01", "Bruno", "Treinamento")  # Outro tipo
+        self._update(self.ids[3], "2030-05-15", "Responsável Novo", "Tipo Novo")  # Valores novos nas tabelas
+        self.assertMatchesRebuild()
+        self.assertEqual(self.data_manager.get_workload_report("semana", "2030-04-29", "2030-05-05"),
+                         [("2030-04-29", "Bruno", "Treinamento", 2)])
+
+    def test_update_of_other_columns_leaves_the_summary(self):
+        before = self._summary()
+        self.data_manager.update_compromisso(self.ids[0], "2030-04-29", "18:00", "Outro Cliente", "Treinamento",
+                                             "No Cliente", "Rua A", "Ana", "obs")
+        self.assertEqual(self._summary(), before)
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        self.data_manager.delete_compromisso(self.ids[1])
+        self.data_manager.delete_compromisso(self.ids[3])
+        self.assertMatchesRebuild()
+        # Linhas que chegam a zero saem do resumo
+        self.assertEqual(self.data_manager.get_workload_report("mes", "2030-05-01", "2030-05-31"),
+                         [("2030-05-01", "Bruno", "Outro", 1)])
+
+    def test_archive_keeps_counting_archived_rows(self):
+        before = self._summary()
+        self.assertEqual(self.data_manager.archive_older_than(days=365, batch_size=1), 2)
+        self.assertEqual(self._summary(), before)
+        self.assertMatchesRebuild()
+
+    def test_archived_rows_restored_deleted_and_edited(self):
+        self.data_manager.archive_older_than(days=365)
+        self.data_manager.delete_compromisso(self.ids[4])
+        self.assertMatchesRebuild()
+        self._update(self.ids[5], "2030-05-01", "Ana", "Outro")
+        self.assertMatchesRebuild()
+        self.assertEqual(self.data_manager.get_workload_report("mes", self.old_day, self.old_day), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+""" Download da atualização em fluxo, com retomada e verificação SHA-256.
+
+Importado só quando o usuário aceita uma atualização (carrega o QtNetwork).
+Os bytes vão direto para "<destino>.part" a cada readyRead; se a conexão
+cair, o download continua de onde parou com um cabeçalho Range, inclusive
+em uma próxima execução do programa. O arquivo só recebe o nome final
+depois que o SHA-256 confere com o publicado na release.
+
+Quando a release publica um delta para a versão instalada, o DeltaPatcher
+reconstrói o executável novo a partir do atual (ver delta_update.py).
+"""
+import os
+import re
+import time
+
+from PyQt5.QtCore import QObject, QThread, QTimer, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from delta_update import file_sha256
+
+
+# Tentativas de retomada automática após quedas de conexão
+MAX_RESUME_ATTEMPTS = 5
+RESUME_DELAY_MS = 2000
+# Memória máxima retida pelo QNetworkReply entre dois readyRead
+READ_BUFFER_SIZE = 256 * 1024
+# Janela (segundos) usada no cálculo da velocidade exibida
+THROUGHPUT_WINDOW_S = 2.0
+
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+def parse_sha256(text):
+    """ Extrai o hash de "sha256:<hex>", "<hex>" ou de uma linha do sha256sum ("<hex>  arquivo"). """
+    text = (text or "").strip()
+    if text.lower().startswith("sha256:"):
+        text = text[len("sha256:"):]
+    token = text.split()[0] if text else ""
+    return token.lower() if _SHA256_RE.match(token) else None
+
+
+class UpdateDownloader(QObject):
+    """ Baixa `url` para `dest_path` e confere o SHA-256.
+
+    Sem `expected_sha256`, busca antes o arquivo "<url>.sha256" publicado
+    junto com o executável. Sinais: progress(recebidos, total ou -1, bytes/s),
+    finished(caminho final) e failed(mensagem).
+    """
+    progress = pyqtSignal(int, int, float)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, url, dest_path, expected_sha256=None, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.dest_path = dest_path
+        self.part_path = dest_path + ".part"
+        self.expected_sha256 = parse_sha256(expected_sha256)
+
+        self.network = QNetworkAccessManager(self)
+        self.reply = None
+        self.file = None
+        self.received = 0
+        self.total = -1
+        self.attempts = 0
+        self.resumed_from = 0
+        self._status_checked = False
+        self._writing = False
+        self._restarted = False
+        self._aborted = False
+        self._samples = []  # [(instante, bytes recebidos)] para a velocidade
+
+    # --- Controle ---
+
+    def start(self):
+        if self.expected_sha256:
+            self._start_download()
+        else:
+            self._fetch_checksum()
+
+    def abort(self):
+        """ Interrompe o download mantendo o .part para retomar depois. """
+        self._aborted = True
+        if self.reply is not None:
+            self.reply.abort()
+
+    def _request(self, url, offset=0):
+        request = QNetworkRequest(QUrl(url))
+        # Os assets do GitHub redirecionam para outro domínio
+        request.setAttribute(QNetworkRequest.FollowRedirectsAttribute, True)
+        if offset:
+            request.setRawHeader(b"Range", f"bytes={offset}-".encode("ascii"))
+        return request
+
+    # --- Checksum publicado ---
+
+    def _fetch_checksum(self):
+        self.reply = self.network.get(self._request(self.url + ".sha256"))
+        self.reply.finished.connect(self._on_checksum_finished)
+
+    def _on_checksum_finished(self):
+        reply, self.reply = self.reply, None
+        reply.deleteLater()
+        if self._aborted:
+            return
+        if reply.error() != QNetworkReply.NoError:
+            self.failed.emit(f"Não foi possível obter o SHA-256 publicado: {reply.errorString()}")
+            return
+        self.expected_sha256 = parse_sha256(bytes(reply.readAll()).decode("ascii", "replace"))
+        if not self.expected_sha256:
+            self.failed.emit("O arquivo .sha256 publicado na release é inválido.")
+            return
+        self._start_download()
+
+    # --- Download em fluxo ---
+
+    def _start_download(self):
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        self.file = open(self.part_path, "ab")
+        self.received = self.resumed_from = offset
+        self._samples = [(time.monotonic(), offset)]
+        self._status_checked = False
+
+        self.reply = self.network.get(self._request(self.url, offset))
+        self.reply.setReadBufferSize(READ_BUFFER_SIZE)
+        self.reply.readyRead.connect(self._on_ready_read)
+        self.reply.finished.connect(self._on_download_finished)
+
+    def _check_status(self):
+        """ Na primeira leitura: 206 continua o .part; 200 (Range ignorado) recomeça do zero.
+
+        Qualquer outro status (página de erro, 416) não é gravado no arquivo.
+        """
+        self._status_checked = True
+        status = self.reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        content_range = bytes(self.reply.rawHeader(b"Content-Range")).decode("ascii", "replace")
+        match = _CONTENT_RANGE_RE.match(content_range)
+
+        self._writing = status in (200, 206)
+        if status == 206:
+            if match and int(match.group(1)) == self.received:
+                if match.group(3) != "*":
+                    self.total = int(match.group(3))
+                return
+            # Trecho diferente do pedido: zera o .part e a retomada recomeça do início
+            self._writing = False
+            self.file.seek(0)
+            self.file.truncate()
+            self.reply.abort()
+            return
+        if not self._writing:
+            return
+
+        # Resposta completa: descarta o que já havia no .part
+        self.file.seek(0)
+        self.file.truncate()
+        self.received = self.resumed_from = 0
+        self._samples = [(time.monotonic(), 0)]
+        length = self.reply.header(QNetworkRequest.ContentLengthHeader)
+        self.total = int(length) if length is not None else -1
+
+    def _on_ready_read(self):
+        if not self._status_checked:
+            self._check_status()
+        if self.reply is None:
+            return  # Abortada em _check_status
+        chunk = self.reply.readAll()
+        if chunk.isEmpty() or not self._writing:
+            return
+        self.file.write(chunk.data())
+        self.received += chunk.size()
+        self._emit_progress()
+
+    def _emit_progress(self):
+        now = time.monotonic()
+        self._samples.append((now, self.received))
+        while len(self._samples) > 2 and now - self._samples[0][0] > THROUGHPUT_WINDOW_S:
+            self._samples.pop(0)
+        first_time, first_bytes = self._samples[0]
+        elapsed = now - first_time
+        speed = (self.received - first_bytes) / elapsed if elapsed > 0 else 0.0
+        self.progress.emit(self.received, self.total, speed)
+
+    def _on_download_finished(self):
+        if self.reply.bytesAvailable():
+            self._on_ready_read()
+        reply, self.reply = self.reply, None
+        self.file.close()
+        self.file = None
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        error, error_text = reply.error(), reply.errorString()
+        reply.deleteLater()
+
+        if self._aborted:
+            self.failed.emit("Download cancelado. Ele será retomado na próxima tentativa.")
+            return
+
+        # 416: o .part já estava completo quando o Range foi pedido
+        if error != QNetworkReply.NoError and status != 416:
+            # Só quedas de rede (códigos < 200) são retomadas; erros HTTP não mudam tentando de novo
+            if error < 200 and self.attempts < MAX_RESUME_ATTEMPTS:
+                self.attempts += 1
+                QTimer.singleShot(RESUME_DELAY_MS * self.attempts, self._start_download)
+                return
+            self.failed.emit(f"Falha ao baixar arquivo: {error_text}")
+            return
+
+        self._verify()
+
+    def _verify(self):
+        """ Confere o SHA-256 e só então dá o nome final ao arquivo. """
+        try:
+            actual = file_sha256(self.part_path)
+            if actual != self.expected_sha256:
+                os.remove(self.part_path)
+                if self.resumed_from and not self._restarted:
+                    # O .part retomado podia ser de outro download: tenta uma vez do zero
+                    self._restarted = True
+                    self._start_download()
+                    return
+                self.failed.emit("O arquivo baixado não confere com o SHA-256 publicado e foi descartado.")
+                return
+            os.replace(self.part_path, self.dest_path)
+        except OSError as e:
+            self.failed.emit(f"Não foi possível salvar o novo executável: {e}")
+            return
+        self.finished.emit(self.dest_path)
+
+
+class DeltaPatcher(QThread):
+    """ Aplica um delta (delta_update.apply_delta) fora da thread da interface. """
+    finished_ok = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source_path, delta_path, output_path, expected_sha256=None, parent=None):
+        super().__init__(parent)
+        self.source_path = source_path
+        self.delta_path = delta_path
+        self.output_path = output_path
+        self.expected_sha256 = parse_sha256(expected_sha256)
+
+    def run(self):
+        from delta_update import apply_delta
+
+        try:
+            apply_delta(self.source_path, self.delta_path, self.output_path, self.expected_sha256)
+        except Exception as e:
+            # Qualquer falha precisa chegar ao `failed`, que dispara o download completo
+            self.failed.emit(str(e))
+            return
+        finally:
+            # O delta só serve para esta atualização
+            try:
+                os.remove(self.delta_path)
+            except OSError:
+                pass
+        self.finished_ok.emit(self.output_path)
@@ -0,0 +1,259 @@
+""" Verificação de novas versões no GitHub.
+
+O `requests` (e tudo que ele arrasta: urllib3, ssl, charset...) só é
+importado dentro da thread do Updater, para não pesar na abertura da janela.
+
+A última release consultada fica em um cache local (JSON com a release, o
+ETag e os horários das consultas). Dentro do intervalo de verificação o
+Updater nem acessa a rede; depois dele, envia If-None-Match e um 304 apenas
+renova o cache (e não conta no limite de requisições do GitHub). Falhas
+seguidas espaçam as novas tentativas por backoff exponencial.
+"""
+import json
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+GITHUB_REPO = "Azzaleh/Agenda"
+CURRENT_VERSION = "1.1"
+DOWNLOAD_FILENAME = "AgendaDataServis.exe"
+
+# Endereço da API (pode apontar para um servidor local de teste, ver benchmarks/release_server.py)
+RELEASES_API_URL = os.environ.get(
+    "AGENDA_UPDATE_API_URL", f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
+)
+# Intervalo mínimo (segundos) entre duas consultas bem-sucedidas à API
+DEFAULT_CHECK_INTERVAL_S = int(os.environ.get("AGENDA_UPDATE_INTERVAL_S", str(6 * 3600)))
+# Espera após falhas: BACKOFF_BASE_S, 2x, 4x... até BACKOFF_MAX_S
+BACKOFF_BASE_S = 5 * 60
+BACKOFF_MAX_S = 24 * 3600
+REQUEST_TIMEOUT_S = 5
+
+UPDATE_CACHE_FILENAME = "update_cache.json"
+
+
+def default_cache_path():
+    """ Cache na pasta local do usuário (o Data/ pode estar em um compartilhamento de rede). """
+    override = os.environ.get("AGENDA_UPDATE_CACHE")
+    if override:
+        return override
+    if sys.platform.startswith("win"):
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "AgendaDataServis", UPDATE_CACHE_FILENAME)
+
+
+class ReleaseCache:
+    """ Última release conhecida, seu ETag e o histórico recente de consultas. """
+
+    def __init__(self, path):
+        self.path = path
+        self.release = None       # JSON da release (dicionário)
+        self.etag = None
+        self.checked_at = 0.0     # Última consulta bem-sucedida (200 ou 304)
+        self.attempted_at = 0.0   # Última tentativa, com ou sem sucesso
+        self.failures = 0         # Falhas seguidas desde o último sucesso
+        self.retry_at = 0.0       # Não tentar antes disso (ex.: limite de requisições)
+
+    @classmethod
+    def load(cls, path):
+        """ Lê o cache; um arquivo ausente ou corrompido vale como cache vazio. """
+        cache = cls(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if isinstance(stored, dict):
+            cache.release = stored.get("release") if isinstance(stored.get("release"), dict) else None
+            cache.etag = stored.get("etag")
+            for field in ("checked_at", "attempted_at", "retry_at"):
+                setattr(cache, field, float(stored.get(field) or 0))
+            cache.failures = int(stored.get("failures") or 0)
+        return cache
+
+    def save(self):
+        """ Grava de forma atômica (arquivo temporário + os.replace). """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "release": self.release,
+                "etag": self.etag,
+                "checked_at": self.checked_at,
+                "attempted_at": self.attempted_at,
+                "failures": self.failures,
+                "retry_at": self.retry_at,
+            }, f)
+        os.replace(temp_path, self.path)
+
+    def next_check_at(self, interval):
+        """ Momento a partir do qual a API pode ser consultada de novo. """
+        if self.failures:
+            backoff = min(BACKOFF_BASE_S * 2 ** (self.failures - 1), BACKOFF_MAX_S)
+            return max(self.attempted_at + backoff, self.retry_at)
+        return max(self.checked_at + interval, self.retry_at)
+
+    def is_due(self, now, interval):
+        # Relógio voltou para trás (horários gravados no futuro): consulta de novo
+        if self.attempted_at > now or self.checked_at > now:
+            return True
+        return now >= self.next_check_at(interval)
+
+    def record_success(self, now, release=None, etag=None):
+        """ 200 (release e ETag novos) ou 304 (release=None: mantém a do cache). """
+        if release is not None:
+            self.release = release
+            self.etag = etag
+        self.checked_at = self.attempted_at = now
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, now, retry_at=0.0):
+        self.attempted_at = now
+        self.failures += 1
+        self.retry_at = retry_at
+
+
+def _retry_at_from_headers(headers, now):
+    """ Respeita Retry-After e o reset do limite de requisições do GitHub, se informados. """
+    retry_after = headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return now + int(retry_after)
+    if headers.get("X-RateLimit-Remaining") == "0":
+        reset = headers.get("X-RateLimit-Reset")
+        if reset and reset.isdigit():
+            return float(reset)
+    return 0.0
+
+# --- CLASSE UPDATER (QThread) ---
+
+class Updater(QThread):
+    # Emite (versão, download_url, sha256, delta_url, sha256 do delta); vazios quando não publicados
+    update_available = pyqtSignal(str, str, str, str, str)
+    update_error = pyqtSignal(str)
+    verification_finished = pyqtSignal(bool)
+
+    def __init__(self, api_url=None, cache_path=None, check_interval=None, force=False, parent=None):
+        """ `force` ignora o intervalo e o backoff (verificação pedida pelo usuário). """
+        super().__init__(parent)
+        self.api_url = api_url or RELEASES_API_URL
+        self.cache_path = cache_path or default_cache_path()
+        self.check_interval = DEFAULT_CHECK_INTERVAL_S if check_interval is None else check_interval
+        self.force = force
+        self.used_network = False
+
+    def run(self):
+        cache = ReleaseCache.load(self.cache_path)
+        now = time.time()
+
+        if not self.force and not cache.is_due(now, self.check_interval):
+            # Dentro do intervalo: decide com a release do cache, sem rede
+            if cache.release is not None:
+                self._check_release(cache.release)
+            else:
+                self.verification_finished.emit(False)
+            return
+
+        release, error = self._fetch_release(cache, now)
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Não foi possível gravar o cache de atualização: {e}")
+
+        if error:
+            self.update_error.emit(error)
+            self.verification_finished.emit(False)
+            return
+        self._check_release(release)
+
+    def _fetch_release(self, cache, now):
+        """ Consulta a API (condicional se houver ETag) e atualiza o cache. Retorna (release, erro). """
+        import requests  # Carregado sob demanda, fora da thread da interface
+
+        self.used_network = True
+        headers = {"Accept": "application/vnd.github+json"}
+        if cache.etag and cache.release is not None:
+            headers["If-None-Match"] = cache.etag
+
+        try:
+            # Requisição à API do GitHub para pegar a última release
+            response = requests.get(self.api_url, headers=headers, timeout=REQUEST_TIMEOUT_S)
+        except requests.exceptions.ConnectionError:
+            cache.record_failure(now)
+            return None, "Erro de conexão de rede."
+        except requests.exceptions.RequestException as e:
+            cache.record_failure(now)
+            return None, f"Erro inesperado na verificação: {e}"
+
+        if response.status_code == 304:
+            cache.record_success(now)
+            return cache.release, None
+
+        if response.status_code != 200:
+            cache.record_failure(now, _retry_at_from_headers(response.headers, now))
+            return None, "Erro ao acessar API do GitHub. Código: " + str(response.status_code)
+
+        try:
+            release = response.json()
+        except ValueError:
+            cache.record_failure(now)
+            return None, "Resposta inválida da API do GitHub."
+        cache.record_success(now, release, response.headers.get("ETag"))
+        return release, None
+
+    def _check_release(self, latest_release):
+        """ Compara a release com a versão instalada e emite o sinal correspondente. """
+        from delta_update import delta_asset_name  # Só na thread do Updater (lzma, argparse...)
+
+        try:
+            # Remove "v" do início e pega a versão da tag
+            latest_version_raw = latest_release.get("tag_name", "v0.0").lstrip('v')
+
+            # Comparação de Versões
+            if self._is_new_version(latest_version_raw, CURRENT_VERSION):
+
+                download_url = None
+                digest = ""
+                # Delta binário da versão instalada para a nova (ver delta_update.py)
+                delta_name = delta_asset_name(CURRENT_VERSION, latest_version_raw,
+                                              os.path.splitext(DOWNLOAD_FILENAME)[0])
+                delta_url = delta_digest = ""
+                # Encontra o arquivo .exe anexo (asset)
+                for asset in latest_release.get("assets", []):
+                    if asset.get("name") == DOWNLOAD_FILENAME:
+                        download_url = asset.get("browser_download_url")
+                        # A API informa "sha256:<hex>"; sem ele, o download busca o .sha256 publicado
+                        digest = asset.get("digest") or ""
+                    elif asset.get("name") == delta_name:
+                        delta_url = asset.get("browser_download_url") or ""
+                        delta_digest = asset.get("digest") or ""
+
+                if download_url:
+                    self.update_available.emit(latest_version_raw, download_url, digest, delta_url, delta_digest)
+                else:
+                    self.update_error.emit(f"Arquivo '{DOWNLOAD_FILENAME}' não encontrado na release.")
+                    self.verification_finished.emit(False)
+            else:
+                self.verification_finished.emit(True)
+
+        except Exception as e:
+            self.update_error.emit(f"Erro inesperado na verificação: {e}")
+            self.verification_finished.emit(False)
+
+    def _is_new_version(self, new_raw, current_raw):
+        # Lógica para comparar apenas MAIOR e MENOR.
+
+        new_parts = list(map(int, new_raw.split('.')))[:2]
+        current_parts = list(map(int, current_raw.split('.')))[:2]
+
+        # Preenche com zeros se for necessário
+        max_len = max(len(new_parts), len(current_parts))
+        new_parts.extend([0] * (max_len - len(new_parts)))
+        current_parts.extend([0] * (max_len - len(current_parts)))
+
+        return new_parts > current_parts